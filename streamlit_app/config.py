@@ -8,9 +8,12 @@ import sys
 import logging
 from pathlib import Path
 import tempfile
+from functools import lru_cache
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from .utils.key_pool import KeyPool, PooledOpenAIClient, keys_from_env
+
 # Configuração de logging
 def setup_logging():
     """
@@ -26,7 +29,8 @@ logger = setup_logging()
 
 # Configurações de segurança
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-ALLOWED_EXTENSIONS = {'pdf'}
+# PDFs passam pelo OCR; os demais formatos são convertidos diretamente (utils/input_adapters.py)
+ALLOWED_EXTENSIONS = {'pdf', 'docx', 'epub', 'html', 'htm', 'xhtml', 'md', 'markdown'}
 
 # Configuração do diretório de uploads
 def setup_upload_directory():
@@ -56,25 +60,40 @@ def add_project_root_to_path():
     if str(project_root) not in sys.path:
         sys.path.insert(0, str(project_root))
 
-# Configuração do cliente OpenAI
-def get_openai_client():
+# Pools de chaves compartilhados por todas as sessões do processo
+@lru_cache(maxsize=None)
+def get_openai_key_pool():
     """
-    Retorna uma instância do cliente OpenAI com a chave API apropriada.
+    Retorna o pool de chaves da OpenAI (OPENAI_API_KEYS ou OPENAI_API_KEY).
     """
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
+    keys = keys_from_env('OPENAI_API_KEYS', 'OPENAI_API_KEY')
+    if not keys:
         raise ValueError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
-    return OpenAI(api_key=api_key)
+    return KeyPool(keys)
 
-# Configuração do cliente Mistral
-def get_mistral_api_key():
+@lru_cache(maxsize=None)
+def get_mistral_key_pool():
     """
-    Retorna a chave API do Mistral.
+    Retorna o pool de chaves da Mistral (MISTRAL_API_KEYS ou MISTRAL_API_KEY).
     """
-    api_key = os.getenv('MISTRAL_API_KEY')
-    if not api_key:
+    keys = keys_from_env('MISTRAL_API_KEYS', 'MISTRAL_API_KEY')
+    if not keys:
         raise ValueError("MISTRAL_API_KEY não encontrada nas variáveis de ambiente")
-    return api_key
+    return KeyPool(keys)
+
+# Configuração do cliente OpenAI
+def get_openai_client():
+    """
+    Retorna uma instância do cliente OpenAI com a chave API apropriada.
+    
+    Com várias chaves configuradas em OPENAI_API_KEYS, retorna um cliente que
+    distribui as requisições entre elas (ver utils.key_pool).
+    """
+    pool = get_openai_key_pool()
+    if len(pool) == 1:
+        key = pool.keys[0]
+        return OpenAI(api_key=key.api_key, organization=key.organization)
+    return PooledOpenAIClient(pool, OpenAI)
 
 def setup_environment():
     """
@@ -87,8 +106,8 @@ def setup_environment():
     add_project_root_to_path()
     
     # Verificar se as variáveis de ambiente necessárias estão configuradas
-    if not os.getenv('OPENAI_API_KEY'):
+    if not os.getenv('OPENAI_API_KEY') and not os.getenv('OPENAI_API_KEYS'):
         logger.error("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
     
-    if not os.getenv('MISTRAL_API_KEY'):
+    if not os.getenv('MISTRAL_API_KEY') and not os.getenv('MISTRAL_API_KEYS'):
         logger.error("MISTRAL_API_KEY não encontrada nas variáveis de ambiente")
@@ -1,6 +1,7 @@
 import re
 import base64
 import logging
+from xml.sax.saxutils import escape
 
 # Configuração do logger
 logger = logging.getLogger(__name__)
@@ -26,6 +27,66 @@ def process_footnotes(text):
     
     return re.sub(pattern, replace_footnote, text)
 
+_FOOTNOTE_DEFINITION = re.compile(r'^\[\^([^\]\s]+)\]:[ \t]*(.*)$')
+_FOOTNOTE_REFERENCE = re.compile(r'\[\^([^\]\s]+)\]')
+_CODE_FENCE = re.compile(r'^\s*(```|~~~)')
+
+def number_named_footnotes(text):
+    """
+    Numera as notas de rodapé nomeadas ([^nome]) do documento inteiro.
+    
+    As definições ([^nome]: texto, com as linhas recuadas seguintes) saem do texto e
+    as referências viram <sup>N</sup>, como em process_footnotes, numeradas pela
+    ordem da primeira referência. Assim a numeração não depende de o documento ser
+    convertido inteiro ou em partes. Referências sem definição e blocos de código
+    ficam como estão.
+    
+    Args:
+        text (str): Texto markdown (depois de process_footnotes)
+        
+    Returns:
+        Tuple contendo o texto sem as definições e a lista de notas (número, texto)
+    """
+    definitions = {}
+    body = []
+    current = None
+    in_code = False
+    for line in text.split('\n'):
+        if _CODE_FENCE.match(line):
+            in_code = not in_code
+        match = _FOOTNOTE_DEFINITION.match(line) if not in_code else None
+        if match:
+            current = match.group(1)
+            definitions[current] = [match.group(2).strip()]
+        elif current is not None and line.startswith(('    ', '\t')) and line.strip():
+            definitions[current].append(line.strip())
+        else:
+            current = None
+            body.append(line)
+    if not definitions:
+        return text, []
+    
+    numbers = {}
+    def replace_reference(match):
+        label = match.group(1)
+        if label not in definitions:
+            return match.group(0)
+        number = numbers.setdefault(label, len(numbers) + 1)
+        return f'<sup>{number}</sup>'
+    
+    in_code = False
+    for i, line in enumerate(body):
+        if _CODE_FENCE.match(line):
+            in_code = not in_code
+        elif not in_code:
+            body[i] = _FOOTNOTE_REFERENCE.sub(replace_reference, line)
+    
+    # Definições sem referência vêm depois das referenciadas
+    for label in definitions:
+        numbers.setdefault(label, len(numbers) + 1)
+    footnotes = [(numbers[label], escape(' '.join(lines))) for label, lines in definitions.items()]
+    return '\n'.join(body), sorted(footnotes)
+
 def replace_images_in_markdown(markdown_str: str, images_dict: dict) -> str:
     """
     Substitui referências de imagens no markdown pelos dados base64 correspondentes.
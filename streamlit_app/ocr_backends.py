@@ -0,0 +1,316 @@
+"""
+Mecanismos de OCR: o serviço da Mistral ou um mecanismo local, em CPU.
+
+Os dois produzem a mesma saída, uma lista com o markdown de cada página, então o
+restante do fluxo (remoção de cabeçalhos, tradução, leitor) não muda. O mecanismo
+local renderiza cada página como imagem (pypdfium2) e a reconhece com o Tesseract,
+que roda como um processo separado por página: com uma thread por núcleo
+aguardando cada um, as páginas são reconhecidas em paralelo em todos os núcleos.
+
+As dependências locais são opcionais: os pacotes pypdfium2 e pytesseract e o
+executável do Tesseract com os idiomas usados (por exemplo, tesseract-ocr-por).
+"""
+
+import csv
+import logging
+import os
+import re
+import statistics
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OCR_BACKEND = 'mistral'
+DEFAULT_DPI = 200
+# Linhas isoladas com altura bem acima da mediana da página viram títulos
+HEADING_HEIGHT_RATIO = 1.4
+HEADING_MAX_WORDS = 12
+# Threads do OpenMP de cada processo do Tesseract (um processo por núcleo)
+TESSERACT_THREAD_LIMIT = '1'
+
+# Códigos ISO da aplicação para os idiomas do Tesseract
+TESSERACT_LANGUAGES = {
+    'en': 'eng',
+    'pt': 'por',
+    'es': 'spa',
+    'fr': 'fra',
+    'de': 'deu',
+    'it': 'ita'
+}
+
+_HYPHENATED = re.compile(r'[^\W\d_]-$')
+
+class OCRBackend(ABC):
+    """
+    Interface dos mecanismos de OCR.
+    """
+
+    name = None
+    # Se o PDF é enviado a um serviço; nesse caso, vale recortar as páginas antes do envio
+    uploads_document = False
+
+    @abstractmethod
+    def process(self, pdf_path: str, pages: Optional[List[int]] = None) -> List[str]:
+        """
+        Extrai o markdown das páginas do PDF.
+
+        Args:
+            pdf_path (str): Caminho do arquivo PDF
+            pages (List[int], optional): Índices das páginas (começando em 0); todas se omitido
+
+        Returns:
+            List[str]: Markdown de cada página, na ordem das páginas
+        """
+
+class MistralOCRBackend(OCRBackend):
+    """
+    OCR pelo serviço da Mistral.
+    """
+
+    name = 'mistral'
+    uploads_document = True
+
+    def process(self, pdf_path: str, pages: Optional[List[int]] = None) -> List[str]:
+        # Importado aqui para não carregar o cliente da Mistral nos processos do OCR local
+        from streamlit_app.ocr_mistral_md import process_pdf_ocr
+        return process_pdf_ocr(pdf_path, pages)
+
+def is_local_ocr_available() -> bool:
+    """Indica se os pacotes e o executável do OCR local estão instalados."""
+    try:
+        import pypdfium2  # noqa: F401
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+def tesseract_data(image, language: str, tesseract_cmd: str = 'tesseract') -> Dict[str, list]:
+    """
+    Reconhece uma imagem com o executável do Tesseract (saída TSV).
+
+    Equivale a pytesseract.image_to_data com output_type=Output.DICT, mas o processo
+    recebe OMP_THREAD_LIMIT no próprio ambiente: com um processo por núcleo, cada um
+    não deve abrir threads do OpenMP, e o ambiente do servidor (usado também pelo
+    CTranslate2 da tradução local) não é alterado.
+
+    Args:
+        image: Imagem da página (PIL)
+        language (str): Idioma(s) do Tesseract, por exemplo 'por' ou 'eng+por'
+        tesseract_cmd (str): Executável do Tesseract
+
+    Returns:
+        Dict[str, list]: Colunas da saída TSV (posições numéricas e o texto de cada palavra)
+    """
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    result = subprocess.run(
+        [tesseract_cmd, 'stdin', 'stdout', '-l', language, 'tsv'],
+        input=buffer.getvalue(), capture_output=True,
+        env={**os.environ, 'OMP_THREAD_LIMIT': TESSERACT_THREAD_LIMIT}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha no Tesseract: {result.stderr.decode(errors='replace').strip()}")
+
+    rows = list(csv.reader(result.stdout.decode('utf-8').splitlines(), delimiter='\t', quoting=csv.QUOTE_NONE))
+    if not rows:
+        return {'text': []}
+    header, rows = rows[0], rows[1:]
+    data = {column: [] for column in header}
+    for row in rows:
+        # O texto é a última coluna e fica vazio nas linhas de bloco, parágrafo e linha
+        row += [''] * (len(header) - len(row))
+        for column, value in zip(header, row):
+            data[column].append(value if column == 'text' else int(float(value)))
+    return data
+
+def ocr_data_to_markdown(data: Dict[str, list]) -> str:
+    """
+    Monta o markdown de uma página a partir das palavras reconhecidas pelo Tesseract.
+
+    As palavras são agrupadas em linhas e parágrafos pela segmentação do próprio
+    Tesseract; as linhas de um parágrafo são unidas (desfazendo a hifenização no fim
+    da linha) e um parágrafo de uma única linha curta, com altura bem acima da
+    mediana, vira título.
+
+    Args:
+        data (Dict[str, list]): Saída de tesseract_data
+
+    Returns:
+        str: Markdown da página, com os parágrafos separados por linha em branco
+    """
+    lines: Dict[Tuple[int, int, int], List[int]] = {}
+    for i, word in enumerate(data['text']):
+        if word and word.strip():
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(i)
+    if not lines:
+        return ''
+
+    heights = {key: max(data['height'][i] for i in indexes) for key, indexes in lines.items()}
+    median_height = statistics.median(heights.values())
+
+    paragraphs: Dict[Tuple[int, int], List[Tuple[int, int, int]]] = {}
+    for key in lines:
+        paragraphs.setdefault(key[:2], []).append(key)
+
+    blocks = []
+    for keys in paragraphs.values():
+        texts = [' '.join(data['text'][i].strip() for i in lines[key]) for key in keys]
+        if (len(keys) == 1 and len(lines[keys[0]]) <= HEADING_MAX_WORDS
+                and heights[keys[0]] >= HEADING_HEIGHT_RATIO * median_height):
+            blocks.append(f"## {texts[0]}")
+            continue
+
+        paragraph = texts[0]
+        for text in texts[1:]:
+            if _HYPHENATED.search(paragraph) and text[:1].islower():
+                paragraph = paragraph[:-1] + text
+            else:
+                paragraph += ' ' + text
+        blocks.append(paragraph)
+
+    return '\n\n'.join(blocks) + '\n\n'
+
+class LocalOCRBackend(OCRBackend):
+    """
+    OCR local: renderização das páginas e reconhecimento pelo Tesseract em paralelo.
+    """
+
+    name = 'local'
+
+    def __init__(self, language: str = 'en', dpi: int = DEFAULT_DPI, workers: Optional[int] = None):
+        """
+        Args:
+            language: Código ISO do idioma do documento (ver TESSERACT_LANGUAGES)
+            dpi: Resolução da renderização das páginas
+            workers: Páginas reconhecidas ao mesmo tempo (padrão: uma por núcleo)
+        """
+        self.language = TESSERACT_LANGUAGES.get(language, language)
+        self.dpi = dpi
+        self.workers = workers or os.cpu_count() or 1
+
+    def process(self, pdf_path: str, pages: Optional[List[int]] = None) -> List[str]:
+        try:
+            import pypdfium2 as pdfium
+            import pytesseract
+        except ImportError as e:
+            raise ImportError(
+                "O OCR local requer os pacotes opcionais pypdfium2 e pytesseract "
+                "(pip install pypdfium2 pytesseract) e o executável do Tesseract"
+            ) from e
+
+        pdf = pdfium.PdfDocument(pdf_path)
+        # O PDFium não pode ser usado por várias threads ao mesmo tempo; a renderização é
+        # rápida perto do reconhecimento, que roda em paralelo nos processos do Tesseract
+        render_lock = threading.Lock()
+
+        def ocr_page(index: int) -> str:
+            with render_lock:
+                image = pdf[index].render(scale=self.dpi / 72).to_pil()
+            data = tesseract_data(image, self.language, pytesseract.pytesseract.tesseract_cmd)
+            return ocr_data_to_markdown(data)
+
+        try:
+            if pages is None:
+                pages = list(range(len(pdf)))
+            with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(pages))),
+                                    thread_name_prefix='ocr') as executor:
+                extracted_pages = list(executor.map(ocr_page, pages))
+        finally:
+            pdf.close()
+
+        logger.info(f"OCR local de {len(pages)} páginas, até {self.workers} em paralelo")
+        return extracted_pages
+
+def get_ocr_backend(name: Optional[str] = None, language: str = 'en', **options) -> OCRBackend:
+    """
+    Retorna o mecanismo de OCR pelo nome.
+
+    Args:
+        name (str, optional): 'mistral' ou 'local' (padrão: OCR_BACKEND ou 'mistral')
+        language (str): Código ISO do idioma do documento, usado pelo OCR local
+        options: Repassados a LocalOCRBackend
+
+    Returns:
+        OCRBackend: Mecanismo de OCR
+    """
+    name = name or os.getenv('OCR_BACKEND', DEFAULT_OCR_BACKEND)
+    if name == 'mistral':
+        return MistralOCRBackend()
+    if name == 'local':
+        return LocalOCRBackend(language=language, **options)
+    raise ValueError(f"Mecanismo de OCR desconhecido: {name}")
+
+def _cpu_seconds() -> float:
+    """Tempo de CPU do processo e dos processos filhos já encerrados."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+def benchmark_ocr(pdf_path: str, backends: Dict[str, OCRBackend],
+                  pages: Optional[List[int]] = None) -> Dict[str, dict]:
+    """
+    Mede a vazão de cada mecanismo de OCR no mesmo PDF.
+
+    O tempo de CPU soma o processo principal e os processos filhos (o Tesseract, no OCR local).
+
+    Args:
+        pdf_path (str): Caminho do arquivo PDF
+        backends (Dict[str, OCRBackend]): Mecanismos a comparar, por nome
+        pages (List[int], optional): Índices das páginas (começando em 0); todas se omitido
+
+    Returns:
+        Dict[str, dict]: Métricas por mecanismo (segundos, segundos de CPU, páginas,
+        páginas por segundo, páginas por segundo de CPU e caracteres extraídos)
+    """
+    results = {}
+    for name, backend in backends.items():
+        started, cpu_started = time.perf_counter(), _cpu_seconds()
+        extracted = backend.process(pdf_path, pages)
+        seconds = time.perf_counter() - started
+        cpu_seconds = _cpu_seconds() - cpu_started
+        results[name] = {
+            'segundos': seconds,
+            'segundos_cpu': cpu_seconds,
+            'paginas': len(extracted),
+            'paginas_por_segundo': len(extracted) / seconds if seconds else 0.0,
+            'paginas_por_segundo_cpu': len(extracted) / cpu_seconds if cpu_seconds else 0.0,
+            'caracteres': sum(map(len, extracted))
+        }
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from pathlib import Path
+
+    # Como em app.py: o diretório pai permite importar o pacote streamlit_app (OCR da Mistral)
+    project_root = Path(__file__).resolve().parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+    parser = argparse.ArgumentParser(description="Compara a vazão dos mecanismos de OCR em um PDF.")
+    parser.add_argument("arquivo", help="Arquivo PDF")
+    parser.add_argument("--idioma", default="en", help="Código do idioma do documento")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="Resolução do OCR local")
+    parser.add_argument("--processos", type=int, default=None, help="Páginas reconhecidas ao mesmo tempo no OCR local")
+    parser.add_argument("--backends", nargs="+", default=["mistral", "local"], choices=["mistral", "local"])
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    backends = {
+        name: get_ocr_backend(name, arguments.idioma, dpi=arguments.dpi, workers=arguments.processos)
+        if name == 'local' else get_ocr_backend(name)
+        for name in arguments.backends
+    }
+    for name, metrics in benchmark_ocr(arguments.arquivo, backends).items():
+        print(
+            f"{name:>8}: {metrics['segundos']:8.1f}s | {metrics['paginas_por_segundo']:6.2f} páginas/s | "
+            f"{metrics['paginas_por_segundo_cpu']:6.2f} páginas/s de CPU | {metrics['caracteres']} caracteres"
+        )
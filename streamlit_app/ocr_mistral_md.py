@@ -1,50 +1,64 @@
 from mistralai import Mistral
 import os
-from typing import List
-from streamlit_app.config import get_mistral_api_key
+from typing import List, Optional
+from streamlit_app.config import get_mistral_key_pool
+from streamlit_app.utils.rate_limiter import get_rate_limiter
 
-def process_pdf_ocr(pdf_path: str) -> List[str]:
+def process_pdf_ocr(pdf_path: str, pages: Optional[List[int]] = None) -> List[str]:
     """
     Process a PDF file using Mistral's OCR service.
     
     Args:
         pdf_path (str): Path to the PDF file to process
+        pages (List[int], optional): Zero-based page indexes to process; all pages if omitted
         
     Returns:
         List[str]: List of extracted text in markdown format, one item per page
     """
-    # Initialize Mistral client
+    # Get the shared Mistral key pool
     try:
-        api_key = get_mistral_api_key()
-        client = Mistral(api_key=api_key)
+        pool = get_mistral_key_pool()
     except ValueError as e:
         raise ValueError(f"Erro ao inicializar cliente Mistral: {str(e)}")
 
-    # Upload the PDF file
-    with open(pdf_path, "rb") as pdf_file:
-        uploaded_pdf = client.files.upload(
-            file={
-                "file_name": os.path.basename(pdf_path),
-                "content": pdf_file,
+    # Shared across the host's processes (MISTRAL_RPM_LIMIT); upload, signed URL and OCR are 3 requests
+    limiter = get_rate_limiter('mistral')
+
+    def run_ocr(key):
+        limiter.acquire(requests=3)
+        client = Mistral(api_key=key.api_key)
+
+        # Upload the PDF file
+        with open(pdf_path, "rb") as pdf_file:
+            uploaded_pdf = client.files.upload(
+                file={
+                    "file_name": os.path.basename(pdf_path),
+                    "content": pdf_file,
+                },
+                purpose="ocr"
+            )
+
+        # Get signed URL for the uploaded file
+        signed_url = client.files.get_signed_url(file_id=uploaded_pdf.id)
+
+        # Process the document with OCR, restricted to the requested pages
+        options = {"pages": pages} if pages is not None else {}
+        ocr_response = client.ocr.process(
+            model="mistral-ocr-latest",
+            document={
+                "type": "document_url",
+                "document_url": signed_url.url,
             },
-            purpose="ocr"
+            **options
         )
+        return ocr_response, None
 
-    # Get signed URL for the uploaded file
-    signed_url = client.files.get_signed_url(file_id=uploaded_pdf.id)
-
-    # Process the document with OCR
-    ocr_response = client.ocr.process(
-        model="mistral-ocr-latest",
-        document={
-            "type": "document_url",
-            "document_url": signed_url.url,
-        }
-    )
+    # Throttled or failing keys are ejected and the next key is tried
+    ocr_response = pool.call(run_ocr)
 
-    # Extract text from all pages
+    # Extract text from all pages, in document order
     extracted_pages = []
-    for page in ocr_response.pages:
+    for page in sorted(ocr_response.pages, key=lambda page: page.index):
         extracted_pages.append(page.markdown)
 
     return extracted_pages
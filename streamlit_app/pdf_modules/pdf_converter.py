@@ -1,81 +1,305 @@
 import markdown2
+import os
+import re
 from io import BytesIO
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.platypus import SimpleDocTemplate
 from bs4 import BeautifulSoup
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject
 import logging
 
 from pdf_modules.styles import get_custom_styles
 from pdf_modules.html_processor import HTMLProcessor
-from markdown_utils import process_markdown_content
+from markdown_utils import number_named_footnotes, process_markdown_content
 
 logger = logging.getLogger(__name__)
 
-def markdown_to_pdf(markdown_text, output_path=None):
+MARKDOWN_EXTRAS = [
+    'fenced-code-blocks',
+    'footnotes',
+    'tables',
+    'header-ids',
+    'code-friendly',
+    'cuddled-lists',
+    'markdown-in-html',
+    'break-on-newline',
+    'tables',
+    'wiki-tables',
+    'metadata',
+    'footnotes'  # Garante que as notas de rodapé são processadas
+]
+
+# Número da página: centralizado na margem inferior
+PAGE_NUMBER_FONT = 'Helvetica'
+PAGE_NUMBER_SIZE = 9
+PAGE_NUMBER_Y = 36
+
+# Documentos a partir deste tamanho são renderizados em seções paralelas
+PARALLEL_MIN_CHARS = int(os.getenv('PDF_PARALLEL_MIN_CHARS', 150000))
+# Tamanho mínimo de cada parte enviada aos processos (seções menores são agrupadas)
+MIN_PART_CHARS = 30000
+
+_HEADING = re.compile(r'^(#{1,6})\s')
+_FENCE = re.compile(r'^\s*(```|~~~)')
+
+def _new_document(target):
+    """Cria o documento A4 com as margens padrão, gravando em target (buffer ou caminho)."""
+    return SimpleDocTemplate(
+        target,
+        pagesize=A4,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=72,
+        bottomMargin=72
+    )
+
+def _page_number_position(page_width, number):
+    """Retorna a posição x do número da página, centralizado na largura da página."""
+    return (float(page_width) - stringWidth(str(number), PAGE_NUMBER_FONT, PAGE_NUMBER_SIZE)) / 2
+
+def _draw_page_number(canvas, doc):
+    """Desenha o número da página no rodapé (callback de página do ReportLab)."""
+    canvas.saveState()
+    canvas.setFont(PAGE_NUMBER_FONT, PAGE_NUMBER_SIZE)
+    canvas.setFillColor(colors.grey)
+    number = canvas.getPageNumber()
+    canvas.drawString(_page_number_position(doc.pagesize[0], number), PAGE_NUMBER_Y, str(number))
+    canvas.restoreState()
+
+def _build_processor(markdown_text, doc):
+    """
+    Converte o markdown em flowables do ReportLab.
+
+    Args:
+        markdown_text (str): Texto markdown já processado por process_markdown_content
+        doc (SimpleDocTemplate): Documento de destino, que define as dimensões úteis
+
+    Returns:
+        HTMLProcessor: Processador com os flowables e as notas de rodapé encontradas
+    """
+    # Converter markdown para HTML usando markdown2 com extras
+    html = markdown2.markdown(markdown_text, extras=MARKDOWN_EXTRAS)
+
+    # Criar processador HTML com os estilos personalizados
+    processor = HTMLProcessor(get_custom_styles(), doc.width, doc.height)
+
+    # Parse o HTML com BeautifulSoup e processar cada elemento
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup.children:
+        processor.process_element(element)
+    return processor
+
+def split_sections(markdown_text, min_chars=MIN_PART_CHARS):
+    """
+    Divide o markdown em partes nos títulos de nível mais alto e nas quebras de página.
+
+    O nível mais alto é o menor nível de título presente no documento (# se houver,
+    senão ##, e assim por diante). Títulos e quebras de página (\\f) dentro de blocos
+    de código são ignorados, e seções consecutivas são agrupadas até min_chars
+    caracteres, para que cada parte compense o custo de ser enviada a outro processo.
+
+    Args:
+        markdown_text (str): Texto markdown
+        min_chars (int): Tamanho mínimo de cada parte
+
+    Returns:
+        list: Partes do markdown, na ordem do documento
+    """
+    lines = markdown_text.splitlines(keepends=True)
+
+    # Marcar as linhas fora dos blocos de código e o nível de título mais alto
+    outside_code = []
+    top_level = None
+    in_code = False
+    for line in lines:
+        if _FENCE.match(line):
+            in_code = not in_code
+            outside_code.append(False)
+            continue
+        outside_code.append(not in_code)
+        heading = _HEADING.match(line) if not in_code else None
+        if heading and (top_level is None or len(heading.group(1)) < top_level):
+            top_level = len(heading.group(1))
+
+    sections = [[]]
+    for line, outside in zip(lines, outside_code):
+        if outside and line.startswith('\f'):
+            sections.append([])
+            line = line.lstrip('\f')
+        elif outside and top_level and line.startswith('#' * top_level + ' '):
+            sections.append([])
+        sections[-1].append(line)
+
+    parts = []
+    current = ''
+    for section in sections:
+        current += ''.join(section)
+        if len(current) >= min_chars:
+            parts.append(current)
+            current = ''
+    if current.strip() or not parts:
+        parts.append(current)
+    return parts
+
+def render_section(markdown_text):
+    """
+    Renderiza uma parte do documento (executada em um processo do pool).
+
+    As notas de rodapé não são adicionadas: elas são devolvidas para compor a lista
+    global, no fim do documento.
+
+    Returns:
+        tuple: Bytes do PDF da parte (vazio se não houver conteúdo) e notas de rodapé encontradas
+    """
+    buffer = BytesIO()
+    doc = _new_document(buffer)
+    processor = _build_processor(markdown_text, doc)
+    if not processor.get_flowables():
+        return b'', processor.footnotes
+    doc.build(processor.get_flowables())
+    return buffer.getvalue(), processor.footnotes
+
+def _render_footnotes(footnotes):
+    """Renderiza a lista global de notas de rodapé como um PDF à parte."""
+    buffer = BytesIO()
+    doc = _new_document(buffer)
+    processor = HTMLProcessor(get_custom_styles(), doc.width, doc.height)
+    processor.footnotes = footnotes
+    processor.add_footnotes()
+    doc.build(processor.get_flowables())
+    return buffer.getvalue()
+
+def _stamp_page_numbers(writer):
+    """
+    Numera as páginas do PDF concatenado em sequência.
+
+    Em vez de mesclar uma página de sobreposição (o que exigiria interpretar todo o
+    conteúdo de cada página), cada página recebe um pequeno fluxo de conteúdo extra
+    que desenha o número, com o conteúdo original isolado entre q/Q.
+    """
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/' + PAGE_NUMBER_FONT),
+        NameObject('/Encoding'): NameObject('/WinAnsiEncoding')
+    }))
+    save_state = DecodedStreamObject()
+    save_state.set_data(b'q\n')
+    save_state = writer._add_object(save_state)
+
+    for number, page in enumerate(writer.pages, start=1):
+        resources = page['/Resources'].get_object()
+        if '/Font' not in resources:
+            resources[NameObject('/Font')] = DictionaryObject()
+        resources['/Font'].get_object()[NameObject('/FPageNumber')] = font
+
+        x = _page_number_position(page.mediabox.width, number)
+        stamp = DecodedStreamObject()
+        stamp.set_data(
+            f'Q q 0.5 g BT /FPageNumber {PAGE_NUMBER_SIZE} Tf {x:.2f} {PAGE_NUMBER_Y} Td ({number}) Tj ET Q\n'.encode()
+        )
+        contents = page['/Contents']
+        original = list(contents.get_object()) if isinstance(contents.get_object(), ArrayObject) else [contents]
+        page[NameObject('/Contents')] = ArrayObject([save_state, *original, writer._add_object(stamp)])
+
+def merge_sections(sections, footnotes=()):
+    """
+    Concatena os PDFs das seções, numera as páginas e acrescenta a lista global de notas.
+
+    Args:
+        sections (list): Resultados de render_section, na ordem do documento
+        footnotes (list): Notas já numeradas no documento inteiro (de prepare_sections)
+
+    Returns:
+        bytes: PDF completo, com as páginas numeradas em sequência e as notas ao final
+    """
+    writer = PdfWriter()
+    footnotes = list(footnotes)
+    for pdf_bytes, section_footnotes in sections:
+        if pdf_bytes:
+            writer.append(PdfReader(BytesIO(pdf_bytes)))
+        footnotes.extend(section_footnotes)
+
+    # Lista global de notas, na mesma ordem que add_footnotes usaria no documento inteiro
+    if footnotes:
+        writer.append(PdfReader(BytesIO(_render_footnotes(footnotes))))
+
+    _stamp_page_numbers(writer)
+    buffer = BytesIO()
+    writer.write(buffer)
+    logger.info(f"PDF montado a partir de {len(sections)} seções: {len(writer.pages)} páginas")
+    return buffer.getvalue()
+
+def prepare_sections(markdown_text):
+    """
+    Prepara o markdown para a renderização, dividindo documentos grandes em seções.
+
+    As notas nomeadas são numeradas no documento inteiro antes da divisão e voltam
+    à parte, para a lista global de notas.
+
+    Args:
+        markdown_text (str): Texto em formato markdown
+
+    Returns:
+        Tuple contendo as partes (uma só abaixo de PARALLEL_MIN_CHARS) e as notas de rodapé
+    """
+    markdown_text = process_markdown_content(markdown_text)
+    markdown_text, footnotes = number_named_footnotes(markdown_text)
+    if len(markdown_text) < PARALLEL_MIN_CHARS:
+        return [markdown_text], footnotes
+    return split_sections(markdown_text), footnotes
+
+def _write_output(pdf_bytes, output_path):
+    """Retorna os bytes do PDF ou, se output_path for informado, grava o arquivo e retorna None."""
+    if output_path is None:
+        return pdf_bytes
+    with open(output_path, 'wb') as output_file:
+        output_file.write(pdf_bytes)
+    return None
+
+def markdown_to_pdf(markdown_text, output_path=None, executor=None):
     """
     Converte texto markdown para PDF usando ReportLab.
-    
+
+    O layout do ReportLab usa um único núcleo. Com um executor (por exemplo, o pool
+    de processos de utils.pdf_processor), documentos grandes (a partir de
+    PARALLEL_MIN_CHARS caracteres) são divididos por split_sections, as partes são
+    renderizadas em paralelo e os PDFs são concatenados por merge_sections. Nesse
+    caso, cada parte começa em uma nova página e as notas de rodapé ficam em uma
+    página própria no final.
+
     Args:
         markdown_text (str): Texto em formato markdown
         output_path (str, optional): Caminho para salvar o PDF. Se None, retorna os bytes do PDF.
-    
+        executor (Executor, optional): Executor de processos para as seções; sem ele, a renderização é serial
+
     Returns:
         bytes ou None: Se output_path for None, retorna os bytes do PDF. Caso contrário, salva o PDF e retorna None.
     """
     # Processar o conteúdo markdown
-    markdown_text = process_markdown_content(markdown_text)
-    
-    # Converter markdown para HTML usando markdown2 com extras
-    html = markdown2.markdown(
-        markdown_text,
-        extras=[
-            'fenced-code-blocks',
-            'footnotes',
-            'tables',
-            'header-ids',
-            'code-friendly',
-            'cuddled-lists',
-            'markdown-in-html',
-            'break-on-newline',
-            'tables',
-            'wiki-tables',
-            'metadata',
-            'footnotes'  # Garante que as notas de rodapé são processadas
-        ]
-    )
-    
+    parts, footnotes = prepare_sections(markdown_text)
+    if executor is not None and len(parts) > 1:
+        sections = list(executor.map(render_section, parts))
+        return _write_output(merge_sections(sections, footnotes), output_path)
+
     # Criar buffer ou arquivo de saída
     buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer if output_path is None else output_path,
-        pagesize=A4,
-        rightMargin=72, 
-        leftMargin=72,
-        topMargin=72, 
-        bottomMargin=72
-    )
-    
-    # Obter estilos personalizados
-    styles = get_custom_styles()
-    
-    # Criar processador HTML
-    processor = HTMLProcessor(styles, doc.width, doc.height)
-    
-    # Parse o HTML com BeautifulSoup
-    soup = BeautifulSoup(html, 'html.parser')
-    
-    # Processar cada elemento
-    for element in soup.children:
-        processor.process_element(element)
-    
+    doc = _new_document(buffer if output_path is None else output_path)
+
+    processor = _build_processor(''.join(parts), doc)
+
     # Adicionar notas de rodapé
+    processor.footnotes.extend(footnotes)
     processor.add_footnotes()
-    
+
     # Construir o documento
-    doc.build(processor.get_flowables())
-    
+    doc.build(processor.get_flowables(), onFirstPage=_draw_page_number, onLaterPages=_draw_page_number)
+
     # Retornar bytes ou salvar arquivo
     if output_path is None:
         buffer.seek(0)
         return buffer.getvalue()
-    return None 
\ No newline at end of file
+    return None
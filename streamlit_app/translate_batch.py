@@ -0,0 +1,85 @@
+"""
+Tradução de arquivos markdown pela Batch API, sem interação.
+
+Indicada para trabalhos noturnos em volume: os segmentos de todos os arquivos
+são enviados em um único job por idioma de destino (ver traduzir_em_lote), com
+o desconto da Batch API, e as traduções são gravadas no diretório de saída como
+<nome>_<idioma>.md. O texto passa pelo mesmo pré-processamento da interface
+(normalização e união das linhas quebradas pelo OCR).
+
+Uso:
+    PYTHONPATH=.. python -m streamlit_app.translate_batch capitulo1.md capitulo2.md --saida traducoes --destino pt es
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from .translator import traduzir_em_lote
+from .translation_modules.batch import LocalBatchClient
+from .translation_modules.normalization import normalize_text
+from .translation_modules.reflow import reflow_paragraphs
+
+logger = logging.getLogger(__name__)
+
+def traduz_arquivos(arquivos, diretorio_saida, idioma_origem, idiomas_destino, client, intervalo=None):
+    """
+    Traduz os arquivos markdown para cada idioma de destino e grava os resultados.
+
+    Args:
+        arquivos: Caminhos dos arquivos markdown
+        diretorio_saida: Diretório dos arquivos traduzidos (criado se não existir)
+        idioma_origem: Código ISO do idioma de origem
+        idiomas_destino: Códigos ISO dos idiomas de destino (um job por idioma)
+        client: Cliente OpenAI (ou LocalBatchClient)
+        intervalo: Intervalo entre consultas ao job, em segundos (padrão: o de traduzir_em_lote)
+
+    Returns:
+        Lista com os caminhos dos arquivos gravados
+    """
+    diretorio_saida = Path(diretorio_saida)
+    diretorio_saida.mkdir(parents=True, exist_ok=True)
+
+    # O nome do arquivo identifica o documento no job; nomes repetidos em diretórios diferentes são numerados
+    documentos = {}
+    for arquivo in map(Path, arquivos):
+        nome, numero = arquivo.stem, 1
+        while nome in documentos:
+            numero += 1
+            nome = f"{arquivo.stem}_{numero}"
+        documentos[nome] = reflow_paragraphs(normalize_text(arquivo.read_text(encoding="utf-8")))
+
+    opcoes = {} if intervalo is None else {'intervalo': intervalo}
+    gravados = []
+    for idioma_destino in idiomas_destino:
+        traducoes = traduzir_em_lote(
+            documentos, client, idioma_origem, idioma_destino,
+            status_callback=lambda job: logger.info(f"Job {job.id} ({idioma_destino}): {job.status}"),
+            **opcoes
+        )
+        for nome, texto in traducoes.items():
+            caminho = diretorio_saida / f"{nome}_{idioma_destino}.md"
+            caminho.write_text(texto, encoding="utf-8")
+            gravados.append(caminho)
+    return gravados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Traduz arquivos markdown pela Batch API da OpenAI, sem interação.")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos markdown (por exemplo, a saída do OCR)")
+    parser.add_argument("--saida", required=True, help="Diretório dos arquivos traduzidos")
+    parser.add_argument("--origem", default="en", help="Código do idioma de origem")
+    parser.add_argument("--destino", nargs="+", default=["pt"], help="Códigos dos idiomas de destino")
+    parser.add_argument("--intervalo", type=float, default=None, help="Intervalo entre consultas ao job, em segundos")
+    parser.add_argument("--local", action="store_true",
+                        help="Executa o job com LocalBatchClient (requisições comuns, sem a Batch API), para testes")
+    argumentos = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+    cliente = LocalBatchClient(OpenAI()) if argumentos.local else OpenAI()
+    for caminho_gravado in traduz_arquivos(argumentos.arquivos, argumentos.saida, argumentos.origem,
+                                           argumentos.destino, cliente, argumentos.intervalo):
+        print(caminho_gravado)
@@ -0,0 +1,26 @@
+"""
+Pacote com as etapas auxiliares da tradução de documentos.
+"""
+
+from .dedup import classify_segment, context_classes, group_segments, dedup_stats
+from .reflow import reflow_paragraphs, reflow_with_origins
+from .splitter import split_sentences, split_segment
+from .context import get_context_budget, select_context
+from .prompts import PROMPT_VERSION, build_system_prompt, build_user_message, build_edit_message
+from .fuzzy_memory import FuzzyTranslationMemory
+from .placeholders import mask_spans, unmask_spans, placeholders_intact
+from .normalization import normalize_text, token_savings
+from .estimator import BudgetExceededError, estimate_translation
+from .routing import ModelRouter, ModelUsage
+from .hedging import HedgedCaller
+from .concurrency import ConcurrencyController
+from .batch import BatchError, LocalBatchClient, run_batch
+from .local_mt import LocalTranslator, get_local_translator
+
+__all__ = ['classify_segment', 'context_classes', 'group_segments', 'dedup_stats', 'reflow_paragraphs', 'reflow_with_origins',
+           'split_sentences', 'split_segment', 'get_context_budget', 'select_context',
+           'PROMPT_VERSION', 'build_system_prompt', 'build_user_message', 'build_edit_message',
+           'FuzzyTranslationMemory', 'mask_spans', 'unmask_spans', 'placeholders_intact',
+           'normalize_text', 'token_savings', 'BudgetExceededError', 'estimate_translation',
+           'ModelRouter', 'ModelUsage', 'HedgedCaller', 'ConcurrencyController', 'BatchError',
+           'LocalBatchClient', 'run_batch', 'LocalTranslator', 'get_local_translator']
@@ -0,0 +1,304 @@
+"""
+Tradução em lote pela Batch API da OpenAI.
+
+Para traduções sem pressa (filas noturnas de documentos), as requisições já
+preparadas são gravadas em um arquivo JSONL, enviadas como um job da Batch API
+e acompanhadas até a conclusão. Os jobs custam metade do preço das chamadas
+síncronas e não disputam os limites de requisições por minuto.
+
+LocalBatchClient imita a parte da API usada aqui (files e batches) executando
+as requisições com um cliente de chat comum, para testes sem a Batch API.
+"""
+
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+COMPLETION_WINDOW = '24h'
+
+# Desconto da Batch API sobre o preço das chamadas síncronas
+BATCH_PRICE_FACTOR = 0.5
+
+# Limite de requisições por arquivo da Batch API
+MAX_BATCH_REQUESTS = 50_000
+
+DEFAULT_POLL_INTERVAL = 30
+FAILED_STATUSES = {'failed', 'expired', 'cancelled'}
+
+class BatchError(Exception):
+    """Erro lançado quando um job da Batch API termina sem concluir."""
+
+    def __init__(self, batch_id: str, status: str):
+        self.batch_id = batch_id
+        self.status = status
+        super().__init__(f"Job em lote {batch_id} terminou com status '{status}'")
+
+def batch_request(custom_id: str, model: str, system_prompt: str, user_message: str,
+                  temperature: float = 0.6) -> dict:
+    """
+    Monta uma linha do arquivo JSONL da Batch API.
+
+    Args:
+        custom_id (str): Identificador único da requisição dentro do job
+        model (str): Modelo usado na tradução
+        system_prompt (str): Prompt do sistema
+        user_message (str): Mensagem do usuário
+        temperature (float): Temperatura da geração
+
+    Returns:
+        dict: Requisição no formato da Batch API
+    """
+    return {
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': BATCH_ENDPOINT,
+        'body': {
+            'model': model,
+            'messages': [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': user_message}
+            ],
+            'temperature': temperature
+        }
+    }
+
+def write_batch_file(requests: List[dict], path: str) -> str:
+    """
+    Grava as requisições em um arquivo JSONL.
+
+    Args:
+        requests (List[dict]): Requisições montadas por batch_request
+        path (str): Caminho do arquivo
+
+    Returns:
+        str: Caminho do arquivo gravado
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + '\n')
+    return path
+
+def submit_batch(client, path: str, metadata: Optional[dict] = None):
+    """
+    Envia um arquivo JSONL e cria o job em lote.
+
+    Args:
+        client: Cliente OpenAI (ou LocalBatchClient)
+        path (str): Arquivo JSONL com as requisições
+        metadata (dict): Metadados opcionais do job
+
+    Returns:
+        Objeto do job criado
+    """
+    with open(path, 'rb') as f:
+        input_file = client.files.create(file=f, purpose='batch')
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW,
+        metadata=metadata
+    )
+    logger.info(f"Job em lote {batch.id} criado a partir de {path}")
+    return batch
+
+def wait_for_batch(client, batch_id: str, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                   timeout: Optional[float] = None, status_callback: Optional[Callable] = None,
+                   sleep: Callable[[float], None] = time.sleep):
+    """
+    Consulta o job periodicamente até que ele termine.
+
+    Args:
+        client: Cliente OpenAI (ou LocalBatchClient)
+        batch_id (str): Identificador do job
+        poll_interval (float): Intervalo entre consultas, em segundos
+        timeout (float): Tempo máximo de espera; None espera indefinidamente
+        status_callback (Callable): Função que recebe o job a cada consulta
+        sleep (Callable): Função usada para aguardar entre consultas
+
+    Returns:
+        Objeto do job concluído
+
+    Raises:
+        BatchError: Se o job falhar, expirar ou for cancelado
+        TimeoutError: Se o tempo máximo de espera for atingido
+    """
+    started = time.monotonic()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if status_callback:
+            status_callback(batch)
+        if batch.status == 'completed':
+            return batch
+        if batch.status in FAILED_STATUSES:
+            raise BatchError(batch_id, batch.status)
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Job em lote {batch_id} não terminou em {timeout:.0f}s (status '{batch.status}')")
+        sleep(poll_interval)
+
+def _read_file(client, file_id: Optional[str]) -> List[dict]:
+    """Lê as linhas JSONL de um arquivo da API."""
+    if not file_id:
+        return []
+    text = client.files.content(file_id).text
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def read_batch_results(client, batch) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """
+    Lê as respostas de um job concluído.
+
+    Args:
+        client: Cliente OpenAI (ou LocalBatchClient)
+        batch: Objeto do job concluído
+
+    Returns:
+        Tuple contendo (respostas por custom_id com 'content' e 'usage',
+        mensagens de erro por custom_id)
+    """
+    results = {}
+    errors = {}
+    for line in _read_file(client, batch.output_file_id) + _read_file(client, getattr(batch, 'error_file_id', None)):
+        custom_id = line['custom_id']
+        response = line.get('response') or {}
+        if line.get('error') or response.get('status_code') != 200:
+            error = line.get('error') or response.get('body', {}).get('error') or {}
+            errors[custom_id] = error.get('message', 'erro desconhecido')
+            continue
+        body = response['body']
+        results[custom_id] = {
+            'content': body['choices'][0]['message']['content'],
+            'usage': body.get('usage') or {}
+        }
+    return results, errors
+
+def run_batch(client, requests: List[dict], directory: Optional[str] = None,
+              poll_interval: float = DEFAULT_POLL_INTERVAL, timeout: Optional[float] = None,
+              status_callback: Optional[Callable] = None) -> Tuple[Dict[str, dict], Dict[str, str], int]:
+    """
+    Executa requisições pela Batch API, dividindo-as em jobs de até MAX_BATCH_REQUESTS.
+
+    Todos os jobs são criados antes de aguardar o primeiro, para que rodem ao mesmo tempo.
+
+    Args:
+        client: Cliente OpenAI (ou LocalBatchClient)
+        requests (List[dict]): Requisições montadas por batch_request
+        directory (str): Diretório dos arquivos JSONL (padrão: diretório temporário)
+        poll_interval (float): Intervalo entre consultas, em segundos
+        timeout (float): Tempo máximo de espera por job
+        status_callback (Callable): Função que recebe cada job a cada consulta
+
+    Returns:
+        Tuple contendo (respostas por custom_id, erros por custom_id, número de jobs)
+    """
+    if not requests:
+        return {}, {}, 0
+    directory = directory or tempfile.mkdtemp(prefix='traduja_batch_')
+    os.makedirs(directory, exist_ok=True)
+
+    batches = []
+    for start in range(0, len(requests), MAX_BATCH_REQUESTS):
+        path = os.path.join(directory, f"lote_{uuid.uuid4().hex[:8]}.jsonl")
+        write_batch_file(requests[start:start + MAX_BATCH_REQUESTS], path)
+        batches.append(submit_batch(client, path))
+
+    results = {}
+    errors = {}
+    for batch in batches:
+        finished = wait_for_batch(client, batch.id, poll_interval, timeout, status_callback)
+        batch_results, batch_errors = read_batch_results(client, finished)
+        results.update(batch_results)
+        errors.update(batch_errors)
+    return results, errors, len(batches)
+
+class LocalBatchClient:
+    """
+    Substituto local da Batch API para testes.
+
+    Implementa files.create, files.content, batches.create e batches.retrieve
+    executando cada requisição com client.chat.completions.create de um cliente
+    de chat comum. O job é processado na primeira consulta.
+    """
+
+    def __init__(self, chat_client):
+        self._chat_client = chat_client
+        self._files = {}
+        self._batches = {}
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve_batch)
+
+    def _store(self, text: str) -> str:
+        file_id = f"file-local-{uuid.uuid4().hex[:12]}"
+        self._files[file_id] = text
+        return file_id
+
+    def _create_file(self, file, purpose: str):
+        data = file.read() if hasattr(file, 'read') else file
+        text = data.decode('utf-8') if isinstance(data, bytes) else data
+        return SimpleNamespace(id=self._store(text), purpose=purpose)
+
+    def _file_content(self, file_id: str):
+        return SimpleNamespace(text=self._files[file_id], content=self._files[file_id].encode('utf-8'))
+
+    def _create_batch(self, input_file_id: str, endpoint: str, completion_window: str, metadata=None):
+        batch_id = f"batch-local-{uuid.uuid4().hex[:12]}"
+        self._batches[batch_id] = SimpleNamespace(
+            id=batch_id, status='validating', input_file_id=input_file_id, endpoint=endpoint,
+            completion_window=completion_window, metadata=metadata,
+            output_file_id=None, error_file_id=None,
+            request_counts=SimpleNamespace(total=0, completed=0, failed=0)
+        )
+        return self._batches[batch_id]
+
+    def _retrieve_batch(self, batch_id: str):
+        batch = self._batches[batch_id]
+        if batch.status == 'validating':
+            self._process(batch)
+        return batch
+
+    def _process(self, batch):
+        """Executa as requisições do job e grava os arquivos de saída e de erros."""
+        output = io.StringIO()
+        errors = io.StringIO()
+        lines = [json.loads(line) for line in self._files[batch.input_file_id].splitlines() if line.strip()]
+        batch.request_counts.total = len(lines)
+        for request in lines:
+            try:
+                response = self._chat_client.chat.completions.create(**request['body'])
+            except Exception as e:
+                batch.request_counts.failed += 1
+                errors.write(json.dumps({
+                    'id': f"resp-{uuid.uuid4().hex[:12]}", 'custom_id': request['custom_id'],
+                    'response': None, 'error': {'code': type(e).__name__, 'message': str(e)}
+                }, ensure_ascii=False) + '\n')
+                continue
+            batch.request_counts.completed += 1
+            output.write(json.dumps({
+                'id': f"resp-{uuid.uuid4().hex[:12]}", 'custom_id': request['custom_id'],
+                'response': {'status_code': 200, 'body': _completion_to_dict(response)}, 'error': None
+            }, ensure_ascii=False) + '\n')
+        batch.output_file_id = self._store(output.getvalue())
+        batch.error_file_id = self._store(errors.getvalue()) if errors.getvalue() else None
+        batch.status = 'completed'
+
+def _completion_to_dict(response) -> dict:
+    """Converte a resposta de chat em um dicionário no formato da API."""
+    if hasattr(response, 'model_dump'):
+        return response.model_dump()
+    usage = getattr(response, 'usage', None)
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return {
+        'choices': [{'message': {'role': 'assistant', 'content': response.choices[0].message.content}}],
+        'usage': {
+            'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+            'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+            'prompt_tokens_details': {'cached_tokens': getattr(details, 'cached_tokens', 0) or 0}
+        }
+    }
@@ -0,0 +1,252 @@
+"""
+Controle automático de concorrência e do tamanho dos trechos por requisição.
+
+Um número fixo de requisições simultâneas é sempre um chute: pouco desperdiça
+tempo, muito provoca erros 429 e latência de cauda. O controlador ajusta, no
+estilo AIMD (aumento aditivo, redução multiplicativa), dois parâmetros:
+
+- concorrência: requisições em andamento ao mesmo tempo;
+- tokens por requisição: tamanho máximo dos trechos em que um segmento longo é
+  dividido (ver splitter.split_segment), ou seja, quantas frases vão juntas.
+
+Sinais de congestionamento (erros 429/5xx ou timeouts, cota restante baixa nos
+cabeçalhos x-ratelimit-* e latência muito acima da mínima observada) reduzem os
+parâmetros pela metade; cada rodada sem congestionamento os aumenta em um passo.
+A latência é comparada em relação à esperada para o tamanho da resposta (modelo
+de latência do estimator), para que trechos longos não pareçam congestionamento.
+
+As vagas de requisição (try_acquire/acquire/release) são contadas no controlador,
+de modo que várias traduções que compartilham o mesmo controlador (por exemplo,
+um documento traduzido para vários idiomas) respeitam juntas o mesmo limite.
+"""
+
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+from .estimator import BASE_LATENCY_SECONDS, SECONDS_PER_OUTPUT_TOKEN
+
+logger = logging.getLogger(__name__)
+
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 8
+INITIAL_CONCURRENCY = 4
+MIN_BATCH_TOKENS = 150
+MAX_BATCH_TOKENS = 1200
+INITIAL_BATCH_TOKENS = 600
+BATCH_TOKENS_STEP = 75
+DECREASE_FACTOR = 0.5
+# Latência relativa (média móvel) acima deste múltiplo da mínima observada indica congestionamento
+LATENCY_TOLERANCE = 2.0
+EWMA_ALPHA = 0.2
+# A mínima sobe um pouco a cada resposta, para que um valor atípico não fique como referência
+MIN_LATENCY_DRIFT = 1.01
+# Fração da cota restante abaixo da qual a concorrência é reduzida
+LOW_QUOTA_FRACTION = 0.1
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+def is_throttle_error(error: Exception) -> bool:
+    """Indica se o erro é de limite de taxa, sobrecarga do serviço ou timeout."""
+    status = getattr(error, 'status_code', None)
+    if status is None and getattr(error, 'response', None) is not None:
+        status = getattr(error.response, 'status_code', None)
+    if status is not None:
+        return status in THROTTLE_STATUS
+    name = type(error).__name__.lower()
+    return 'ratelimit' in name or 'timeout' in name or 'connection' in name
+
+class ConcurrencyController:
+    """
+    Ajusta concorrência e tokens por requisição a partir das respostas observadas.
+    """
+
+    def __init__(self, min_concurrency: int = MIN_CONCURRENCY, max_concurrency: int = MAX_CONCURRENCY,
+                 initial_concurrency: int = INITIAL_CONCURRENCY, min_batch_tokens: int = MIN_BATCH_TOKENS,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS, initial_batch_tokens: int = INITIAL_BATCH_TOKENS):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_batch_tokens = min_batch_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self._concurrency = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self._batch_tokens = min(max(initial_batch_tokens, min_batch_tokens), max_batch_tokens)
+        self._lock = threading.Lock()
+        self._slot_released = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._ewma = None
+        self._min_latency = None
+        self._last_latency = None
+        self._successes_in_round = 0
+        self._cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.decreases = 0
+        self.last_signal = None
+
+    @property
+    def concurrency(self) -> int:
+        """Número atual de requisições simultâneas."""
+        with self._lock:
+            return int(self._concurrency)
+
+    @property
+    def batch_tokens(self) -> int:
+        """Tamanho máximo atual dos trechos de cada requisição, em tokens."""
+        with self._lock:
+            return self._batch_tokens
+
+    def try_acquire(self) -> bool:
+        """
+        Reserva uma vaga de requisição, se houver.
+
+        Returns:
+            bool: True se a vaga foi reservada (liberar com release)
+        """
+        with self._lock:
+            if self._in_flight < int(self._concurrency):
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Aguarda até haver uma vaga de requisição e a reserva."""
+        with self._slot_released:
+            self._slot_released.wait_for(lambda: self._in_flight < int(self._concurrency))
+            self._in_flight += 1
+
+    def release(self):
+        """Libera uma vaga reservada por try_acquire ou acquire."""
+        with self._slot_released:
+            self._in_flight -= 1
+            self._slot_released.notify_all()
+
+    def _decrease(self, signal: str, now: float):
+        """Reduz os parâmetros, no máximo uma vez por período de latência."""
+        if now < self._cooldown_until:
+            return
+        self._concurrency = max(self.min_concurrency, self._concurrency * DECREASE_FACTOR)
+        self._batch_tokens = max(self.min_batch_tokens, int(self._batch_tokens * DECREASE_FACTOR))
+        self._successes_in_round = 0
+        # Requisições já enviadas ainda refletem os parâmetros antigos
+        self._cooldown_until = now + (self._last_latency or 1.0)
+        self.decreases += 1
+        self.last_signal = signal
+        logger.info(f"Congestionamento ({signal}): concorrência {int(self._concurrency)}, {self._batch_tokens} tokens por requisição")
+
+    def record_success(self, latency: float, output_tokens: int = 0, headers=None):
+        """
+        Registra uma resposta e ajusta os parâmetros.
+
+        Args:
+            latency (float): Duração da requisição, em segundos
+            output_tokens (int): Tokens gerados na resposta
+            headers: Cabeçalhos HTTP da resposta (x-ratelimit-*), se disponíveis
+        """
+        now = time.monotonic()
+        # Latência relativa à esperada para o tamanho da resposta
+        ratio = latency / (BASE_LATENCY_SECONDS + SECONDS_PER_OUTPUT_TOKEN * output_tokens)
+        with self._lock:
+            self.requests += 1
+            self._last_latency = latency
+            self._ewma = ratio if self._ewma is None else EWMA_ALPHA * ratio + (1 - EWMA_ALPHA) * self._ewma
+            self._min_latency = ratio if self._min_latency is None else min(self._min_latency * MIN_LATENCY_DRIFT, ratio)
+
+            if _low_quota(headers):
+                self._decrease('cota baixa', now)
+                return
+            if self._ewma > LATENCY_TOLERANCE * self._min_latency and self._min_latency > 0:
+                self._decrease('latência', now)
+                return
+
+            # Uma rodada completa (tantas respostas quanto a concorrência) sem congestionamento
+            self._successes_in_round += 1
+            if self._successes_in_round >= int(self._concurrency):
+                self._successes_in_round = 0
+                self._concurrency = min(self.max_concurrency, self._concurrency + 1)
+                self._batch_tokens = min(self.max_batch_tokens, self._batch_tokens + BATCH_TOKENS_STEP)
+                self._slot_released.notify_all()
+
+    def record_error(self, error: Exception) -> bool:
+        """
+        Registra uma falha e reduz os parâmetros se ela indicar congestionamento.
+
+        Args:
+            error (Exception): Erro recebido
+
+        Returns:
+            bool: True se o erro é de congestionamento (a requisição pode ser repetida)
+        """
+        throttled = is_throttle_error(error)
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            if throttled:
+                self._decrease(type(error).__name__, time.monotonic())
+        return throttled
+
+    def settings(self) -> dict:
+        """Retorna os parâmetros atuais e as métricas observadas."""
+        with self._lock:
+            return {
+                'concorrencia': int(self._concurrency),
+                'tokens_por_requisicao': self._batch_tokens,
+                'latencia_relativa': self._ewma or 0.0,
+                'ultima_latencia_s': self._last_latency or 0.0,
+                'requisicoes': self.requests,
+                'erros': self.errors,
+                'reducoes': self.decreases,
+                'ultimo_sinal': self.last_signal
+            }
+
+    def wrap(self, client):
+        """
+        Retorna um cliente que informa latência, erros e cabeçalhos ao controlador.
+
+        Usa with_raw_response quando o cliente oferece, para ler os cabeçalhos de cota;
+        os demais atributos são repassados ao cliente original.
+        """
+        return _ObservedClient(client, self)
+
+class _ObservedClient:
+    """Cliente que mede cada chamada a chat.completions.create."""
+
+    def __init__(self, client, controller: ConcurrencyController):
+        self._client = client
+        self._controller = controller
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        completions = self._client.chat.completions
+        raw_api = getattr(completions, 'with_raw_response', None)
+        started = time.monotonic()
+        try:
+            if raw_api is not None:
+                raw = raw_api.create(**kwargs)
+                response, headers = raw.parse(), raw.headers
+            else:
+                response, headers = completions.create(**kwargs), None
+        except Exception as e:
+            self._controller.record_error(e)
+            raise
+        usage = getattr(response, 'usage', None)
+        self._controller.record_success(
+            time.monotonic() - started, getattr(usage, 'completion_tokens', 0) or 0, headers
+        )
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def _low_quota(headers) -> bool:
+    """Verifica nos cabeçalhos se a cota restante de requisições ou tokens está baixa."""
+    if not headers:
+        return False
+    for kind in ('requests', 'tokens'):
+        try:
+            remaining = int(headers.get(f'x-ratelimit-remaining-{kind}'))
+            limit = int(headers.get(f'x-ratelimit-limit-{kind}'))
+        except (TypeError, ValueError):
+            continue
+        if limit and remaining < LOW_QUOTA_FRACTION * limit:
+            return True
+    return False
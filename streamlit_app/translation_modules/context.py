@@ -0,0 +1,109 @@
+"""
+Seleção das linhas de contexto enviadas junto com cada trecho a traduzir.
+
+O contexto é limitado por um orçamento de tokens: as linhas vizinhas mais
+próximas entram primeiro e a última que não couber inteira é truncada.
+"""
+
+from typing import Callable, List
+
+# Número máximo de linhas vizinhas em cada direção
+MAX_CONTEXT_LINES = 3
+
+# Orçamento padrão de tokens de contexto (anteriores + posteriores)
+DEFAULT_CONTEXT_BUDGET = 240
+
+# Orçamentos por par de idiomas (origem, destino). Idiomas com mais tokens por
+# palavra precisam de um orçamento maior para transmitir o mesmo contexto.
+CONTEXT_TOKEN_BUDGETS = {
+    ('de', 'pt'): 300,
+    ('fr', 'pt'): 280,
+    ('it', 'pt'): 280,
+    ('es', 'pt'): 260,
+}
+
+# Fração do orçamento reservada às linhas anteriores
+PREVIOUS_SHARE = 0.6
+
+# Uma linha só é truncada se sobrarem pelo menos estes tokens no orçamento
+MIN_TRUNCATED_TOKENS = 16
+
+def get_context_budget(source_language: str, target_language: str) -> int:
+    """
+    Retorna o orçamento de tokens de contexto para um par de idiomas.
+
+    Args:
+        source_language (str): Código ISO do idioma de origem
+        target_language (str): Código ISO do idioma de destino
+
+    Returns:
+        int: Número máximo de tokens de contexto por requisição
+    """
+    return CONTEXT_TOKEN_BUDGETS.get((source_language, target_language), DEFAULT_CONTEXT_BUDGET)
+
+def truncate_to_budget(text: str, budget: int, count_fn: Callable[[str], float], keep_end: bool = False) -> str:
+    """
+    Trunca um texto em limite de palavra para caber no orçamento.
+
+    Args:
+        text (str): Texto a ser truncado
+        budget (int): Número máximo de tokens
+        count_fn (Callable): Função que conta os tokens de um texto
+        keep_end (bool): Se True, mantém o final do texto em vez do início
+
+    Returns:
+        str: Texto truncado, marcado com reticências
+    """
+    words = text.split()
+    low, high = 0, len(words)
+    # Busca binária pelo maior número de palavras que cabe no orçamento
+    while low < high:
+        middle = (low + high + 1) // 2
+        part = words[-middle:] if keep_end else words[:middle]
+        if count_fn(' '.join(part)) + 1 <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    if low == 0:
+        return ''
+    if keep_end:
+        return '… ' + ' '.join(words[-low:])
+    return ' '.join(words[:low]) + ' …'
+
+def select_context(lines: List[str], index: int, previous: bool, budget: int,
+                   count_fn: Callable[[str], float]) -> List[str]:
+    """
+    Seleciona as linhas vizinhas não vazias que cabem no orçamento de tokens.
+
+    Args:
+        lines (List[str]): Linhas do documento
+        index (int): Índice da linha que será traduzida
+        previous (bool): True para linhas anteriores, False para posteriores
+        budget (int): Número máximo de tokens de contexto
+        count_fn (Callable): Função que conta os tokens de um texto
+
+    Returns:
+        List[str]: Linhas de contexto na ordem do documento
+    """
+    selected = []
+    remaining = budget
+    step = -1 if previous else 1
+    pos = index + step
+    while 0 <= pos < len(lines) and len(selected) < MAX_CONTEXT_LINES and remaining > 0:
+        line = lines[pos]
+        pos += step
+        if not line.strip():
+            continue
+        tokens = count_fn(line)
+        if tokens > remaining:
+            # Manter a parte da linha mais próxima do trecho traduzido
+            if remaining >= MIN_TRUNCATED_TOKENS:
+                truncated = truncate_to_budget(line, remaining, count_fn, keep_end=previous)
+                if truncated:
+                    selected.append(truncated)
+            break
+        selected.append(line)
+        remaining -= tokens
+    if previous:
+        selected.reverse()
+    return selected
@@ -0,0 +1,127 @@
+"""
+Deduplicação de segmentos repetidos dentro de um mesmo documento.
+
+O OCR costuma repetir linhas idênticas (legendas de figuras, cabeçalhos de
+tabelas, prefixos de listas). Cada par (segmento, classe de contexto) distinto
+é traduzido uma única vez por tarefa e o resultado é replicado para todas as
+ocorrências. A classe de contexto vem da estrutura ao redor da linha (ver
+context_classes), então o mesmo texto como parágrafo, continuação de um item
+de lista ou legenda junto de uma tabela é traduzido separadamente.
+"""
+
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Classes de contexto, na ordem em que são testadas
+_CLASSES_SEGMENTO = [
+    ('titulo', re.compile(r'^#{1,6}\s')),
+    ('tabela', re.compile(r'^\|')),
+    ('lista', re.compile(r'^([-*+]|\d+[.)])\s')),
+    ('citacao', re.compile(r'^>')),
+    ('imagem', re.compile(r'^!\[')),
+    ('legenda', re.compile(r'^(fig(ure|ura)?|table|tabela|quadro|gr[aá]fico|chart)\.?\s*\d+', re.IGNORECASE)),
+]
+
+# Blocos cujas linhas sem marcação (sem linha vazia antes) continuam o bloco
+_CLASSES_BLOCO = {'tabela', 'lista', 'citacao'}
+# Vizinhos que tornam uma linha isolada sem marcação uma legenda
+_CLASSES_ANCORA = {'tabela', 'imagem'}
+
+def classify_segment(segment: str) -> str:
+    """
+    Classifica um segmento de acordo com sua estrutura markdown.
+    
+    Args:
+        segment (str): Linha do documento
+        
+    Returns:
+        str: Nome da classe de contexto do segmento
+    """
+    stripped = segment.strip()
+    for nome, padrao in _CLASSES_SEGMENTO:
+        if padrao.match(stripped):
+            return nome
+    return 'paragrafo'
+
+def context_classes(lines: List[str]) -> List[Optional[str]]:
+    """
+    Classifica cada linha pela estrutura ao redor dela.
+    
+    Linhas com marcação própria ficam com a classe da marcação (classify_segment).
+    Uma linha sem marcação logo abaixo de uma tabela, lista ou citação, sem linha
+    vazia entre elas, continua o bloco e recebe a classe dele; uma linha isolada
+    logo antes ou depois de uma tabela ou imagem é uma legenda; as demais são
+    parágrafos.
+    
+    Args:
+        lines (List[str]): Linhas do documento
+        
+    Returns:
+        List: Classe de contexto de cada linha (None para as linhas vazias)
+    """
+    proprias = [classify_segment(line) if line.strip() else None for line in lines]
+    
+    # Classe da linha não vazia seguinte (percorrendo de trás para frente)
+    seguintes = [None] * len(lines)
+    seguinte = None
+    for i in range(len(lines) - 1, -1, -1):
+        seguintes[i] = seguinte
+        if proprias[i] is not None:
+            seguinte = proprias[i]
+    
+    classes = []
+    bloco = None
+    anterior = None
+    for i, propria in enumerate(proprias):
+        if propria is None:
+            bloco = None
+            classes.append(None)
+            continue
+        if propria != 'paragrafo':
+            bloco = propria if propria in _CLASSES_BLOCO else None
+            classes.append(propria)
+        elif bloco is not None:
+            classes.append(bloco)
+        elif anterior in _CLASSES_ANCORA or seguintes[i] in _CLASSES_ANCORA:
+            classes.append('legenda')
+        else:
+            classes.append(propria)
+        anterior = propria
+    return classes
+
+def group_segments(lines: List[str]) -> "OrderedDict[Tuple[str, str], List[int]]":
+    """
+    Agrupa as linhas não vazias por (segmento, classe de contexto).
+    
+    Args:
+        lines (List[str]): Linhas do documento
+        
+    Returns:
+        OrderedDict: Chave (segmento, classe de context_classes) mapeada para os
+        índices de todas as ocorrências, na ordem da primeira aparição
+    """
+    grupos = OrderedDict()
+    for i, (line, classe) in enumerate(zip(lines, context_classes(lines))):
+        if classe is None:
+            continue
+        grupos.setdefault((line.strip(), classe), []).append(i)
+    return grupos
+
+def dedup_stats(groups: Dict[Tuple[str, str], List[int]]) -> dict:
+    """
+    Calcula as estatísticas de deduplicação de um agrupamento.
+    
+    Args:
+        groups (dict): Resultado de group_segments
+        
+    Returns:
+        dict: Total de segmentos, segmentos únicos e ocorrências reaproveitadas
+    """
+    total = sum(len(ocorrencias) for ocorrencias in groups.values())
+    return {
+        'segmentos': total,
+        'unicos': len(groups),
+        'duplicados': total - len(groups),
+        'tokens_economizados': 0
+    }
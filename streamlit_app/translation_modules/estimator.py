@@ -0,0 +1,165 @@
+"""
+Estimativa prévia de custo e tempo da tradução.
+
+Logo após o OCR, os tokens de todos os segmentos são contados de uma vez
+(tiktoken em lote + numpy/pandas) para projetar tokens de entrada e saída,
+custo e tempo de execução antes de qualquer chamada ao modelo. O orçamento
+máximo informado pelo usuário também é verificado aqui.
+"""
+
+import numpy as np
+import pandas as pd
+import tiktoken
+
+from ..language_utils import NOMES_IDIOMAS
+from .context import DEFAULT_CONTEXT_BUDGET, PREVIOUS_SHARE, MAX_CONTEXT_LINES, get_context_budget
+from .dedup import group_segments
+from .prompts import build_system_prompt
+from .routing import model_price
+
+# Razão esperada entre tokens de saída e tokens do segmento, por idioma de destino
+OUTPUT_TOKEN_RATIO = {
+    'en': 1.0,
+    'pt': 1.15,
+    'es': 1.15,
+    'fr': 1.2,
+    'de': 1.2,
+    'it': 1.15,
+}
+DEFAULT_OUTPUT_TOKEN_RATIO = 1.2
+
+# Tokens fixos da mensagem do usuário (cabeçalhos do contexto e do trecho)
+MESSAGE_OVERHEAD_TOKENS = 40
+
+# Modelo de latência por requisição: tempo fixo + tempo por token de saída
+BASE_LATENCY_SECONDS = 0.6
+SECONDS_PER_OUTPUT_TOKEN = 0.015
+
+class BudgetExceededError(Exception):
+    """Erro lançado quando a próxima requisição ultrapassaria o orçamento máximo."""
+
+    def __init__(self, spent: float, budget: float):
+        self.spent = spent
+        self.budget = budget
+        super().__init__(
+            f"Orçamento de ${budget:.4f} atingido: ${spent:.4f} já gastos e a próxima requisição o ultrapassaria"
+        )
+
+def output_token_ratio(target_language: str) -> float:
+    """Retorna a razão esperada entre tokens de saída e de entrada para o idioma de destino."""
+    return OUTPUT_TOKEN_RATIO.get(target_language, DEFAULT_OUTPUT_TOKEN_RATIO)
+
+def count_tokens_batch(texts, model: str) -> np.ndarray:
+    """
+    Conta os tokens de vários textos de uma vez.
+
+    Args:
+        texts: Lista de textos
+        model (str): Modelo para o qual contar tokens
+
+    Returns:
+        np.ndarray: Número de tokens de cada texto
+    """
+    if not texts:
+        return np.zeros(0, dtype=np.int64)
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+        return np.fromiter((len(tokens) for tokens in encoding.encode_batch(list(texts))), dtype=np.int64, count=len(texts))
+    except Exception:
+        # Mesma aproximação usada por count_tokens quando o tiktoken falha
+        return np.ceil(np.array([len(text.split()) for text in texts]) * 1.3).astype(np.int64)
+
+def ensure_within_budget(spent: float, input_tokens: float, expected_output_tokens: float,
+                         budget, price_input: float, price_output: float):
+    """
+    Verifica se a próxima requisição cabe no orçamento.
+
+    Args:
+        spent (float): Custo já gasto na tarefa
+        input_tokens (float): Tokens de entrada da próxima requisição
+        expected_output_tokens (float): Tokens de saída esperados
+        budget (float ou None): Orçamento máximo; None desativa a verificação
+        price_input (float): Preço por token de entrada
+        price_output (float): Preço por token de saída
+
+    Raises:
+        BudgetExceededError: Se a requisição ultrapassaria o orçamento
+    """
+    if budget is None:
+        return
+    projected = spent + input_tokens * price_input + expected_output_tokens * price_output
+    if projected > budget:
+        raise BudgetExceededError(spent, budget)
+
+def estimate_translation(text: str, source_language: str, target_language: str, router,
+                         model_prices: dict, max_segment_tokens: int,
+                         concurrency: int = 1, piece_concurrency: int = 1) -> dict:
+    """
+    Projeta tokens, custo e tempo da tradução de um documento.
+
+    A estimativa considera a deduplicação de segmentos, a divisão de segmentos
+    longos, o prompt do sistema, o contexto limitado pelo orçamento de tokens e
+    o modelo escolhido pelo roteador para cada segmento.
+
+    Args:
+        text (str): Texto que será traduzido
+        source_language (str): Código ISO do idioma de origem
+        target_language (str): Código ISO do idioma de destino
+        router (ModelRouter): Roteador que escolhe o modelo de cada segmento
+        model_prices (dict): Preços (entrada, saída) por token de cada modelo
+        max_segment_tokens (int): Limite de tokens a partir do qual um segmento é dividido
+        concurrency (int): Número de segmentos traduzidos em paralelo
+        piece_concurrency (int): Número de trechos de um segmento dividido traduzidos em paralelo
+
+    Returns:
+        dict: Segmentos, requisições, tokens, custos e tempo estimado em segundos
+    """
+    groups = group_segments(text.split('\n'))
+    segments = [segment for segment, _ in groups.keys()]
+    total_segments = sum(len(occurrences) for occurrences in groups.values())
+
+    system_prompt = build_system_prompt(
+        NOMES_IDIOMAS.get(source_language, source_language),
+        NOMES_IDIOMAS.get(target_language, target_language)
+    )
+    model = router.default_model
+    system_tokens = int(count_tokens_batch([system_prompt], model)[0])
+    budget = get_context_budget(source_language, target_language) if segments else DEFAULT_CONTEXT_BUDGET
+
+    df = pd.DataFrame({'tokens': count_tokens_batch(segments, model)})
+    df['requisicoes'] = np.maximum(1, np.ceil(df['tokens'] / max_segment_tokens)).astype(np.int64)
+
+    # Contexto: soma das linhas vizinhas, limitada pela parte do orçamento de cada lado
+    previous = df['tokens'].shift(1).rolling(MAX_CONTEXT_LINES, min_periods=1).sum().fillna(0)
+    following = df['tokens'][::-1].shift(1).rolling(MAX_CONTEXT_LINES, min_periods=1).sum().fillna(0)[::-1]
+    df['contexto'] = (
+        np.minimum(previous, int(budget * PREVIOUS_SHARE))
+        + np.minimum(following, budget - int(budget * PREVIOUS_SHARE))
+    )
+
+    df['entrada'] = df['requisicoes'] * (system_tokens + df['contexto'] + MESSAGE_OVERHEAD_TOKENS) + df['tokens']
+    df['saida'] = df['tokens'] * output_token_ratio(target_language)
+    df['modelo'] = [router.route(segment, tokens) for segment, tokens in zip(segments, df['tokens'])]
+    prices = df['modelo'].map(lambda model: model_price(model_prices, model))
+
+    # Trechos de um segmento dividido rodam em paralelo, em rodadas de piece_concurrency
+    rounds = np.ceil(df['requisicoes'] / max(1, piece_concurrency))
+    df['latencia'] = rounds * (BASE_LATENCY_SECONDS + SECONDS_PER_OUTPUT_TOKEN * df['saida'] / df['requisicoes'])
+
+    input_tokens = int(df['entrada'].sum())
+    output_tokens = int(df['saida'].sum())
+    input_cost = float((df['entrada'] * prices.str[0]).sum())
+    output_cost = float((df['saida'] * prices.str[1]).sum())
+
+    return {
+        'segmentos': total_segments,
+        'segmentos_unicos': len(segments),
+        'requisicoes': int(df['requisicoes'].sum()),
+        'tokens_entrada': input_tokens,
+        'tokens_saida': output_tokens,
+        'custo_entrada': input_cost,
+        'custo_saida': output_cost,
+        'custo_total': input_cost + output_cost,
+        'segmentos_por_modelo': df['modelo'].value_counts().to_dict(),
+        'tempo_estimado_s': float(df['latencia'].sum()) / max(1, concurrency)
+    }
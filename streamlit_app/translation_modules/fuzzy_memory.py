@@ -0,0 +1,248 @@
+"""
+Memória de tradução aproximada para segmentos quase idênticos.
+
+Segmentos que diferem apenas em números (anos, citações, numeração) ou em poucas
+palavras são comuns em documentos longos. A memória indexa os segmentos já
+traduzidos com MinHash/LSH sobre trigramas de caracteres e permite:
+
+- reaproveitar diretamente a tradução anterior, substituindo os números, quando
+  os segmentos são idênticos a menos dos números;
+- pedir ao modelo apenas a adaptação de uma tradução anterior muito semelhante.
+"""
+
+import random
+import re
+import threading
+import time
+import zlib
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+from .dedup import classify_segment
+
+# Similaridade (Jaccard dos trigramas) mínima para sugerir a adaptação de uma tradução anterior
+EDIT_THRESHOLD = 0.8
+
+# Segmentos mais curtos que isso não são adaptados, apenas reaproveitados diretamente
+MIN_EDIT_LENGTH = 30
+
+# Parâmetros do MinHash/LSH: BANDS * ROWS funções de hash
+BANDS = 16
+ROWS = 4
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(42)
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)*')
+
+FuzzyMatch = namedtuple('FuzzyMatch', ['similarity', 'source', 'translation', 'direct'])
+
+def mask_numbers(text: str) -> Tuple[str, List[str]]:
+    """
+    Substitui os números do texto por '#'.
+
+    Args:
+        text (str): Texto original
+
+    Returns:
+        Tuple contendo o texto mascarado e a lista de números, na ordem
+    """
+    return _NUMBER.sub('#', text), _NUMBER.findall(text)
+
+def substitute_numbers(translation: str, old_numbers: List[str], new_numbers: List[str]) -> Optional[str]:
+    """
+    Troca na tradução os números do segmento antigo pelos do novo segmento.
+
+    Só é possível quando a tradução contém exatamente os mesmos números do
+    segmento antigo, na mesma ordem.
+
+    Returns:
+        str ou None: Tradução com os novos números, ou None se não for possível
+    """
+    if len(old_numbers) != len(new_numbers):
+        return None
+    if _NUMBER.findall(translation) != old_numbers:
+        return None
+    replacements = iter(new_numbers)
+    return _NUMBER.sub(lambda _: next(replacements), translation)
+
+def _shingles(text: str) -> set:
+    """Retorna os trigramas de caracteres do texto normalizado."""
+    normalized = f"  {' '.join(text.lower().split())}  "
+    return {normalized[i:i + 3] for i in range(len(normalized) - 2)}
+
+def _signature(shingles: set) -> Tuple[int, ...]:
+    """Calcula a assinatura MinHash de um conjunto de trigramas."""
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _HASH_PARAMS)
+
+class FuzzyTranslationMemory:
+    """
+    Índice em memória dos segmentos já traduzidos em uma tarefa.
+    """
+
+    def __init__(self, edit_threshold: float = EDIT_THRESHOLD):
+        self.edit_threshold = edit_threshold
+        self._lock = threading.Lock()
+        self._entries = []
+        self._buckets = {}
+        self._by_masked = {}
+        self._pending = {}
+        self._next_pending = 0
+        self.lookups = 0
+        self.direct_hits = 0
+        self.edit_hits = 0
+        self.lookup_seconds = 0.0
+
+    def add(self, source: str, translation: str, segment_class: Optional[str] = None):
+        """
+        Adiciona um segmento traduzido à memória.
+
+        Args:
+            source (str): Segmento no idioma de origem
+            translation (str): Tradução do segmento
+            segment_class (str, optional): Classe de contexto (padrão: classify_segment(source))
+        """
+        masked, numbers = mask_numbers(source.strip())
+        segment_class = segment_class or classify_segment(source)
+        shingles = _shingles(masked)
+        if not shingles:
+            return
+        signature = _signature(shingles)
+        with self._lock:
+            entry_id = len(self._entries)
+            self._entries.append((source.strip(), translation, numbers, segment_class, shingles))
+            self._by_masked.setdefault((masked, segment_class), entry_id)
+            for band in range(BANDS):
+                key = (band, signature[band * ROWS:(band + 1) * ROWS])
+                self._buckets.setdefault(key, []).append(entry_id)
+
+    def reserve(self, source: str, segment_class: Optional[str] = None) -> int:
+        """
+        Registra um segmento cuja tradução está em andamento.
+
+        Enquanto ele não termina, pending_match indica os segmentos que poderiam ser
+        servidos pela memória quando a tradução dele for adicionada.
+
+        Args:
+            source (str): Segmento no idioma de origem
+            segment_class (str, optional): Classe de contexto (padrão: classify_segment(source))
+
+        Returns:
+            int: Identificador da reserva, a ser passado a release
+        """
+        masked, _ = mask_numbers(source.strip())
+        segment_class = segment_class or classify_segment(source)
+        with self._lock:
+            reservation = self._next_pending
+            self._next_pending += 1
+            self._pending[reservation] = (masked, segment_class, _shingles(masked))
+            return reservation
+
+    def release(self, reservation: int):
+        """Encerra a reserva de um segmento (depois de add, ou se a tradução falhou)."""
+        with self._lock:
+            self._pending.pop(reservation, None)
+
+    def pending_match(self, source: str, segment_class: Optional[str] = None) -> bool:
+        """
+        Indica se um segmento em andamento é semelhante o bastante para servir este.
+
+        Usa os mesmos critérios de lookup: idêntico a menos dos números ou, para
+        segmentos longos, similaridade acima de edit_threshold na mesma classe.
+
+        Args:
+            source (str): Segmento no idioma de origem
+            segment_class (str, optional): Classe de contexto (padrão: classify_segment(source))
+
+        Returns:
+            bool: True se vale aguardar a conclusão do segmento em andamento
+        """
+        source = source.strip()
+        masked, _ = mask_numbers(source)
+        segment_class = segment_class or classify_segment(source)
+        shingles = _shingles(masked) if len(source) >= MIN_EDIT_LENGTH else None
+        with self._lock:
+            # Poucos segmentos em andamento (o limite de concorrência): comparação direta
+            for pending_masked, pending_class, pending_shingles in self._pending.values():
+                if pending_class != segment_class:
+                    continue
+                if pending_masked == masked:
+                    return True
+                if shingles and pending_shingles:
+                    similarity = len(shingles & pending_shingles) / len(shingles | pending_shingles)
+                    if similarity >= self.edit_threshold:
+                        return True
+        return False
+
+    def lookup(self, source: str, segment_class: Optional[str] = None) -> Optional[FuzzyMatch]:
+        """
+        Procura uma tradução anterior para um segmento semelhante, da mesma classe de contexto.
+
+        Args:
+            source (str): Segmento no idioma de origem
+            segment_class (str, optional): Classe de contexto (padrão: classify_segment(source))
+
+        Returns:
+            FuzzyMatch ou None: Melhor correspondência; `direct` indica que a
+            tradução já está pronta para uso (números substituídos)
+        """
+        start = time.perf_counter()
+        try:
+            return self._lookup(source.strip(), segment_class or classify_segment(source))
+        finally:
+            with self._lock:
+                self.lookups += 1
+                self.lookup_seconds += time.perf_counter() - start
+
+    def _lookup(self, source: str, segment_class: str) -> Optional[FuzzyMatch]:
+        masked, numbers = mask_numbers(source)
+
+        with self._lock:
+            # Segmento idêntico a menos dos números: reaproveitar diretamente
+            entry_id = self._by_masked.get((masked, segment_class))
+            if entry_id is not None:
+                old_source, translation, old_numbers, _, _ = self._entries[entry_id]
+                direct = substitute_numbers(translation, old_numbers, numbers)
+                if direct is not None:
+                    self.direct_hits += 1
+                    return FuzzyMatch(1.0, old_source, direct, True)
+
+            if len(source) < MIN_EDIT_LENGTH:
+                return None
+
+            shingles = _shingles(masked)
+            signature = _signature(shingles)
+            candidates = set()
+            for band in range(BANDS):
+                candidates.update(self._buckets.get((band, signature[band * ROWS:(band + 1) * ROWS]), []))
+
+            best = None
+            for candidate in candidates:
+                old_source, translation, _, old_class, old_shingles = self._entries[candidate]
+                if old_class != segment_class:
+                    continue
+                similarity = len(shingles & old_shingles) / len(shingles | old_shingles)
+                if similarity >= self.edit_threshold and (best is None or similarity > best.similarity):
+                    best = FuzzyMatch(similarity, old_source, translation, False)
+            if best is not None:
+                self.edit_hits += 1
+            return best
+
+    def stats(self) -> dict:
+        """
+        Retorna as métricas de uso da memória.
+
+        Returns:
+            dict: Consultas, acertos diretos, adaptações, taxa de acerto e latência média
+        """
+        with self._lock:
+            hits = self.direct_hits + self.edit_hits
+            return {
+                'consultas': self.lookups,
+                'reaproveitados': self.direct_hits,
+                'adaptados': self.edit_hits,
+                'taxa_acerto': hits / self.lookups if self.lookups else 0.0,
+                'latencia_media_ms': 1000 * self.lookup_seconds / self.lookups if self.lookups else 0.0
+            }
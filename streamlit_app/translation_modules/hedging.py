@@ -0,0 +1,216 @@
+"""
+Requisições duplicadas (hedged requests) para reduzir a latência de cauda.
+
+Em um documento longo, as chamadas mais lentas determinam o tempo total da
+tarefa. Quando uma chamada ultrapassa um percentil da latência das chamadas
+recentes do mesmo modelo, uma cópia é enviada; a primeira resposta vence e a
+outra é descartada. Os tokens estimados das cópias são limitados a uma fração dos
+tokens de todas as chamadas.
+
+O cliente síncrono não permite interromper uma requisição HTTP já iniciada: a
+chamada perdedora termina em uma thread em segundo plano (daemon). Ela também é
+cobrada, então o resultado dela é entregue a on_discard, para que quem chama
+contabilize o uso, e cada cópia pode ser vetada por reserve (por exemplo, pelo
+orçamento da tarefa).
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HEDGE_PERCENTILE = 95
+LATENCY_WINDOW = 50
+MIN_SAMPLES = 8
+MIN_HEDGE_DELAY = 2.0
+# Fração máxima dos tokens estimados de todas as chamadas que pode ser gasta em cópias
+MAX_EXTRA_FRACTION = 0.1
+
+class HedgedCaller:
+    """
+    Executa chamadas com uma cópia de reserva quando a original demora demais.
+    """
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, window: int = LATENCY_WINDOW,
+                 min_samples: int = MIN_SAMPLES, min_delay: float = MIN_HEDGE_DELAY,
+                 max_extra_fraction: float = MAX_EXTRA_FRACTION):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_extra_fraction = max_extra_fraction
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens = 0.0
+        self.hedged = 0
+        self.hedged_tokens = 0.0
+        self.hedge_wins = 0
+        self.capped = 0
+        self.vetoed = 0
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """
+        Retorna o tempo de espera antes de enviar uma cópia.
+
+        Args:
+            key (str): Grupo de latências (normalmente o modelo)
+
+        Returns:
+            float ou None: Segundos de espera; None enquanto não há amostras suficientes
+        """
+        with self._lock:
+            samples = list(self._latencies[key])
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, float(np.percentile(samples, self.percentile)))
+
+    def _record(self, key: str, latency: float):
+        with self._lock:
+            self._latencies[key].append(latency)
+
+    def _timed(self, fn: Callable, key: str):
+        started = time.monotonic()
+        result = fn()
+        self._record(key, time.monotonic() - started)
+        return result
+
+    def _submit(self, fn: Callable, key: str) -> Future:
+        """Executa a chamada em uma thread daemon, que não bloqueia o encerramento se for abandonada."""
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        def run():
+            try:
+                future.set_result(self._timed(fn, key))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f'hedge-{key}', daemon=True).start()
+        return future
+
+    def _reserve_hedge(self, weight: float, reserve: Optional[Callable[[], bool]] = None) -> bool:
+        """Reserva uma cópia se o limite de tokens extras e quem chama (reserve) permitirem."""
+        with self._lock:
+            if self.hedged_tokens + weight > self.max_extra_fraction * self.tokens:
+                self.capped += 1
+                return False
+            self.hedged += 1
+            self.hedged_tokens += weight
+        if reserve is None or reserve():
+            return True
+        with self._lock:
+            self.hedged -= 1
+            self.hedged_tokens -= weight
+            self.vetoed += 1
+        return False
+
+    def call(self, fn: Callable, key: str = 'default', weight: float = 1.0,
+             reserve: Optional[Callable[[], bool]] = None, on_discard: Optional[Callable] = None):
+        """
+        Executa fn, enviando uma cópia se ela passar do percentil de latência.
+
+        Args:
+            fn (Callable): Função sem argumentos que faz a requisição
+            key (str): Grupo de latências (normalmente o modelo)
+            weight (float): Tokens estimados da chamada, para o limite de cópias
+            reserve (Callable, optional): Chamada antes de enviar uma cópia; False impede a cópia
+            on_discard (Callable, optional): Recebe o resultado da chamada descartada quando ela
+                termina (None se ela falhar); chamada uma vez para cada cópia enviada
+
+        Returns:
+            O resultado da primeira chamada concluída com sucesso
+        """
+        with self._lock:
+            self.calls += 1
+            self.tokens += weight
+        delay = self.hedge_delay(key)
+        if delay is None:
+            return self._timed(fn, key)
+
+        primary = self._submit(fn, key)
+
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._reserve_hedge(weight, reserve):
+            return primary.result()
+
+        logger.info(f"Chamada acima de {delay:.1f}s ({key}); enviando cópia")
+        hedge = self._submit(fn, key)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                if future is hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                if on_discard:
+                    discarded = hedge if future is primary else primary
+                    discarded.add_done_callback(
+                        lambda f: on_discard(None if f.exception() is not None else f.result())
+                    )
+                return future.result()
+        if on_discard:
+            on_discard(None)
+        raise error
+
+    def bind(self, reserve: Optional[Callable[[str, float], bool]] = None,
+             on_discard: Optional[Callable[[str, float, object], None]] = None) -> 'BoundHedgedCaller':
+        """
+        Retorna uma visão deste HedgedCaller com a contabilidade das cópias de uma tarefa.
+
+        As latências e os limites continuam compartilhados; reserve e on_discard
+        recebem também o grupo (modelo) e os tokens estimados de cada chamada.
+
+        Args:
+            reserve (Callable, optional): (key, weight) -> bool, antes de enviar uma cópia
+            on_discard (Callable, optional): (key, weight, resultado ou None), para a chamada descartada
+
+        Returns:
+            BoundHedgedCaller: Objeto com o mesmo método call
+        """
+        return BoundHedgedCaller(self, reserve, on_discard)
+
+    def stats(self) -> dict:
+        """Retorna as métricas das cópias enviadas."""
+        with self._lock:
+            samples = [latency for window in self._latencies.values() for latency in window]
+            return {
+                'chamadas': self.calls,
+                'copias': self.hedged,
+                'copias_vencedoras': self.hedge_wins,
+                'bloqueadas_pelo_limite': self.capped,
+                'bloqueadas_pelo_orcamento': self.vetoed,
+                'tokens_copias': self.hedged_tokens,
+                'taxa_copias': self.hedged / self.calls if self.calls else 0.0,
+                'latencia_p50_s': float(np.percentile(samples, 50)) if samples else 0.0,
+                'latencia_p99_s': float(np.percentile(samples, 99)) if samples else 0.0
+            }
+
+class BoundHedgedCaller:
+    """
+    HedgedCaller ligado à contabilidade das cópias de uma tarefa (ver HedgedCaller.bind).
+    """
+
+    def __init__(self, caller: HedgedCaller, reserve=None, on_discard=None):
+        self.caller = caller
+        self._reserve = reserve
+        self._on_discard = on_discard
+
+    def call(self, fn: Callable, key: str = 'default', weight: float = 1.0):
+        """Executa fn como HedgedCaller.call, com a contabilidade da tarefa."""
+        reserve = (lambda: self._reserve(key, weight)) if self._reserve else None
+        on_discard = (lambda result: self._on_discard(key, weight, result)) if self._on_discard else None
+        return self.caller.call(fn, key, weight, reserve, on_discard)
+
+    def stats(self) -> dict:
+        """Retorna as métricas do HedgedCaller compartilhado."""
+        return self.caller.stats()
@@ -0,0 +1,193 @@
+"""
+Tradução automática local, em CPU.
+
+Usa modelos seq2seq (Marian/OPUS-MT) convertidos para o CTranslate2 com
+quantização int8, que rodam apenas em CPU, sem GPU nem acesso à rede. Os
+segmentos são traduzidos em lotes: o CTranslate2 ordena os trechos por tamanho e
+os processa juntos, o que rende muito mais por núcleo que um trecho por vez.
+
+Cada par de idiomas usa um diretório de modelo convertido com, por exemplo:
+
+    ct2-transformers-converter --model Helsinki-NLP/opus-mt-en-pt --quantization int8 \\
+        --copy_files source.spm target.spm --output_dir modelos/opus-mt-en-pt
+
+Os diretórios ficam em LOCAL_MT_MODELS_DIR. As dependências (ctranslate2 e
+sentencepiece) são opcionais e importadas apenas quando um modelo é carregado.
+"""
+
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODELS_DIR = Path('modelos')
+MODEL_DIR_TEMPLATE = 'opus-mt-{source}-{target}'
+# Modelos Marian aceitam até 512 subpalavras; trechos maiores são divididos em frases
+MAX_INPUT_TOKENS = 400
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_BEAM_SIZE = 2
+COMPUTE_TYPE = 'int8'
+
+# Marcação markdown no início da linha, que o modelo não deve traduzir nem perder
+_MARKDOWN_PREFIX = re.compile(r'^(\s*(?:#{1,6}\s+|>\s*|[-*+]\s+|\d+[.)]\s+)*)')
+_LETTER = re.compile(r'[^\W\d_]')
+
+def models_dir() -> Path:
+    """Diretório com os modelos convertidos (LOCAL_MT_MODELS_DIR)."""
+    return Path(os.getenv('LOCAL_MT_MODELS_DIR', DEFAULT_MODELS_DIR))
+
+def model_path(source: str, target: str) -> Path:
+    """
+    Retorna o diretório do modelo de um par de idiomas.
+
+    Args:
+        source (str): Código ISO do idioma de origem
+        target (str): Código ISO do idioma de destino
+
+    Returns:
+        Path: Diretório do modelo convertido
+    """
+    return models_dir() / MODEL_DIR_TEMPLATE.format(source=source, target=target)
+
+def is_available(source: str, target: str) -> bool:
+    """Indica se as dependências e o modelo do par de idiomas estão instalados."""
+    try:
+        import ctranslate2  # noqa: F401
+        import sentencepiece  # noqa: F401
+    except ImportError:
+        return False
+    return (model_path(source, target) / 'model.bin').exists()
+
+def split_translatable(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Separa uma linha markdown em marcação fixa e trechos a traduzir.
+
+    Modelos de tradução automática não preservam a marcação markdown, então ela é
+    retirada antes da tradução: o prefixo de títulos, listas e citações e, em
+    tabelas, as barras entre as células (cada célula é traduzida separadamente).
+    Trechos sem letras (números, separadores de tabela) não são traduzidos.
+
+    Args:
+        text (str): Linha a ser traduzida
+
+    Returns:
+        Tuple contendo (partes fixas, trechos a traduzir), com uma parte fixa a mais
+        que trechos; a linha é remontada por join_translated
+    """
+    is_table = text.lstrip().startswith('|')
+    if is_table:
+        pieces = text.split('|')
+    else:
+        prefix = _MARKDOWN_PREFIX.match(text).group(1)
+        pieces = [prefix + text[len(prefix):]] if not prefix else [prefix, text[len(prefix):]]
+
+    frames = ['']
+    texts = []
+    for i, piece in enumerate(pieces):
+        if i > 0 and is_table:
+            frames[-1] += '|'
+        # Fora de tabelas, o primeiro pedaço é o prefixo (ou a linha inteira, sem prefixo)
+        is_text = i > 0 or len(pieces) == 1
+        if is_text and _LETTER.search(piece):
+            stripped = piece.strip()
+            start = piece.index(stripped)
+            frames[-1] += piece[:start]
+            texts.append(stripped)
+            frames.append(piece[start + len(stripped):])
+        else:
+            frames[-1] += piece
+    return frames, texts
+
+def join_translated(frames: List[str], translations: List[str]) -> str:
+    """Remonta a linha com as partes fixas e os trechos traduzidos."""
+    return ''.join(frame + translation for frame, translation in zip(frames, translations)) + frames[-1]
+
+class LocalTranslator:
+    """
+    Modelo de tradução carregado em memória, com inferência em lotes na CPU.
+    """
+
+    def __init__(self, model_dir, threads: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 beam_size: int = DEFAULT_BEAM_SIZE, compute_type: str = COMPUTE_TYPE):
+        """
+        Args:
+            model_dir: Diretório do modelo convertido, com source.spm e target.spm
+            threads: Threads de inferência (padrão: todos os núcleos)
+            batch_size: Trechos traduzidos por lote
+            beam_size: Largura do beam search (1 é o mais rápido)
+            compute_type: Tipo numérico da inferência (int8 para modelos quantizados)
+        """
+        try:
+            import ctranslate2
+            import sentencepiece
+        except ImportError as e:
+            raise ImportError(
+                "A tradução local requer os pacotes opcionais ctranslate2 e sentencepiece "
+                "(pip install ctranslate2 sentencepiece)"
+            ) from e
+
+        model_dir = Path(model_dir)
+        if not (model_dir / 'model.bin').exists():
+            raise FileNotFoundError(f"Modelo de tradução local não encontrado em {model_dir}")
+
+        self.threads = threads or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.beam_size = beam_size
+        self._translator = ctranslate2.Translator(
+            str(model_dir), device='cpu', compute_type=compute_type,
+            inter_threads=1, intra_threads=self.threads
+        )
+        self._source = sentencepiece.SentencePieceProcessor(model_file=str(model_dir / 'source.spm'))
+        self._target = sentencepiece.SentencePieceProcessor(model_file=str(model_dir / 'target.spm'))
+        # O tradutor do CTranslate2 não deve receber lotes de várias threads ao mesmo tempo
+        self._lock = threading.Lock()
+        logger.info(f"Modelo local carregado de {model_dir} ({self.threads} threads, {compute_type})")
+
+    def count_tokens(self, text: str) -> int:
+        """Número de subpalavras do texto no vocabulário de origem."""
+        return len(self._source.encode(text))
+
+    def translate_batch(self, texts: List[str]) -> Tuple[List[str], int, int]:
+        """
+        Traduz vários trechos em lotes.
+
+        Args:
+            texts (List[str]): Trechos a traduzir, cada um com até MAX_INPUT_TOKENS subpalavras
+
+        Returns:
+            Tuple contendo (traduções na mesma ordem, subpalavras de entrada, subpalavras de saída)
+        """
+        if not texts:
+            return [], 0, 0
+        source_tokens = [self._source.encode(text, out_type=str) + ['</s>'] for text in texts]
+        with self._lock:
+            results = self._translator.translate_batch(
+                source_tokens, max_batch_size=self.batch_size, beam_size=self.beam_size
+            )
+        hypotheses = [result.hypotheses[0] for result in results]
+        translations = [self._target.decode(tokens) for tokens in hypotheses]
+        return translations, sum(map(len, source_tokens)), sum(map(len, hypotheses))
+
+_translators: Dict[Tuple[str, str], LocalTranslator] = {}
+_translators_lock = threading.Lock()
+
+def get_local_translator(source: str, target: str, **options) -> LocalTranslator:
+    """
+    Retorna o modelo do par de idiomas, carregado na primeira chamada.
+
+    Args:
+        source (str): Código ISO do idioma de origem
+        target (str): Código ISO do idioma de destino
+        options: Repassados a LocalTranslator
+
+    Returns:
+        LocalTranslator: Modelo compartilhado pelo processo
+    """
+    with _translators_lock:
+        if (source, target) not in _translators:
+            _translators[(source, target)] = LocalTranslator(model_path(source, target), **options)
+        return _translators[(source, target)]
@@ -0,0 +1,104 @@
+"""
+Normalização do texto de origem antes da tradução.
+
+O markdown do OCR traz espaços repetidos, fragmentos <br>, entidades HTML e
+caracteres invisíveis que o HTMLProcessor descarta na geração do PDF, mas que
+seriam pagos como tokens de entrada na tradução. As transformações aqui só são
+aplicadas onde o resultado renderizado é o mesmo:
+
+- em todo o texto (fora de blocos de código): Unicode NFC e remoção de
+  caracteres invisíveis (espaço de largura zero, hífen condicional, BOM e
+  caracteres de controle);
+- apenas em linhas de parágrafo, que o HTMLProcessor já normaliza: <br> viram
+  espaço, espaços repetidos são colapsados, entidades HTML sem significado em
+  markdown são decodificadas e "\\&" vira "&". Espaços no fim da linha são
+  removidos, exceto os dois que marcam uma quebra de linha explícita.
+"""
+
+import html
+import re
+import unicodedata
+from typing import Callable
+
+from .reflow import is_plain_line
+
+_FENCE = re.compile(r'^\s*(```|~~~)')
+_INVISIBLE = re.compile(r'[\u200b\u200c\u200d\u2060\ufeff\u00ad\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+_BR = re.compile(r'<br[^>]*>.*?</br>|<br[^>]*/?>|</br>', re.IGNORECASE)
+_ENTITY = re.compile(r'&(#\d+|#x[0-9a-fA-F]+|[a-zA-Z][a-zA-Z0-9]*);')
+_INNER_WHITESPACE = re.compile(r'(?<=\S)(?:[ \t\u00a0]{2,}|[\t\u00a0])(?=\S)')
+_HARD_BREAK = re.compile(r'\S {2,}$')
+
+# Entidades mantidas, pois decodificá-las mudaria o HTML gerado
+_KEPT_ENTITIES = {'amp', 'lt', 'gt', 'quot', 'apos'}
+
+def _decode_entity(match) -> str:
+    """Decodifica uma entidade HTML apenas se o resultado não tiver significado em markdown."""
+    if match.group(1).lower() in _KEPT_ENTITIES:
+        return match.group(0)
+    decoded = html.unescape(match.group(0))
+    if decoded == match.group(0):
+        return decoded
+    if decoded == ' ':
+        return ' '
+    if all(ch.isalnum() or not ch.isascii() for ch in decoded):
+        return decoded
+    return match.group(0)
+
+def _normalize_paragraph_line(line: str) -> str:
+    """Aplica as normalizações seguras apenas em linhas de parágrafo."""
+    line = _BR.sub(' ', line)
+    line = _ENTITY.sub(_decode_entity, line)
+    line = line.replace('\\&', '&')
+    line = _INNER_WHITESPACE.sub(' ', line)
+    # Dois espaços no fim são uma quebra de linha do markdown
+    if _HARD_BREAK.search(line):
+        return line.rstrip() + '  '
+    return line.rstrip()
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza o texto de origem sem alterar o resultado renderizado.
+
+    Args:
+        text (str): Texto markdown extraído pelo OCR
+
+    Returns:
+        str: Texto normalizado
+    """
+    output = []
+    in_code_block = False
+    for line in text.split('\n'):
+        if _FENCE.match(line):
+            in_code_block = not in_code_block
+            output.append(line)
+            continue
+        if in_code_block:
+            output.append(line)
+            continue
+        line = _INVISIBLE.sub('', unicodedata.normalize('NFC', line))
+        if line.strip() and is_plain_line(line):
+            line = _normalize_paragraph_line(line)
+        output.append(line)
+    return '\n'.join(output)
+
+def token_savings(original: str, normalized: str, count_fn: Callable[[str], float]) -> dict:
+    """
+    Mede a economia de tokens obtida com a normalização de um documento.
+
+    Args:
+        original (str): Texto antes da normalização
+        normalized (str): Texto depois da normalização
+        count_fn (Callable): Função que conta os tokens de um texto
+
+    Returns:
+        dict: Tokens antes, depois, economizados e percentual economizado
+    """
+    before = int(count_fn(original))
+    after = int(count_fn(normalized))
+    return {
+        'tokens_antes': before,
+        'tokens_depois': after,
+        'tokens_economizados': before - after,
+        'percentual': (before - after) / before if before else 0.0
+    }
@@ -0,0 +1,79 @@
+"""
+Proteção de trechos que não devem ser traduzidos.
+
+Fórmulas LaTeX, código inline e URLs são substituídos por marcadores compactos
+(⟦0⟧, ⟦1⟧, ...) antes da tradução e restaurados depois. Isso reduz os tokens de
+cada linha e impede que o modelo altere fórmulas ou endereços.
+"""
+
+import re
+from typing import List, Tuple
+
+PLACEHOLDER_TEMPLATE = '⟦{}⟧'
+_PLACEHOLDER = re.compile(r'⟦(\d+)⟧')
+
+# Ordem importa: padrões mais longos primeiro ($$ antes de $)
+_PROTECTED_SPANS = re.compile(
+    r'\$\$.+?\$\$'                          # fórmula em destaque
+    r'|(?<![\\$])\$(?![\s\d])[^$\n]+?(?<!\s)\$'  # fórmula inline (não valores em dólar)
+    r'|\\\(.+?\\\)'                         # fórmula inline \( ... \)
+    r'|\\\[.+?\\\]'                         # fórmula em destaque \[ ... \]
+    r'|(`+)[^\n]+?\1'                       # código inline
+    r'|https?://[^\s<>()\[\]]+[^\s<>()\[\].,;:!?\'"]'  # URL (sem pontuação final)
+)
+
+def mask_spans(text: str) -> Tuple[str, List[str]]:
+    """
+    Substitui fórmulas, código inline e URLs por marcadores.
+
+    Textos que já contêm algo no formato dos marcadores não são alterados,
+    para que a restauração não seja ambígua.
+
+    Args:
+        text (str): Texto a ser protegido
+
+    Returns:
+        Tuple contendo o texto com marcadores e a lista dos trechos substituídos
+    """
+    if _PLACEHOLDER.search(text):
+        return text, []
+
+    spans = []
+
+    def replace(match):
+        spans.append(match.group(0))
+        return PLACEHOLDER_TEMPLATE.format(len(spans) - 1)
+
+    return _PROTECTED_SPANS.sub(replace, text), spans
+
+def placeholders_intact(text: str, spans: List[str]) -> bool:
+    """
+    Verifica se cada marcador aparece exatamente uma vez no texto traduzido.
+
+    Args:
+        text (str): Texto traduzido com marcadores
+        spans (List[str]): Trechos substituídos por mask_spans
+
+    Returns:
+        bool: True se todos os marcadores sobreviveram à tradução
+    """
+    found = sorted(int(index) for index in _PLACEHOLDER.findall(text))
+    return found == list(range(len(spans)))
+
+def unmask_spans(text: str, spans: List[str]) -> str:
+    """
+    Restaura os trechos originais no lugar dos marcadores.
+
+    Args:
+        text (str): Texto traduzido com marcadores
+        spans (List[str]): Trechos substituídos por mask_spans
+
+    Returns:
+        str: Texto com os trechos originais
+    """
+    if not spans:
+        return text
+    return _PLACEHOLDER.sub(
+        lambda match: spans[int(match.group(1))] if int(match.group(1)) < len(spans) else match.group(0),
+        text
+    )
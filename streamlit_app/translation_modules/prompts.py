@@ -0,0 +1,129 @@
+"""
+Modelos de prompt usados na tradução.
+
+As instruções fixas ficam no prompt do sistema, idêntico byte a byte para um
+mesmo par de idiomas, e o contexto variável vai na mensagem do usuário. Assim o
+prefixo de todas as requisições de um documento é o mesmo e pode ser
+aproveitado pelo cache de prompt do provedor.
+
+O cache da OpenAI só vale para prefixos idênticos a partir de
+PROMPT_CACHE_MIN_TOKENS tokens. O prompt do sistema tem cerca de 150 tokens e a
+mensagem do usuário muda a cada segmento, então, com as instruções atuais, o
+cache não se aplica (tokens_em_cache fica em 0). Completar o prefixo até o
+mínimo não compensa: mais de 1024 tokens com o desconto do cache custam mais
+que 150 tokens a preço cheio. PromptCacheStats informa se o prefixo alcança o
+mínimo, para que a ordem das mensagens já esteja pronta quando as instruções
+crescerem (por exemplo, com um glossário).
+"""
+
+import threading
+from functools import lru_cache
+
+# Incrementar sempre que o texto das instruções mudar
+PROMPT_VERSION = "3"
+
+# Tamanho mínimo do prefixo idêntico para o cache de prompt da OpenAI
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+_SYSTEM_TEMPLATE = """Você é um tradutor senior especializado na tradução de {origem} para {destino}.
+Irei te fornecer um trecho de um texto escrito em {origem} e quero que você o traduza para {destino}.
+O trecho pode ser qualquer parte do texto - como parágrafos, títulos, subtítulos ou descrições de tabelas.
+
+Para garantir consistência e precisão na tradução:
+1. Use o contexto das linhas anteriores (já traduzidas) e posteriores (ainda não traduzidas), quando fornecido antes do trecho
+2. Mantenha o mesmo tom, estilo e terminologia do texto original e das partes já traduzidas
+3. Preserve formatações especiais, como marcadores, numerações ou ênfases
+4. Traduza apenas o trecho indicado, nada mais
+5. Mantenha inalterados os marcadores no formato ⟦N⟧, que substituem fórmulas, código e URLs
+
+Responda apenas com a tradução do trecho indicado, sem explicações ou comentários adicionais.
+Se encontrar termos técnicos ou específicos que não devem ser traduzidos, mantenha-os no idioma original."""
+
+@lru_cache(maxsize=None)
+def build_system_prompt(source_name: str, target_name: str) -> str:
+    """
+    Monta o prompt do sistema, que depende apenas do par de idiomas.
+
+    Args:
+        source_name (str): Nome do idioma de origem
+        target_name (str): Nome do idioma de destino
+
+    Returns:
+        str: Instruções fixas da tradução
+    """
+    return _SYSTEM_TEMPLATE.format(origem=source_name, destino=target_name)
+
+def build_user_message(previous_context: str, next_context: str, segment: str) -> str:
+    """
+    Monta a mensagem do usuário com o contexto variável e o trecho a traduzir.
+
+    Args:
+        previous_context (str): Contexto das linhas anteriores (pode ser vazio)
+        next_context (str): Contexto das linhas posteriores (pode ser vazio)
+        segment (str): Trecho que deve ser traduzido
+
+    Returns:
+        str: Mensagem do usuário
+    """
+    parts = [context for context in (previous_context, next_context) if context]
+    parts.append(f"Aqui está o trecho que deve ser traduzido:\n{segment}")
+    return '\n\n'.join(parts)
+
+def build_edit_message(previous_source: str, previous_translation: str, segment: str) -> str:
+    """
+    Monta a mensagem do usuário pedindo a adaptação de uma tradução anterior.
+
+    Usada quando a memória de tradução encontra um segmento muito semelhante; o
+    contexto das linhas vizinhas é dispensado.
+
+    Args:
+        previous_source (str): Segmento semelhante já traduzido
+        previous_translation (str): Tradução desse segmento
+        segment (str): Trecho que deve ser traduzido
+
+    Returns:
+        str: Mensagem do usuário
+    """
+    return (
+        "Um trecho muito semelhante já foi traduzido assim:\n"
+        f"Original: {previous_source}\n"
+        f"Tradução: {previous_translation}\n\n"
+        "Adapte essa tradução ao trecho abaixo, alterando apenas o que for diferente.\n\n"
+        f"Aqui está o trecho que deve ser traduzido:\n{segment}"
+    )
+
+class PromptCacheStats:
+    """Acumula os tokens de prompt aproveitados do cache do provedor."""
+
+    def __init__(self, prefix_tokens: int = 0):
+        """
+        Args:
+            prefix_tokens (int): Tokens do prompt do sistema, o prefixo comum das requisições
+        """
+        self.prefix_tokens = prefix_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage):
+        """Registra o uso de tokens informado pela API em uma resposta."""
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) or 0
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+            self.cached_tokens += cached
+
+    def as_dict(self) -> dict:
+        """Retorna as estatísticas acumuladas."""
+        with self._lock:
+            return {
+                'versao_prompt': PROMPT_VERSION,
+                'tokens_prefixo': self.prefix_tokens,
+                'prefixo_cacheavel': self.prefix_tokens >= PROMPT_CACHE_MIN_TOKENS,
+                'requisicoes': self.requests,
+                'tokens_prompt': self.prompt_tokens,
+                'tokens_em_cache': self.cached_tokens,
+                'taxa_acerto': self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+            }
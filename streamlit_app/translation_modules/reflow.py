@@ -0,0 +1,151 @@
+"""
+Reconstrução de parágrafos quebrados pelo OCR.
+
+Linhas consecutivas de um mesmo parágrafo são unidas em uma única linha lógica,
+incluindo palavras hifenizadas no fim da linha, sem alterar a estrutura markdown
+(títulos, listas, tabelas, citações, blocos de código e fórmulas).
+
+O hífen no fim da linha só é removido quando a palavra unida aparece em outro
+ponto do documento e a forma hifenizada não; caso contrário ele é mantido
+("well-" + "known" vira "well-known"), pois sem outra ocorrência não há como
+saber se o hífen é de um composto ou apenas da quebra de linha.
+"""
+
+import re
+from typing import List, Optional, Set, Tuple
+
+_FENCE = re.compile(r'^\s*(```|~~~)')
+_MATH_BLOCK = re.compile(r'^\s*\$\$')
+_SETEXT_UNDERLINE = re.compile(r'^\s*(=+|-+)\s*$')
+_LIST_ITEM = re.compile(r'^\s*([-*+]|\d+[.)])\s')
+_STRUCTURAL = re.compile(
+    r'^('
+    r'\s*$'                     # linha vazia
+    r'|\s*#{1,6}(\s|$)'         # título
+    r'|\s*\|'                   # tabela
+    r'|\s*>'                    # citação
+    r'|\s*!\['                  # imagem
+    r'|\s*<'                    # html
+    r'|\s*\[\^[^\]]+\]:'        # definição de nota de rodapé
+    r'|\s*([-*_]\s*){3,}$'      # linha horizontal
+    r'|( {4}|\t)'               # bloco de código indentado
+    r')'
+)
+_HYPHENATED = re.compile(r'\w-$')
+_WORD = re.compile(r'\w+(?:-\w+)*')
+_LAST_WORD = re.compile(r'(\w+(?:-\w+)*)-$')
+
+def is_plain_line(line: str) -> bool:
+    """
+    Indica se a linha é texto corrido, sem marcação estrutural.
+
+    Não considera blocos delimitados (``` ou $$), que devem ser tratados por quem chama.
+    """
+    return not (_STRUCTURAL.match(line) or _LIST_ITEM.match(line))
+
+def _ends_with_hard_break(line: str) -> bool:
+    """Indica se a linha termina com uma quebra de linha explícita do markdown."""
+    return line.endswith('  ') or line.endswith('\\')
+
+def _document_words(text: str) -> Set[str]:
+    """
+    Retorna as palavras do documento (em minúsculas), incluindo os compostos com hífen.
+
+    Fragmentos de palavras quebradas no fim da linha também entram, mas nunca
+    coincidem com a palavra unida, que é o que _join procura.
+    """
+    return set(_WORD.findall(text.lower()))
+
+def _keeps_hyphen(previous: str, line: str, words: Set[str]) -> bool:
+    """Indica se o hífen no fim de previous faz parte da palavra (e não é uma hifenização)."""
+    head = _LAST_WORD.search(previous)
+    tail = _WORD.match(line)
+    if not head or not tail or not line[:1].islower() or '-' in tail.group(0):
+        return True
+    joined = (head.group(1) + tail.group(0)).lower()
+    hyphenated = f"{head.group(1)}-{tail.group(0)}".lower()
+    return joined not in words or hyphenated in words
+
+def _join(previous: str, line: str, words: Set[str]) -> str:
+    """Une uma linha de continuação à linha anterior, desfazendo a hifenização quando plausível."""
+    previous = previous.rstrip()
+    line = line.strip()
+    if _HYPHENATED.search(previous) and line[:1].isalnum():
+        if _keeps_hyphen(previous, line, words):
+            return previous + line
+        return previous[:-1] + line
+    return f"{previous} {line}"
+
+def reflow_paragraphs(text: str) -> str:
+    """
+    Une as linhas quebradas de um mesmo parágrafo em uma única linha.
+
+    Uma linha de texto corrido é unida à anterior quando esta também é texto
+    corrido ou um item de lista (continuação preguiçosa do markdown). Blocos de
+    código e de fórmulas são preservados sem alterações.
+
+    Args:
+        text (str): Texto markdown extraído pelo OCR
+
+    Returns:
+        str: Texto com os parágrafos em linhas lógicas
+    """
+    return reflow_with_origins(text)[0]
+
+def reflow_with_origins(text: str) -> Tuple[str, List[int]]:
+    """
+    Como reflow_paragraphs, indicando também de onde vem cada linha do resultado.
+
+    Args:
+        text (str): Texto markdown extraído pelo OCR
+
+    Returns:
+        Tuple contendo o texto com os parágrafos em linhas lógicas e, para cada
+        linha dele, o índice da primeira linha de text que ela contém
+    """
+    lines = text.split('\n')
+    words = _document_words(text)
+    output: List[str] = []
+    origins: List[int] = []
+    block_delimiter: Optional[re.Pattern] = None
+    can_continue = False
+
+    for index, line in enumerate(lines):
+        # Preservar blocos de código e fórmulas linha a linha
+        if block_delimiter is not None:
+            output.append(line)
+            origins.append(index)
+            if block_delimiter.match(line):
+                block_delimiter = None
+            continue
+        if _FENCE.match(line):
+            block_delimiter = _FENCE
+        elif _MATH_BLOCK.match(line):
+            # Fórmulas de uma linha ($$ ... $$) não abrem um bloco
+            stripped = line.strip()
+            if stripped == '$$' or not stripped.endswith('$$'):
+                block_delimiter = _MATH_BLOCK
+        if block_delimiter is not None or _MATH_BLOCK.match(line):
+            output.append(line)
+            origins.append(index)
+            can_continue = False
+            continue
+
+        next_line = lines[index + 1] if index + 1 < len(lines) else ''
+        is_setext_title = _SETEXT_UNDERLINE.match(next_line) and line.strip()
+        if can_continue and is_plain_line(line) and not is_setext_title:
+            output[-1] = _join(output[-1], line, words)
+        else:
+            output.append(line)
+            origins.append(index)
+
+        last = output[-1]
+        can_continue = (
+            bool(last.strip())
+            and (is_plain_line(last) or bool(_LIST_ITEM.match(last)))
+            and not _ends_with_hard_break(last)
+            and not _SETEXT_UNDERLINE.match(last)
+            and not is_setext_title
+        )
+
+    return '\n'.join(output), origins
@@ -0,0 +1,177 @@
+"""
+Roteamento de segmentos entre modelos.
+
+Segmentos curtos ou simples (títulos, legendas, rótulos de figuras) vão para um
+modelo mais barato e rápido; os demais continuam no modelo principal. O uso de
+tokens e o custo são contabilizados por modelo.
+
+Os modelos e as regras vêm das variáveis de ambiente TRANSLATION_MODEL,
+TRANSLATION_FAST_MODEL e ROUTING_RULES (lista JSON de regras), lidas ao criar
+cada ModelRouter, para que valores do .env carregados depois da importação
+também sejam usados.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .dedup import classify_segment
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gpt-4o-2024-08-06'
+FAST_MODEL = 'gpt-4o-mini'
+
+# Regras avaliadas em ordem; a primeira que casar define o modelo. Cada regra
+# pode limitar o número de tokens do segmento ('max_tokens') e as classes de
+# contexto aceitas ('classes', ver dedup.classify_segment). Sem 'model', a
+# regra usa o modelo rápido.
+DEFAULT_ROUTING_RULES = [
+    {'max_tokens': 8},
+    {'max_tokens': 24, 'classes': ['titulo', 'legenda', 'imagem']},
+]
+
+def get_default_model() -> str:
+    """Retorna o modelo principal (TRANSLATION_MODEL ou DEFAULT_MODEL)."""
+    return os.getenv('TRANSLATION_MODEL', '').strip() or DEFAULT_MODEL
+
+def get_fast_model() -> str:
+    """Retorna o modelo rápido (TRANSLATION_FAST_MODEL ou FAST_MODEL)."""
+    return os.getenv('TRANSLATION_FAST_MODEL', '').strip() or FAST_MODEL
+
+def parse_routing_rules(rules: list, fast_model: str) -> List[dict]:
+    """
+    Valida uma lista de regras de roteamento.
+
+    Args:
+        rules (list): Regras no formato de DEFAULT_ROUTING_RULES
+        fast_model (str): Modelo das regras sem 'model'
+
+    Returns:
+        List[dict]: Regras com o modelo definido e as classes como conjunto
+    """
+    if not isinstance(rules, list):
+        raise ValueError("as regras devem ser uma lista")
+    parsed = []
+    for rule in rules:
+        if not isinstance(rule, dict) or set(rule) - {'model', 'max_tokens', 'classes'}:
+            raise ValueError(f"regra inválida: {rule!r}")
+        parsed_rule = {'model': str(rule.get('model') or fast_model)}
+        if 'max_tokens' in rule:
+            parsed_rule['max_tokens'] = float(rule['max_tokens'])
+        if 'classes' in rule:
+            parsed_rule['classes'] = set(rule['classes'])
+        parsed.append(parsed_rule)
+    return parsed
+
+def get_routing_rules() -> List[dict]:
+    """
+    Retorna as regras de ROUTING_RULES ou, na falta delas, DEFAULT_ROUTING_RULES.
+
+    Regras inválidas são ignoradas (com um aviso) em favor das padrão.
+    """
+    fast_model = get_fast_model()
+    value = os.getenv('ROUTING_RULES', '').strip()
+    if value:
+        try:
+            return parse_routing_rules(json.loads(value), fast_model)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Valor inválido em ROUTING_RULES ({e}); usando as regras padrão")
+    return parse_routing_rules(DEFAULT_ROUTING_RULES, fast_model)
+
+def model_price(prices: Dict[str, Tuple[float, float]], model: str) -> Tuple[float, float]:
+    """
+    Retorna os preços (entrada, saída) por token do modelo.
+
+    Modelos configurados sem preço na tabela usam o do modelo mais caro, para
+    que o custo e o orçamento não sejam subestimados.
+    """
+    if model in prices:
+        return prices[model]
+    return max(prices.values())
+
+class ModelRouter:
+    """
+    Escolhe o modelo de cada segmento a partir de uma lista de regras.
+    """
+
+    def __init__(self, rules: Optional[List[dict]] = None, default_model: Optional[str] = None):
+        self.rules = get_routing_rules() if rules is None else rules
+        self.default_model = default_model or get_default_model()
+
+    @classmethod
+    def fixed(cls, model: str) -> 'ModelRouter':
+        """Retorna um roteador que envia todos os segmentos para o mesmo modelo."""
+        return cls(rules=[], default_model=model)
+
+    def route(self, segment: str, tokens: float) -> str:
+        """
+        Escolhe o modelo para um segmento.
+
+        Args:
+            segment (str): Segmento a ser traduzido
+            tokens (float): Número de tokens do segmento
+
+        Returns:
+            str: Nome do modelo
+        """
+        segment_class = None
+        for rule in self.rules:
+            if 'max_tokens' in rule and tokens > rule['max_tokens']:
+                continue
+            if 'classes' in rule:
+                segment_class = segment_class or classify_segment(segment)
+                if segment_class not in rule['classes']:
+                    continue
+            return rule['model']
+        return self.default_model
+
+class ModelUsage:
+    """
+    Contabiliza tokens e custos por modelo.
+    """
+
+    def __init__(self, prices: Dict[str, Tuple[float, float]]):
+        self.prices = prices
+        self._lock = threading.Lock()
+        self._usage = {}
+
+    def price(self, model: str) -> Tuple[float, float]:
+        """Retorna os preços (entrada, saída) por token do modelo."""
+        return model_price(self.prices, model)
+
+    def add(self, model: str, input_tokens: float, output_tokens: float, requests: int = 1, segments: int = 1):
+        """Registra o uso de tokens de um segmento traduzido pelo modelo (segments=0 para requisições avulsas)."""
+        with self._lock:
+            usage = self._usage.setdefault(model, {'segmentos': 0, 'requisicoes': 0, 'tokens_entrada': 0, 'tokens_saida': 0})
+            usage['segmentos'] += segments
+            usage['requisicoes'] += requests
+            usage['tokens_entrada'] += input_tokens
+            usage['tokens_saida'] += output_tokens
+
+    def totals(self) -> Tuple[float, float, float, float]:
+        """
+        Retorna os totais de todos os modelos.
+
+        Returns:
+            Tuple contendo (tokens de entrada, tokens de saída, custo de entrada, custo de saída)
+        """
+        with self._lock:
+            input_tokens = sum(u['tokens_entrada'] for u in self._usage.values())
+            output_tokens = sum(u['tokens_saida'] for u in self._usage.values())
+            input_cost = sum(u['tokens_entrada'] * self.price(m)[0] for m, u in self._usage.items())
+            output_cost = sum(u['tokens_saida'] * self.price(m)[1] for m, u in self._usage.items())
+        return input_tokens, output_tokens, input_cost, output_cost
+
+    def as_dict(self) -> dict:
+        """Retorna o uso e o custo de cada modelo."""
+        with self._lock:
+            return {
+                model: {
+                    **usage,
+                    'custo': usage['tokens_entrada'] * self.price(model)[0] + usage['tokens_saida'] * self.price(model)[1]
+                }
+                for model, usage in self._usage.items()
+            }
@@ -0,0 +1,75 @@
+"""
+Divisão de segmentos muito longos em trechos menores.
+
+Algumas "linhas" do OCR são páginas inteiras sem quebras. Esses segmentos são
+divididos em limites de frase para que cada requisição tenha tamanho limitado.
+"""
+
+import re
+from typing import Callable, List
+
+# Espaço após fim de frase (com aspas ou parênteses opcionais) seguido de início de frase
+_SENTENCE_BOUNDARY = re.compile(
+    r'(?:(?<=[.!?…])|(?<=[.!?…]["”’)\]]))\s+(?=["“‘(\[]?[A-ZÀ-ÖØ-Þ0-9])'
+)
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Divide um texto em frases.
+
+    Args:
+        text (str): Texto a ser dividido
+
+    Returns:
+        List[str]: Frases do texto, sem os espaços de separação
+    """
+    return [sentence for sentence in _SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def _split_words(text: str, max_tokens: int, count_fn: Callable[[str], float]) -> List[str]:
+    """Divide por palavras um trecho sem limites de frase que excede o limite."""
+    pieces = []
+    current = []
+    for word in text.split():
+        if current and count_fn(' '.join(current + [word])) > max_tokens:
+            pieces.append(' '.join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+def split_segment(text: str, max_tokens: int, count_fn: Callable[[str], float]) -> List[str]:
+    """
+    Divide um segmento em trechos de até max_tokens tokens, em limites de frase.
+
+    Frases consecutivas são agrupadas enquanto couberem no limite. Uma frase que
+    sozinha excede o limite é dividida por palavras.
+
+    Args:
+        text (str): Segmento a ser dividido
+        max_tokens (int): Número máximo de tokens por trecho
+        count_fn (Callable): Função que conta os tokens de um texto
+
+    Returns:
+        List[str]: Trechos do segmento, na ordem original
+    """
+    if count_fn(text) <= max_tokens:
+        return [text]
+
+    pieces = []
+    current = ''
+    for sentence in split_sentences(text):
+        candidate = f"{current} {sentence}" if current else sentence
+        if count_fn(candidate) <= max_tokens:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        if count_fn(sentence) > max_tokens:
+            pieces.extend(_split_words(sentence, max_tokens, count_fn))
+            current = ''
+        else:
+            current = sentence
+    if current:
+        pieces.append(current)
+    return pieces
@@ -1,18 +1,59 @@
+from abc import ABC, abstractmethod
 from datetime import datetime
 import os
 import re
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import tiktoken  # Add this import for token counting
 
 from docx import Document
 from docx.shared import Pt, Cm
 
 from openai import OpenAI
-from language_utils import NOMES_IDIOMAS
+from .language_utils import NOMES_IDIOMAS
+from .translation_modules.dedup import context_classes, group_segments, dedup_stats
+from .translation_modules.splitter import split_segment
+from .translation_modules.context import DEFAULT_CONTEXT_BUDGET, PREVIOUS_SHARE, get_context_budget, select_context
+from .translation_modules.prompts import PROMPT_CACHE_MIN_TOKENS, PromptCacheStats, build_system_prompt, build_user_message, build_edit_message
+from .translation_modules.fuzzy_memory import FuzzyTranslationMemory
+from .translation_modules.placeholders import mask_spans, unmask_spans, placeholders_intact
+from .translation_modules.estimator import BudgetExceededError, ensure_within_budget, estimate_translation, output_token_ratio
+from .translation_modules.routing import DEFAULT_MODEL, FAST_MODEL, ModelRouter, ModelUsage, get_fast_model
+from .translation_modules.hedging import HedgedCaller
+from .translation_modules.concurrency import INITIAL_CONCURRENCY, MAX_CONCURRENCY, ConcurrencyController, is_throttle_error
+from .utils.rate_limiter import get_rate_limiter
+from .translation_modules.batch import BATCH_PRICE_FACTOR, DEFAULT_POLL_INTERVAL, batch_request, run_batch
+from .translation_modules.local_mt import MAX_INPUT_TOKENS, get_local_translator, join_translated, split_translatable
+
+logger = logging.getLogger(__name__)
 
 # Add token pricing constants
 TOKEN_PRICE_INPUT = 2.50 / 1_000_000  # $2.50 per million tokens
 TOKEN_PRICE_OUTPUT = 10.00 / 1_000_000  # $10.00 per million tokens
 
+# Preços por token (entrada, saída) dos modelos que podem ser configurados no roteamento
+# (ver translation_modules.routing); modelos fora da tabela usam o preço do mais caro
+MODEL_PRICES = {
+    DEFAULT_MODEL: (TOKEN_PRICE_INPUT, TOKEN_PRICE_OUTPUT),
+    'gpt-4o': (TOKEN_PRICE_INPUT, TOKEN_PRICE_OUTPUT),
+    FAST_MODEL: (0.15 / 1_000_000, 0.60 / 1_000_000),
+    'gpt-4.1': (2.00 / 1_000_000, 8.00 / 1_000_000),
+    'gpt-4.1-mini': (0.40 / 1_000_000, 1.60 / 1_000_000),
+    'gpt-4.1-nano': (0.10 / 1_000_000, 0.40 / 1_000_000),
+}
+
+# Segmentos acima deste número de tokens são divididos em frases e traduzidos em paralelo
+MAX_SEGMENT_TOKENS = 600
+MAX_CONCURRENT_REQUESTS = 4
+# Tentativas de um segmento após erros de limite de taxa
+MAX_TENTATIVAS = 3
+# Trechos por chamada ao modelo local, entre as atualizações de progresso
+TRECHOS_POR_BLOCO_LOCAL = 256
+
 def count_tokens(text, model="gpt-4o-2024-08-06"):
     """
     Conta o número de tokens em um texto para um modelo específico.
@@ -31,142 +72,1058 @@ def count_tokens(text, model="gpt-4o-2024-08-06"):
         # Fallback to approximation if tiktoken fails or model not found
         return len(text.split()) * 1.3  # Rough approximation
 
-def pergunta_LLM(client, current_model, prompt, question):
-    return client.chat.completions.create(
+def pergunta_LLM(client, current_model, prompt, question, usage_callback=None, hedger=None):
+    # Limitador compartilhado entre os processos do host (OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT)
+    limitador = get_rate_limiter('openai')
+    
+    # Estimativa: entrada + saída do tamanho da pergunta; corrigida com o uso real
+    tokens_estimados = count_tokens(prompt, current_model) + 2 * count_tokens(question, current_model) if limitador.enabled or hedger else 0
+    
+    def chamada():
+        limitador.acquire(tokens_estimados)
+        resposta = client.chat.completions.create(
           model=current_model,
           messages=[
             {"role": "system", "content": prompt},
             {"role": "user", "content": question}
           ],
           temperature=0.6
-        ).choices[0].message.content
+        )
+        uso = getattr(resposta, 'usage', None)
+        if limitador.enabled and uso is not None:
+            tokens_reais = (getattr(uso, 'prompt_tokens', 0) or 0) + (getattr(uso, 'completion_tokens', 0) or 0)
+            limitador.record(tokens_reais - tokens_estimados)
+        return resposta
+    
+    # Com um HedgedCaller, uma cópia é enviada se a chamada demorar mais que o habitual
+    response = hedger.call(chamada, current_model, tokens_estimados) if hedger else chamada()
+    
+    # Repassar o uso de tokens informado pela API (inclui tokens servidos do cache de prompt)
+    if usage_callback and getattr(response, 'usage', None):
+        usage_callback(response.usage)
+    
+    return response.choices[0].message.content
 
-def seleciona_contexto(texto, i, linhas, tipo="anteriores"):
+def envia_segmento(client, model, prompt, segmento, contexto=("", ""), usage_callback=None, hedger=None,
+                   max_tokens=MAX_SEGMENT_TOKENS):
     """
-    Seleciona linhas de contexto (anteriores ou posteriores) para auxiliar na tradução.
+    Envia um segmento para tradução, dividindo-o em frases caso exceda max_tokens.
+    
+    Os trechos de um segmento dividido são traduzidos em paralelo com o mesmo
+    prompt e contexto e depois unidos na ordem original.
+    
+    Returns:
+        Tuple contendo (texto traduzido, tokens de entrada, tokens de saída, número de requisições)
     """
-    def get_non_empty_lines(start, end, lines):
-        return [l for l in lines[start:end] if l.strip()]
-
-    if tipo == "anteriores":
-        # Seleciona linhas anteriores (já traduzidas)
-        if i == 0:
-            return ""
-        else:
-            # Pegar até 3 linhas não vazias anteriores
-            context_lines = []
-            count = 0
-            pos = i - 1
-            while pos >= 0 and count < 3:
-                if linhas[pos].strip():
-                    context_lines.insert(0, linhas[pos])
-                    count += 1
-                pos -= 1
-            
-            if not context_lines:
-                return ""
-            return 'Aqui estão as linhas imediatamente anteriores a essa, já traduzidas:\n' + "\n".join(context_lines)
+    trechos = split_segment(segmento, max_tokens, lambda t: count_tokens(t, model))
+    perguntas = [organiza_pergunta(trecho, contexto) for trecho in trechos]
+    
+    def traduz(pergunta):
+        return pergunta_LLM(client, model, prompt, pergunta, usage_callback, hedger)
+    
+    if len(perguntas) == 1:
+        traducoes = [traduz(perguntas[0])]
     else:
-        # Seleciona linhas posteriores (ainda não traduzidas)
-        if i >= len(linhas) - 1:
-            return ""
-        else:
-            # Pegar até 3 linhas não vazias posteriores
-            context_lines = []
-            count = 0
-            pos = i + 1
-            while pos < len(linhas) and count < 3:
-                if linhas[pos].strip():
-                    context_lines.append(linhas[pos])
-                    count += 1
-                pos += 1
-            
-            if not context_lines:
-                return ""
-            return 'Aqui estão as linhas imediatamente posteriores a essa, ainda não traduzidas:\n' + "\n".join(context_lines)
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(perguntas))) as executor:
+            traducoes = list(executor.map(traduz, perguntas))
+    
+    traducoes = [t.strip() for t in traducoes]
+    
+    # Contar tokens de entrada (prompt do sistema + mensagem) e de saída de cada requisição
+    prompt_tokens = count_tokens(prompt, model)
+    input_tokens = sum(prompt_tokens + count_tokens(pergunta, model) for pergunta in perguntas)
+    output_tokens = sum(count_tokens(t, model) for t in traducoes)
+    
+    return ' '.join(traducoes), input_tokens, output_tokens, len(trechos)
 
-def organiza_prompt(texto, texto_traduzido, i, linhas, idioma_origem="en", idioma_destino="pt"):
-    paragrafos_anteriores = seleciona_contexto(texto_traduzido, i, linhas, "anteriores")
-    paragrafos_posteriores = seleciona_contexto(texto, i, linhas, "posteriores")
+def traduz_segmento(client, model, prompt, segmento, contexto=("", ""), usage_callback=None, estatisticas_marcadores=None,
+                    hedger=None, max_tokens=MAX_SEGMENT_TOKENS):
+    """
+    Traduz um segmento protegendo fórmulas, código inline e URLs.
     
-    origem_nome = NOMES_IDIOMAS.get(idioma_origem, idioma_origem)
-    destino_nome = NOMES_IDIOMAS.get(idioma_destino, idioma_destino)
+    Esses trechos são substituídos por marcadores antes do envio e restaurados na
+    resposta. Se algum marcador não sobreviver à tradução, o segmento é traduzido
+    novamente sem marcadores.
+    
+    Args:
+        client: Cliente OpenAI configurado
+        model: Modelo usado na tradução
+        prompt: Prompt do sistema com as instruções fixas
+        segmento: Texto a ser traduzido
+        contexto: Tuple com o contexto anterior e posterior do segmento
+        usage_callback: Função que recebe o uso de tokens informado pela API
+        estatisticas_marcadores: Dicionário opcional com os contadores de marcadores
+        hedger: HedgedCaller opcional que duplica chamadas lentas
+        max_tokens: Tamanho máximo, em tokens, de cada trecho enviado
+        
+    Returns:
+        Tuple contendo (texto traduzido, tokens de entrada, tokens de saída, número de requisições)
+    """
+    segmento_mascarado, trechos_protegidos = mask_spans(segmento)
+    resultado = envia_segmento(client, model, prompt, segmento_mascarado, contexto, usage_callback, hedger, max_tokens)
+    if not trechos_protegidos:
+        return resultado
+    
+    traducao, input_tokens, output_tokens, requisicoes = resultado
+    marcadores_ok = placeholders_intact(traducao, trechos_protegidos)
+    
+    if estatisticas_marcadores is not None:
+        estatisticas_marcadores['segmentos'] += 1
+        estatisticas_marcadores['marcadores'] += len(trechos_protegidos)
+        estatisticas_marcadores['falhas'] += 0 if marcadores_ok else 1
+    
+    if marcadores_ok:
+        return unmask_spans(traducao, trechos_protegidos), input_tokens, output_tokens, requisicoes
+    
+    # Marcador perdido ou duplicado: traduzir novamente o texto original
+    logger.warning(f"Marcadores alterados na tradução; traduzindo novamente sem marcadores: {segmento[:80]}")
+    traducao, input_extra, output_extra, requisicoes_extra = envia_segmento(
+        client, model, prompt, segmento, contexto, usage_callback, hedger, max_tokens
+    )
+    return traducao, input_tokens + input_extra, output_tokens + output_extra, requisicoes + requisicoes_extra
 
-    prompt = f"""Você é um tradutor senior especializado na tradução de {origem_nome} para {destino_nome}.
-            Irei te fornecer um trecho de um texto escrito em {origem_nome} e quero que você o traduza para {destino_nome}.
-            O trecho pode ser qualquer parte do texto - como parágrafos, títulos, subtítulos ou descrições de tabelas.
+def adapta_traducao(client, model, prompt, segmento, correspondencia, usage_callback=None, hedger=None):
+    """
+    Traduz um segmento adaptando a tradução de um segmento semelhante da memória.
+    
+    Args:
+        client: Cliente OpenAI configurado
+        model: Modelo usado na tradução
+        prompt: Prompt do sistema com as instruções fixas
+        segmento: Texto a ser traduzido
+        correspondencia: FuzzyMatch retornado pela memória de tradução
+        usage_callback: Função que recebe o uso de tokens informado pela API
+        hedger: HedgedCaller opcional que duplica chamadas lentas
+        
+    Returns:
+        Tuple contendo (texto traduzido, tokens de entrada, tokens de saída, número de requisições)
+    """
+    pergunta = build_edit_message(correspondencia.source, correspondencia.translation, segmento)
+    traducao = pergunta_LLM(client, model, prompt, pergunta, usage_callback, hedger).strip()
+    input_tokens = count_tokens(prompt, model) + count_tokens(pergunta, model)
+    return traducao, input_tokens, count_tokens(traducao, model), 1
 
-            Para garantir consistência e precisão na tradução:
-            1. Use o contexto das linhas anteriores (já traduzidas) e posteriores (ainda não traduzidas) fornecidas
-            2. Mantenha o mesmo tom, estilo e terminologia do texto original e das partes já traduzidas
-            3. Preserve formatações especiais, como marcadores, numerações ou ênfases
-            4. Traduza apenas a linha indicada, nada mais
+def estima_traducao(texto, idioma_origem="en", idioma_destino="pt", roteador=None):
+    """
+    Estima tokens, custo e tempo da tradução antes de iniciá-la.
+    
+    Args:
+        texto: Texto que será traduzido
+        idioma_origem: Código ISO do idioma de origem
+        idioma_destino: Código ISO do idioma de destino
+        roteador: ModelRouter usado na tradução (padrão: regras de ROUTING_RULES)
+        
+    Returns:
+        Dicionário com a estimativa (ver translation_modules.estimator.estimate_translation)
+    """
+    return estimate_translation(
+        texto, idioma_origem, idioma_destino, roteador or ModelRouter(),
+        MODEL_PRICES, MAX_SEGMENT_TOKENS,
+        concurrency=INITIAL_CONCURRENCY, piece_concurrency=MAX_CONCURRENT_REQUESTS
+    )
 
-            Responda apenas com a tradução da linha indicada, sem explicações ou comentários adicionais.
-            Se encontrar termos técnicos ou específicos que não devem ser traduzidos, mantenha-os no idioma original.
+def seleciona_contexto(texto, i, linhas, tipo="anteriores", orcamento_tokens=DEFAULT_CONTEXT_BUDGET, model="gpt-4o-2024-08-06"):
+    """
+    Seleciona linhas de contexto (anteriores ou posteriores) para auxiliar na tradução.
+    
+    São incluídas até 3 linhas não vazias, limitadas pelo orçamento de tokens.
+    """
+    anteriores = tipo == "anteriores"
+    context_lines = select_context(linhas, i, anteriores, orcamento_tokens, lambda t: count_tokens(t, model))
+    
+    if not context_lines:
+        return ""
+    if anteriores:
+        return 'Aqui estão as linhas imediatamente anteriores a essa, já traduzidas:\n' + "\n".join(context_lines)
+    return 'Aqui estão as linhas imediatamente posteriores a essa, ainda não traduzidas:\n' + "\n".join(context_lines)
 
-            {paragrafos_anteriores}
-            {paragrafos_posteriores}
-            Aqui está o trecho que deve ser traduzido:\n"""
+def monta_contexto(texto, texto_traduzido, i, linhas, idioma_origem="en", idioma_destino="pt", model="gpt-4o-2024-08-06"):
+    """
+    Monta o contexto de uma linha dentro do orçamento de tokens do par de idiomas.
     
-    return prompt
+    Returns:
+        Tuple contendo (contexto anterior, contexto posterior)
+    """
+    orcamento = get_context_budget(idioma_origem, idioma_destino)
+    orcamento_anteriores = int(orcamento * PREVIOUS_SHARE)
+    paragrafos_anteriores = seleciona_contexto(texto_traduzido, i, linhas, "anteriores", orcamento_anteriores, model)
+    paragrafos_posteriores = seleciona_contexto(texto, i, linhas, "posteriores", orcamento - orcamento_anteriores, model)
+    return paragrafos_anteriores, paragrafos_posteriores
 
-def traduzir_texto(texto: str, client: OpenAI, idioma_origem="en", idioma_destino="pt", progress_callback=None, token_callback=None) -> str:
+def organiza_prompt(idioma_origem="en", idioma_destino="pt"):
+    """
+    Retorna o prompt do sistema, idêntico para todas as linhas de um par de idiomas.
+    
+    O contexto variável fica na mensagem do usuário (ver organiza_pergunta), para
+    que o prefixo das requisições possa ser aproveitado pelo cache de prompt.
+    """
+    origem_nome = NOMES_IDIOMAS.get(idioma_origem, idioma_origem)
+    destino_nome = NOMES_IDIOMAS.get(idioma_destino, idioma_destino)
+    return build_system_prompt(origem_nome, destino_nome)
+
+def organiza_pergunta(trecho, contexto=("", "")):
+    """
+    Monta a mensagem do usuário com o contexto da linha e o trecho a ser traduzido.
+    """
+    paragrafos_anteriores, paragrafos_posteriores = contexto
+    return build_user_message(paragrafos_anteriores, paragrafos_posteriores, trecho)
+
+def traduzir_texto(texto: str, client: OpenAI, idioma_origem="en", idioma_destino="pt", progress_callback=None, token_callback=None, stats_callback=None, memoria=None, orcamento=None, roteador=None, hedger=None, controlador=None, grupos=None, segment_callback=None, cancelamento=None) -> str:
     """
     Traduz o texto fornecido do idioma de origem para o idioma de destino.
     
+    Linhas idênticas com a mesma classe de contexto são traduzidas uma única vez
+    e o resultado é replicado para todas as ocorrências. Linhas quase idênticas a
+    uma já traduzida são servidas pela memória de tradução aproximada; um segmento
+    semelhante a outro ainda em andamento aguarda a conclusão dele antes da consulta.
+    Cada segmento é enviado ao modelo escolhido pelo roteador.
+    
+    Os segmentos são traduzidos em paralelo, com a concorrência e o tamanho dos
+    trechos ajustados pelo controlador; o contexto usa apenas o texto de origem,
+    então a ordem de conclusão não altera o resultado. Os callbacks são sempre
+    chamados na thread que chamou esta função.
+    
     Args:
         texto: Texto para ser traduzido
         client: Cliente OpenAI configurado
         idioma_origem: Código ISO do idioma de origem (padrão: "en" para inglês)
         idioma_destino: Código ISO do idioma de destino (padrão: "pt" para português)
         progress_callback: Função de callback para atualizar o progresso
-        token_callback: Função de callback para atualizar informações de tokens e custos
+        token_callback: Função de callback para atualizar informações de tokens e custos,
+            incluindo os tokens de contexto e de conteúdo (trecho traduzido) separadamente
+        stats_callback: Função de callback que recebe as estatísticas da tradução ao final
+        memoria: Memória de tradução aproximada (FuzzyTranslationMemory); se None, uma nova é criada para a tarefa
+        orcamento: Custo máximo em dólares; a tradução é interrompida antes de uma requisição que o ultrapassaria
+        roteador: ModelRouter que escolhe o modelo de cada segmento (padrão: regras de ROUTING_RULES)
+        hedger: HedgedCaller que duplica chamadas lentas; se None, um novo é criado para a tarefa
+        controlador: ConcurrencyController que ajusta a concorrência; se None, um novo é criado para a tarefa
+        grupos: Segmentos já agrupados por group_segments(texto.split('\n')), para reaproveitar a segmentação;
+            linhas fora dos grupos informados não são traduzidas
+        segment_callback: Função (índices das linhas, tradução) chamada a cada segmento traduzido
+        cancelamento: threading.Event opcional; quando definido, nenhum segmento novo é enviado, as
+            requisições em andamento são aguardadas e as linhas não enviadas ficam vazias
         
     Returns:
         Texto traduzido no idioma de destino
+        
+    Raises:
+        BudgetExceededError: Se o orçamento seria ultrapassado
     """
     linhas = texto.split('\n')
-    linhas_traduzidas = []
+    linhas_traduzidas = [''] * len(linhas)
     total_linhas = len(linhas)
     
-    # Inicializar contadores de tokens
-    total_input_tokens = 0
-    total_output_tokens = 0
-    model = 'gpt-4o-2024-08-06'
+    # Agrupar linhas repetidas para traduzir cada segmento distinto uma única vez
+    if grupos is None:
+        grupos = group_segments(linhas)
+    estatisticas_dedup = dedup_stats(grupos)
+    # Classe de contexto de cada linha (a mesma das chaves dos grupos), usada também pela memória
+    classes = context_classes(linhas)
     
-    for i, linha in enumerate(linhas):
-        if linha.strip() == '':
-            linhas_traduzidas.append('')
-            if progress_callback:
-                progress_callback(i + 1, total_linhas)
+    # Linhas vazias já estão concluídas
+    linhas_concluidas = total_linhas - estatisticas_dedup['segmentos']
+    
+    # Inicializar contadores de tokens (por modelo)
+    uso_modelos = ModelUsage(MODEL_PRICES)
+    total_context_tokens = 0
+    total_payload_tokens = 0
+    
+    if roteador is None:
+        roteador = ModelRouter()
+    
+    # Chamadas mais lentas que o percentil recente ganham uma cópia (ver translation_modules.hedging)
+    if hedger is None:
+        hedger = HedgedCaller()
+    
+    # O prompt do sistema é o mesmo para todas as linhas; acompanhar o aproveitamento do cache
+    prompt = organiza_prompt(idioma_origem, idioma_destino)
+    prompt_tokens = count_tokens(prompt)
+    cache_stats = PromptCacheStats(prompt_tokens)
+    
+    # Concorrência e tamanho dos trechos ajustados pelas respostas observadas
+    if controlador is None:
+        controlador = ConcurrencyController()
+    cliente = controlador.wrap(client)
+    custo_reservado = 0.0
+    
+    # Cópias do hedger: a chamada descartada também é cobrada. Enquanto ela não termina,
+    # o custo estimado fica reservado; depois, o uso informado pela API entra em uso_modelos
+    custo_copias = 0.0
+    copias_enviadas = 0
+    trava_copias = threading.Lock()
+    
+    def custo_copia(model, tokens):
+        # Estimativa conservadora: todos os tokens ao preço de saída
+        return tokens * max(uso_modelos.price(model))
+    
+    def reserva_copia(model, tokens):
+        nonlocal custo_copias, copias_enviadas
+        with trava_copias:
+            _, _, input_cost, output_cost = uso_modelos.totals()
+            custo = custo_copia(model, tokens)
+            if orcamento is not None and input_cost + output_cost + custo_reservado + custo_copias + custo > orcamento:
+                return False
+            custo_copias += custo
+            copias_enviadas += 1
+            return True
+    
+    def descarta_copia(model, tokens, resposta):
+        nonlocal custo_copias
+        uso = getattr(resposta, 'usage', None)
+        if uso is not None:
+            cache_stats.record(uso)
+            uso_modelos.add(model, getattr(uso, 'prompt_tokens', 0) or 0, getattr(uso, 'completion_tokens', 0) or 0,
+                            1, segments=0)
+        with trava_copias:
+            custo_copias -= custo_copia(model, tokens)
+    
+    hedger_tarefa = hedger.bind(reserva_copia, descarta_copia)
+    
+    def verifica_orcamento(model, tokens_mensagem, tokens_segmento):
+        # Requisições em andamento (inclusive cópias) entram com o custo estimado
+        _, _, input_cost, output_cost = uso_modelos.totals()
+        price_input, price_output = uso_modelos.price(model)
+        tokens_entrada = prompt_tokens + tokens_mensagem
+        tokens_saida = tokens_segmento * output_token_ratio(idioma_destino)
+        ensure_within_budget(
+            input_cost + output_cost + custo_reservado + custo_copias, tokens_entrada, tokens_saida,
+            orcamento, price_input, price_output
+        )
+        return tokens_entrada * price_input + tokens_saida * price_output
+    
+    if memoria is None:
+        memoria = FuzzyTranslationMemory()
+    
+    estatisticas_marcadores = {'segmentos': 0, 'marcadores': 0, 'falhas': 0}
+    
+    def com_repeticao(traducao):
+        # Erros de limite de taxa são repetidos com espera crescente; o controlador já reduziu a concorrência.
+        # A vaga do controlador é liberada aqui, mesmo se a tarefa falhar
+        try:
+            for tentativa in range(MAX_TENTATIVAS):
+                try:
+                    return traducao()
+                except Exception as e:
+                    if not is_throttle_error(e) or tentativa == MAX_TENTATIVAS - 1:
+                        raise
+                    time.sleep(2 ** tentativa)
+        finally:
+            controlador.release()
+    
+    def prepara(ocorrencias):
+        # Retorna (segmento, modelo, tradução já pronta ou None, função de tradução, tokens de contexto, custo estimado)
+        i = ocorrencias[0]
+        segmento = linhas[i].strip()
+        tokens_segmento = count_tokens(segmento)
+        model = roteador.route(segmento, tokens_segmento)
+        
+        # Consultar a memória de tradução antes de chamar o modelo
+        correspondencia = memoria.lookup(segmento, classes[i]) if tokens_segmento <= MAX_SEGMENT_TOKENS else None
+        
+        if correspondencia and correspondencia.direct:
+            return segmento, model, (correspondencia.translation, 0, 0, 0), None, 0, 0.0
+        if correspondencia:
+            custo = verifica_orcamento(model, 2 * tokens_segmento, tokens_segmento)
+            return segmento, model, None, lambda: (adapta_traducao(
+                cliente, model, prompt, segmento, correspondencia, cache_stats.record, hedger_tarefa
+            ), None), 0, custo
+        
+        contexto = monta_contexto(texto, texto, i, linhas, idioma_origem, idioma_destino, model)
+        tokens_contexto = sum(count_tokens(c, model) for c in contexto if c)
+        custo = verifica_orcamento(model, tokens_contexto + tokens_segmento, tokens_segmento)
+        max_tokens = controlador.batch_tokens
+        
+        def traducao():
+            # Cada segmento conta os próprios marcadores; os totais são somados na thread principal
+            marcadores = {'segmentos': 0, 'marcadores': 0, 'falhas': 0}
+            resultado = traduz_segmento(
+                cliente, model, prompt, segmento, contexto, cache_stats.record, marcadores, hedger_tarefa, max_tokens
+            )
+            return resultado, marcadores
+        
+        return segmento, model, None, traducao, tokens_contexto, custo
+    
+    def aguarda_semelhante(ocorrencias):
+        # Um segmento semelhante a outro em andamento espera por ele, para ser servido pela memória
+        segmento = linhas[ocorrencias[0]].strip()
+        return count_tokens(segmento) <= MAX_SEGMENT_TOKENS and memoria.pending_match(segmento, classes[ocorrencias[0]])
+    
+    def cancelada():
+        return cancelamento is not None and cancelamento.is_set()
+    
+    pendentes = deque(grupos.values())
+    adiados = []
+    em_andamento = {}
+    erro_orcamento = None
+    
+    with ThreadPoolExecutor(max_workers=controlador.max_concurrency) as executor:
+        while em_andamento or (pendentes and erro_orcamento is None and not cancelada()):
+            # Enviar segmentos até o limite atual de concorrência (compartilhado por quem usa o mesmo controlador)
+            concluidos = []
+            while pendentes and erro_orcamento is None and not cancelada():
+                if em_andamento and aguarda_semelhante(pendentes[0]):
+                    adiados.append(pendentes.popleft())
+                    continue
+                if not controlador.try_acquire():
+                    if em_andamento:
+                        break
+                    controlador.acquire()
+                ocorrencias = pendentes.popleft()
+                try:
+                    segmento, model, pronta, traducao, tokens_contexto, custo = prepara(ocorrencias)
+                except BudgetExceededError as e:
+                    # Parar de enviar, mas aguardar as requisições em andamento
+                    controlador.release()
+                    erro_orcamento = e
+                    break
+                except Exception:
+                    controlador.release()
+                    raise
+                if pronta is not None:
+                    controlador.release()
+                    concluidos.append((ocorrencias, segmento, model, pronta, tokens_contexto, None))
+                    continue
+                custo_reservado += custo
+                reserva = memoria.reserve(segmento, classes[ocorrencias[0]])
+                future = executor.submit(com_repeticao, traducao)
+                em_andamento[future] = (ocorrencias, segmento, model, tokens_contexto, custo, reserva)
+            
+            if em_andamento and not concluidos:
+                prontos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+                for future in prontos:
+                    ocorrencias, segmento, model, tokens_contexto, custo, reserva = em_andamento.pop(future)
+                    custo_reservado -= custo
+                    resultado, marcadores = future.result()
+                    for chave, valor in (marcadores or {}).items():
+                        estatisticas_marcadores[chave] += valor
+                    concluidos.append((ocorrencias, segmento, model, resultado, tokens_contexto, reserva))
+            
+            for ocorrencias, segmento, model, resultado, tokens_contexto, reserva in concluidos:
+                linha_traduzida, input_tokens, output_tokens, requisicoes = resultado
+                
+                if requisicoes:
+                    # O contexto é enviado em cada requisição; o conteúdo, uma única vez
+                    total_context_tokens += requisicoes * tokens_contexto
+                    total_payload_tokens += count_tokens(segmento)
+                    uso_modelos.add(model, input_tokens, output_tokens, requisicoes)
+                memoria.add(segmento, linha_traduzida, classes[ocorrencias[0]])
+                if reserva is not None:
+                    memoria.release(reserva)
+                
+                # Replicar a tradução para todas as ocorrências do segmento
+                for j in ocorrencias:
+                    linhas_traduzidas[j] = linha_traduzida.strip()
+                if segment_callback:
+                    segment_callback(ocorrencias, linha_traduzida.strip())
+                estatisticas_dedup['tokens_economizados'] += (len(ocorrencias) - 1) * (input_tokens + output_tokens)
+                linhas_concluidas += len(ocorrencias)
+                
+                # Calcular custos (cada modelo com seu preço)
+                total_input_tokens, total_output_tokens, input_cost, output_cost = uso_modelos.totals()
+                total_cost = input_cost + output_cost
+                
+                # Atualizar progresso e informações de tokens (sempre na thread principal)
+                if progress_callback:
+                    progress_callback(linhas_concluidas, total_linhas)
+                
+                if token_callback:
+                    token_callback(total_input_tokens, total_output_tokens, input_cost, output_cost, total_cost,
+                                   total_context_tokens, total_payload_tokens)
+            
+            # Os segmentos adiados voltam ao início da fila e agora consultam a memória atualizada
+            if concluidos and adiados:
+                pendentes.extendleft(reversed(adiados))
+                adiados.clear()
+    
+    # Atualizar o custo com as cópias descartadas; as que ainda estão em andamento entram pelo custo estimado
+    if token_callback and copias_enviadas:
+        total_input_tokens, total_output_tokens, input_cost, output_cost = uso_modelos.totals()
+        output_cost += custo_copias
+        token_callback(total_input_tokens, total_output_tokens, input_cost, output_cost, input_cost + output_cost,
+                       total_context_tokens, total_payload_tokens)
+    
+    if erro_orcamento is not None:
+        raise erro_orcamento
+    
+    if cancelada() and (pendentes or adiados):
+        logger.info(f"Tradução cancelada: {len(pendentes) + len(adiados)} segmentos não enviados")
+    
+    if not grupos and progress_callback:
+        progress_callback(total_linhas, total_linhas)
+    
+    logger.info(
+        f"Deduplicação: {estatisticas_dedup['duplicados']} de {estatisticas_dedup['segmentos']} "
+        f"segmentos reaproveitados (~{estatisticas_dedup['tokens_economizados']} tokens economizados)"
+    )
+    estatisticas_cache = cache_stats.as_dict()
+    logger.info(
+        f"Cache de prompt (v{estatisticas_cache['versao_prompt']}): {estatisticas_cache['tokens_em_cache']} de "
+        f"{estatisticas_cache['tokens_prompt']} tokens de entrada servidos do cache"
+        + ("" if estatisticas_cache['prefixo_cacheavel'] else
+           f" (prefixo fixo de {estatisticas_cache['tokens_prefixo']} tokens, abaixo do mínimo de "
+           f"{PROMPT_CACHE_MIN_TOKENS} do cache)")
+    )
+    estatisticas_memoria = memoria.stats()
+    logger.info(
+        f"Memória de tradução: {estatisticas_memoria['reaproveitados']} reaproveitados, "
+        f"{estatisticas_memoria['adaptados']} adaptados em {estatisticas_memoria['consultas']} consultas "
+        f"({estatisticas_memoria['latencia_media_ms']:.2f} ms por consulta)"
+    )
+    logger.info(
+        f"Marcadores: {estatisticas_marcadores['marcadores']} trechos protegidos em "
+        f"{estatisticas_marcadores['segmentos']} segmentos, {estatisticas_marcadores['falhas']} falhas de validação"
+    )
+    estatisticas_hedging = hedger.stats()
+    logger.info(
+        f"Requisições duplicadas: {estatisticas_hedging['copias']} de {estatisticas_hedging['chamadas']} chamadas "
+        f"({estatisticas_hedging['copias_vencedoras']} venceram, {estatisticas_hedging['bloqueadas_pelo_limite']} "
+        f"bloqueadas pelo limite, {estatisticas_hedging['bloqueadas_pelo_orcamento']} pelo orçamento), "
+        f"p99 {estatisticas_hedging['latencia_p99_s']:.1f}s"
+    )
+    estatisticas_modelos = uso_modelos.as_dict()
+    for nome_modelo, uso in estatisticas_modelos.items():
+        logger.info(
+            f"Modelo {nome_modelo}: {uso['segmentos']} segmentos, {uso['tokens_entrada']} tokens de entrada, "
+            f"{uso['tokens_saida']} de saída, ${uso['custo']:.4f}"
+        )
+    if stats_callback:
+        stats_callback({
+            'deduplicacao': estatisticas_dedup,
+            'cache_prompt': estatisticas_cache,
+            'memoria_traducao': estatisticas_memoria,
+            'marcadores': estatisticas_marcadores,
+            'modelos': estatisticas_modelos,
+            'hedging': estatisticas_hedging,
+            'concorrencia': controlador.settings()
+        })
+        
+    return '\n'.join(linhas_traduzidas)
+
+def traduzir_para_varios_idiomas(texto, client, idioma_origem="en", idiomas_destino=("pt",), progress_callback=None,
+                                 token_callback=None, stats_callback=None, orcamento=None, roteador=None):
+    """
+    Traduz o mesmo texto para vários idiomas ao mesmo tempo.
+    
+    A segmentação é feita uma única vez e as traduções rodam em paralelo,
+    compartilhando o mesmo controlador de concorrência (um único limite de
+    requisições simultâneas para todos os idiomas) e o mesmo HedgedCaller. Os
+    callbacks recebem o código do idioma como primeiro argumento e são chamados
+    na thread que chamou esta função.
+    
+    Args:
+        texto: Texto para ser traduzido (já pré-processado)
+        client: Cliente OpenAI configurado
+        idioma_origem: Código ISO do idioma de origem
+        idiomas_destino: Códigos ISO dos idiomas de destino
+        progress_callback: Função (idioma, atual, total)
+        token_callback: Função (idioma, ...) com os mesmos argumentos do token_callback de traduzir_texto
+        stats_callback: Função (idioma, estatísticas)
+        orcamento: Custo máximo em dólares para todos os idiomas, dividido igualmente entre eles
+        roteador: ModelRouter que escolhe o modelo de cada segmento
+        
+    Returns:
+        Tuple contendo (textos traduzidos por idioma, erros por idioma)
+    """
+    idiomas_destino = list(dict.fromkeys(idiomas_destino))
+    if not idiomas_destino:
+        return {}, {}
+    
+    grupos = group_segments(texto.split('\n'))
+    controlador = ConcurrencyController()
+    hedger = HedgedCaller()
+    orcamento_idioma = orcamento / len(idiomas_destino) if orcamento else None
+    fila = queue.Queue()
+    
+    def encaminha(callback, idioma):
+        # Os callbacks das threads de tradução são executados na thread que chamou esta função
+        if callback is None:
+            return None
+        return lambda *args: fila.put((callback, (idioma,) + args))
+    
+    def traduz(idioma):
+        return traduzir_texto(
+            texto, client, idioma_origem, idioma,
+            progress_callback=encaminha(progress_callback, idioma),
+            token_callback=encaminha(token_callback, idioma),
+            stats_callback=encaminha(stats_callback, idioma),
+            orcamento=orcamento_idioma, roteador=roteador, hedger=hedger,
+            controlador=controlador, grupos=grupos
+        )
+    
+    def executa_callbacks(timeout=None):
+        try:
+            while True:
+                callback, args = fila.get(timeout=timeout)
+                callback(*args)
+                timeout = None if timeout is None else 0
+        except queue.Empty:
+            pass
+    
+    with ThreadPoolExecutor(max_workers=len(idiomas_destino)) as executor:
+        futures = {executor.submit(traduz, idioma): idioma for idioma in idiomas_destino}
+        while not all(future.done() for future in futures):
+            executa_callbacks(timeout=0.1)
+        executa_callbacks(timeout=0)
+    
+    traducoes = {}
+    erros = {}
+    for future, idioma in futures.items():
+        if future.exception() is not None:
+            logger.error(f"Falha na tradução para {idioma}: {future.exception()}")
+            erros[idioma] = future.exception()
+        else:
+            traducoes[idioma] = future.result()
+    return traducoes, erros
+
+def traduzir_rascunho(texto, client, idioma_origem="en", idioma_destino="pt", progress_callback=None,
+                      token_callback=None, stats_callback=None, orcamento=None, segment_callback=None):
+    """
+    Traduz o texto inteiro com o modelo rápido e a concorrência máxima.
+    
+    O rascunho fica pronto em poucos segundos e é refinado depois por
+    refinar_traducao, que substitui os segmentos pela tradução do modelo principal.
+    
+    Args:
+        texto: Texto para ser traduzido (já pré-processado)
+        client: Cliente OpenAI configurado
+        idioma_origem: Código ISO do idioma de origem
+        idioma_destino: Código ISO do idioma de destino
+        progress_callback, token_callback, stats_callback, segment_callback: Como em traduzir_texto
+        orcamento: Custo máximo em dólares do rascunho
+        
+    Returns:
+        Texto traduzido pelo modelo rápido
+    """
+    return traduzir_texto(
+        texto, client, idioma_origem, idioma_destino,
+        progress_callback=progress_callback, token_callback=token_callback, stats_callback=stats_callback,
+        orcamento=orcamento, roteador=ModelRouter.fixed(get_fast_model()),
+        controlador=ConcurrencyController(initial_concurrency=MAX_CONCURRENCY),
+        segment_callback=segment_callback
+    )
+
+def refinar_traducao(texto, client, idioma_origem="en", idioma_destino="pt", segment_callback=None,
+                     progress_callback=None, token_callback=None, stats_callback=None, orcamento=None, roteador=None,
+                     modelo_rascunho=None, cancelamento=None):
+    """
+    Traduz de novo, com o modelo escolhido pelo roteador, os segmentos do rascunho.
+    
+    Segmentos que o roteador enviaria ao mesmo modelo do rascunho (títulos e
+    trechos curtos) já estão com a qualidade final e não são traduzidos de novo.
+    Os demais são entregues a segment_callback assim que ficam prontos, para que o
+    rascunho seja atualizado aos poucos. Os callbacks são chamados na thread que
+    chamou esta função.
+    
+    Args:
+        texto: Texto original (o mesmo usado no rascunho)
+        client: Cliente OpenAI configurado
+        idioma_origem: Código ISO do idioma de origem
+        idioma_destino: Código ISO do idioma de destino
+        segment_callback: Função (índices das linhas, tradução refinada)
+        progress_callback, token_callback, stats_callback: Como em traduzir_texto
+        orcamento: Custo máximo em dólares do refinamento
+        roteador: ModelRouter da tradução normal (padrão: regras de ROUTING_RULES)
+        modelo_rascunho: Modelo usado no rascunho (padrão: o modelo rápido configurado)
+        cancelamento: threading.Event opcional que interrompe o envio de novos segmentos (ver traduzir_texto)
+        
+    Returns:
+        Número de segmentos refinados
+    """
+    if roteador is None:
+        roteador = ModelRouter()
+    if modelo_rascunho is None:
+        modelo_rascunho = get_fast_model()
+    
+    linhas = texto.split('\n')
+    grupos = {}
+    for chave, ocorrencias in group_segments(linhas).items():
+        segmento = linhas[ocorrencias[0]].strip()
+        if roteador.route(segmento, count_tokens(segmento)) != modelo_rascunho:
+            grupos[chave] = ocorrencias
+    logger.info(f"Refinamento: {len(grupos)} segmentos serão traduzidos de novo")
+    if grupos:
+        traduzir_texto(
+            texto, client, idioma_origem, idioma_destino,
+            progress_callback=progress_callback, token_callback=token_callback, stats_callback=stats_callback,
+            orcamento=orcamento, roteador=roteador, grupos=grupos, segment_callback=segment_callback,
+            cancelamento=cancelamento
+        )
+    return len(grupos)
+
+def traduzir_em_lote(documentos, client, idioma_origem="en", idioma_destino="pt", roteador=None,
+                     diretorio=None, intervalo=DEFAULT_POLL_INTERVAL, status_callback=None, stats_callback=None):
+    """
+    Traduz um ou mais documentos pela Batch API, sem interação.
+    
+    Todos os segmentos distintos de cada documento são preparados de uma vez
+    (mesmo prompt do sistema, contexto, marcadores e divisão de frases da
+    tradução síncrona) e enviados em um job em lote. Ao final, as respostas são
+    remontadas em cada documento. Segmentos cujos marcadores não sobreviveram,
+    ou cujas requisições falharam, são reenviados sem marcadores em um segundo job.
+    A memória de tradução aproximada não é usada, pois depende de traduções anteriores.
+    
+    Args:
+        documentos: Dicionário com o nome e o texto de cada documento
+        client: Cliente OpenAI configurado (ou translation_modules.batch.LocalBatchClient)
+        idioma_origem: Código ISO do idioma de origem
+        idioma_destino: Código ISO do idioma de destino
+        roteador: ModelRouter que escolhe o modelo de cada segmento (padrão: regras de ROUTING_RULES)
+        diretorio: Diretório dos arquivos JSONL (padrão: diretório temporário)
+        intervalo: Intervalo entre consultas ao job, em segundos
+        status_callback: Função que recebe o job a cada consulta
+        stats_callback: Função de callback que recebe as estatísticas ao final
+        
+    Returns:
+        Dicionário com o nome e o texto traduzido de cada documento
+    """
+    if roteador is None:
+        roteador = ModelRouter()
+    
+    prompt = organiza_prompt(idioma_origem, idioma_destino)
+    precos_lote = {modelo: (entrada * BATCH_PRICE_FACTOR, saida * BATCH_PRICE_FACTOR)
+                   for modelo, (entrada, saida) in MODEL_PRICES.items()}
+    uso_modelos = ModelUsage(precos_lote)
+    
+    # Preparar as requisições de todos os segmentos distintos
+    pendentes = {}
+    requisicoes = []
+    linhas_por_documento = {}
+    for d, (nome, texto) in enumerate(documentos.items()):
+        linhas = texto.split('\n')
+        linhas_por_documento[nome] = linhas
+        for ocorrencias in group_segments(linhas).values():
+            i = ocorrencias[0]
+            segmento = linhas[i].strip()
+            model = roteador.route(segmento, count_tokens(segmento))
+            segmento_mascarado, trechos_protegidos = mask_spans(segmento)
+            contexto = monta_contexto(texto, texto, i, linhas, idioma_origem, idioma_destino, model)
+            trechos = split_segment(segmento_mascarado, MAX_SEGMENT_TOKENS, lambda t: count_tokens(t, model))
+            ids = [f"{d}:{i}:{k}" for k in range(len(trechos))]
+            requisicoes.extend(
+                batch_request(custom_id, model, prompt, organiza_pergunta(trecho, contexto))
+                for custom_id, trecho in zip(ids, trechos)
+            )
+            pendentes[(nome, i)] = {
+                'ocorrencias': ocorrencias, 'segmento': segmento, 'modelo': model,
+                'contexto': contexto, 'trechos_protegidos': trechos_protegidos, 'ids': ids
+            }
+    
+    def junta_partes(pendente, resultados):
+        # Registrar o uso das partes recebidas e unir a tradução; None se faltar alguma parte
+        partes = [resultados.get(custom_id) for custom_id in pendente['ids']]
+        for parte in filter(None, partes):
+            uso_modelos.add(pendente['modelo'], parte['usage'].get('prompt_tokens', 0),
+                            parte['usage'].get('completion_tokens', 0))
+        if not all(partes):
+            return None
+        return ' '.join(parte['content'].strip() for parte in partes)
+    
+    resultados, erros, jobs = run_batch(client, requisicoes, diretorio, intervalo, status_callback=status_callback)
+    
+    # Remontar os segmentos; marcadores perdidos ou requisições com erro vão para um segundo job
+    traducoes = {}
+    reenvios = []
+    for chave, pendente in pendentes.items():
+        traducao = junta_partes(pendente, resultados)
+        if traducao is not None and placeholders_intact(traducao, pendente['trechos_protegidos']):
+            traducoes[chave] = unmask_spans(traducao, pendente['trechos_protegidos'])
             continue
+        falhas = [erros[custom_id] for custom_id in pendente['ids'] if custom_id in erros]
+        if falhas:
+            logger.warning(f"Requisição em lote falhou ({falhas[0]}); reenviando: {pendente['segmento'][:80]}")
+        trechos = split_segment(pendente['segmento'], MAX_SEGMENT_TOKENS, lambda t: count_tokens(t, pendente['modelo']))
+        prefixo = pendente['ids'][0].rsplit(':', 1)[0]
+        pendente['ids'] = [f"{prefixo}:r{k}" for k in range(len(trechos))]
+        reenvios.extend(
+            batch_request(custom_id, pendente['modelo'], prompt, organiza_pergunta(trecho, pendente['contexto']))
+            for custom_id, trecho in zip(pendente['ids'], trechos)
+        )
+    
+    if reenvios:
+        resultados, erros, jobs_reenvio = run_batch(client, reenvios, diretorio, intervalo, status_callback=status_callback)
+        jobs += jobs_reenvio
+    
+    falhas = 0
+    documentos_traduzidos = {nome: [''] * len(linhas) for nome, linhas in linhas_por_documento.items()}
+    for chave, pendente in pendentes.items():
+        if chave not in traducoes:
+            traducoes[chave] = junta_partes(pendente, resultados)
+        if traducoes[chave] is None:
+            # Sem tradução após o reenvio: manter o texto original para não perder a linha
+            falhas += 1
+            logger.error(f"Segmento sem tradução após o reenvio em lote: {pendente['segmento'][:80]}")
+            traducoes[chave] = pendente['segmento']
+        for j in pendente['ocorrencias']:
+            documentos_traduzidos[chave[0]][j] = traducoes[chave].strip()
+    
+    estatisticas_lote = {
+        'documentos': len(documentos),
+        'jobs': jobs,
+        'requisicoes': len(requisicoes),
+        'reenvios': len(reenvios),
+        'falhas': falhas
+    }
+    _, _, input_cost, output_cost = uso_modelos.totals()
+    logger.info(
+        f"Tradução em lote: {len(documentos)} documentos, {len(requisicoes)} requisições em {jobs} jobs, "
+        f"{len(reenvios)} reenvios, {falhas} falhas, ${input_cost + output_cost:.4f}"
+    )
+    if stats_callback:
+        stats_callback({'lote': estatisticas_lote, 'modelos': uso_modelos.as_dict()})
+    
+    return {nome: '\n'.join(linhas) for nome, linhas in documentos_traduzidos.items()}
+
+class TranslationBackend(ABC):
+    """
+    Interface dos mecanismos de tradução selecionáveis por tarefa.
+    
+    Cada mecanismo traduz o texto pré-processado inteiro e informa progresso,
+    tokens e estatísticas pelos mesmos callbacks de traduzir_texto.
+    """
+    
+    nome = None
+    
+    @abstractmethod
+    def traduzir(self, texto, idioma_origem="en", idioma_destino="pt", progress_callback=None,
+                 token_callback=None, stats_callback=None, **opcoes):
+        """
+        Traduz o texto.
+        
+        Args:
+            texto: Texto para ser traduzido (já pré-processado)
+            idioma_origem: Código ISO do idioma de origem
+            idioma_destino: Código ISO do idioma de destino
+            progress_callback, token_callback, stats_callback: Como em traduzir_texto
+            opcoes: Opções específicas do mecanismo
             
-        prompt = organiza_prompt(texto, '\n'.join(linhas_traduzidas), i, linhas, idioma_origem, idioma_destino)
+        Returns:
+            Texto traduzido no idioma de destino
+        """
+
+class OpenAIBackend(TranslationBackend):
+    """
+    Tradução pela API da OpenAI (traduzir_texto, com roteamento, contexto e memória).
+    """
+    
+    nome = 'openai'
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def traduzir(self, texto, idioma_origem="en", idioma_destino="pt", progress_callback=None,
+                 token_callback=None, stats_callback=None, **opcoes):
+        # opcoes: orcamento, roteador, memoria, hedger, controlador, segment_callback...
+        return traduzir_texto(
+            texto, self.client, idioma_origem, idioma_destino,
+            progress_callback=progress_callback, token_callback=token_callback, stats_callback=stats_callback,
+            **opcoes
+        )
+
+class LocalBackend(TranslationBackend):
+    """
+    Tradução automática local, em CPU, sem custo por token e sem acesso à rede.
+    
+    Indicada para documentos em volume ou pouco sensíveis à qualidade: o modelo
+    seq2seq não usa contexto nem instruções, então a tradução é mais literal.
+    Os segmentos distintos são traduzidos em lotes (ver translation_modules.local_mt).
+    """
+    
+    nome = 'local'
+    
+    def __init__(self, **opcoes_modelo):
+        """
+        Args:
+            opcoes_modelo: Repassadas a LocalTranslator (threads, batch_size, beam_size)
+        """
+        self.opcoes_modelo = opcoes_modelo
+    
+    def traduzir(self, texto, idioma_origem="en", idioma_destino="pt", progress_callback=None,
+                 token_callback=None, stats_callback=None, **opcoes):
+        if opcoes:
+            logger.debug(f"Opções ignoradas pela tradução local: {', '.join(opcoes)}")
+        tradutor = get_local_translator(idioma_origem, idioma_destino, **self.opcoes_modelo)
+        inicio = time.perf_counter()
+        inicio_cpu = time.process_time()
         
-        # Contar tokens de entrada (prompt do sistema + linha a ser traduzida)
-        input_tokens = count_tokens(prompt, model) + count_tokens(linha.strip(), model)
-        total_input_tokens += input_tokens
+        linhas = texto.split('\n')
+        linhas_traduzidas = [''] * len(linhas)
+        total_linhas = len(linhas)
+        grupos = group_segments(linhas)
+        estatisticas_dedup = dedup_stats(grupos)
+        linhas_concluidas = total_linhas - estatisticas_dedup['segmentos']
         
-        # Traduzir a linha
-        linha_traduzida = pergunta_LLM(client, model, prompt, linha.strip())
+        # Separar a marcação markdown e proteger fórmulas, código e URLs de cada segmento distinto;
+        # os trechos de todos os segmentos são traduzidos juntos, em lotes
+        trechos = []
+        segmentos = []
+        for ocorrencias in grupos.values():
+            partes_fixas, textos = split_translatable(linhas[ocorrencias[0]].strip())
+            unidades = []
+            for texto_unidade in textos:
+                mascarado, protegidos = mask_spans(texto_unidade)
+                pedacos = split_segment(mascarado, MAX_INPUT_TOKENS, tradutor.count_tokens)
+                unidades.append((texto_unidade, protegidos, len(trechos), len(pedacos)))
+                trechos.extend(pedacos)
+            segmentos.append((ocorrencias, partes_fixas, unidades, len(trechos)))
         
-        # Contar tokens de saída (resposta do modelo)
-        output_tokens = count_tokens(linha_traduzida.strip(), model)
-        total_output_tokens += output_tokens
+        traducoes = []
+        tokens_entrada = 0
+        tokens_saida = 0
+        proximo_segmento = 0
+        for bloco in range(0, len(trechos), TRECHOS_POR_BLOCO_LOCAL):
+            traduzidos, entrada, saida = tradutor.translate_batch(trechos[bloco:bloco + TRECHOS_POR_BLOCO_LOCAL])
+            traducoes.extend(traduzidos)
+            tokens_entrada += entrada
+            tokens_saida += saida
+            
+            # Segmentos com todos os trechos traduzidos contam no progresso
+            while proximo_segmento < len(segmentos) and segmentos[proximo_segmento][3] <= len(traducoes):
+                linhas_concluidas += len(segmentos[proximo_segmento][0])
+                proximo_segmento += 1
+            if progress_callback:
+                progress_callback(linhas_concluidas, total_linhas)
+            if token_callback:
+                token_callback(tokens_entrada, tokens_saida, 0.0, 0.0, 0.0, 0, tokens_entrada)
         
-        linhas_traduzidas.append(linha_traduzida.strip())
+        # Remontar os segmentos; unidades com marcadores alterados são traduzidas de novo sem eles
+        falhas_marcadores = []
+        montados = []
+        for ocorrencias, partes_fixas, unidades, _ in segmentos:
+            traduzidas = []
+            for texto_unidade, protegidos, inicio_trechos, quantidade in unidades:
+                traducao = ' '.join(traducoes[inicio_trechos:inicio_trechos + quantidade])
+                if protegidos and placeholders_intact(traducao, protegidos):
+                    traducao = unmask_spans(traducao, protegidos)
+                elif protegidos:
+                    falhas_marcadores.append((len(montados), len(traduzidas), texto_unidade))
+                traduzidas.append(traducao)
+            montados.append((ocorrencias, partes_fixas, traduzidas))
         
-        # Calcular custos
-        input_cost = total_input_tokens * TOKEN_PRICE_INPUT
-        output_cost = total_output_tokens * TOKEN_PRICE_OUTPUT
-        total_cost = input_cost + output_cost
+        if falhas_marcadores:
+            logger.warning(f"Marcadores alterados em {len(falhas_marcadores)} trechos; traduzindo novamente sem marcadores")
+            pedacos = [split_segment(texto_unidade, MAX_INPUT_TOKENS, tradutor.count_tokens)
+                       for _, _, texto_unidade in falhas_marcadores]
+            traduzidos, entrada, saida = tradutor.translate_batch([p for lista in pedacos for p in lista])
+            tokens_entrada += entrada
+            tokens_saida += saida
+            posicao = 0
+            for (segmento, unidade, _), lista in zip(falhas_marcadores, pedacos):
+                montados[segmento][2][unidade] = ' '.join(traduzidos[posicao:posicao + len(lista)])
+                posicao += len(lista)
         
-        # Atualizar progresso e informações de tokens
-        if progress_callback:
-            progress_callback(i + 1, total_linhas)
+        for ocorrencias, partes_fixas, traduzidas in montados:
+            linha_traduzida = join_translated(partes_fixas, traduzidas).strip()
+            for j in ocorrencias:
+                linhas_traduzidas[j] = linha_traduzida
         
+        segundos = time.perf_counter() - inicio
+        segundos_cpu = time.process_time() - inicio_cpu
+        estatisticas_local = {
+            'segmentos': len(segmentos),
+            'trechos': len(trechos),
+            'threads': tradutor.threads,
+            'segundos': segundos,
+            'segundos_cpu': segundos_cpu,
+            'trechos_por_segundo': len(trechos) / segundos if segundos else 0.0,
+            'falhas_marcadores': len(falhas_marcadores)
+        }
+        logger.info(
+            f"Tradução local: {len(segmentos)} segmentos em {len(trechos)} trechos, {segundos:.1f}s "
+            f"({segundos_cpu:.1f}s de CPU, {tradutor.threads} threads)"
+        )
+        if progress_callback and not grupos:
+            progress_callback(total_linhas, total_linhas)
         if token_callback:
-            token_callback(total_input_tokens, total_output_tokens, input_cost, output_cost, total_cost)
+            token_callback(tokens_entrada, tokens_saida, 0.0, 0.0, 0.0, 0, tokens_entrada)
+        if stats_callback:
+            stats_callback({'deduplicacao': estatisticas_dedup, 'local': estatisticas_local})
         
-    return '\n'.join(linhas_traduzidas)
+        return '\n'.join(linhas_traduzidas)
+
+def obter_backend(nome, client=None):
+    """
+    Cria o mecanismo de tradução escolhido para a tarefa.
+    
+    Args:
+        nome: 'openai' ou 'local'
+        client: Cliente OpenAI configurado (necessário para 'openai')
+        
+    Returns:
+        TranslationBackend: Mecanismo de tradução
+    """
+    if nome == OpenAIBackend.nome:
+        return OpenAIBackend(client)
+    if nome == LocalBackend.nome:
+        return LocalBackend()
+    raise ValueError(f"Mecanismo de tradução desconhecido: {nome}")
+
+def compara_backends(texto, backends, idioma_origem="en", idioma_destino="pt"):
+    """
+    Mede a vazão de cada mecanismo de tradução no mesmo texto.
+    
+    A vazão por núcleo divide os segmentos pelo tempo de CPU consumido nesta
+    máquina: para a API, quase todo o processamento é remoto e o tempo de CPU
+    local é apenas o das requisições; para o modelo local, é o custo real da
+    inferência. Os segmentos (e não os tokens, contados de formas diferentes em
+    cada mecanismo) são a unidade de comparação.
+    
+    Args:
+        texto: Texto pré-processado usado na medição
+        backends: Dicionário nome -> TranslationBackend
+        idioma_origem: Código ISO do idioma de origem
+        idioma_destino: Código ISO do idioma de destino
+        
+    Returns:
+        Dicionário nome -> métricas (segundos, segundos de CPU, núcleos usados,
+        segmentos por segundo, segmentos por segundo de CPU e custo)
+    """
+    segmentos = dedup_stats(group_segments(texto.split('\n')))['segmentos']
+    resultados = {}
+    for nome, backend in backends.items():
+        custo = {'total': 0.0}
+        
+        def registra_custo(*valores):
+            custo['total'] = valores[4]
+        
+        inicio = time.perf_counter()
+        inicio_cpu = time.process_time()
+        backend.traduzir(texto, idioma_origem, idioma_destino, token_callback=registra_custo)
+        segundos = time.perf_counter() - inicio
+        segundos_cpu = time.process_time() - inicio_cpu
+        
+        resultados[nome] = {
+            'segundos': segundos,
+            'segundos_cpu': segundos_cpu,
+            'nucleos_usados': segundos_cpu / segundos if segundos else 0.0,
+            'segmentos_por_segundo': segmentos / segundos if segundos else 0.0,
+            'segmentos_por_segundo_cpu': segmentos / segundos_cpu if segundos_cpu else 0.0,
+            'custo': custo['total']
+        }
+        logger.info(
+            f"{nome}: {segmentos} segmentos em {segundos:.1f}s ({resultados[nome]['segmentos_por_segundo']:.2f}/s), "
+            f"{resultados[nome]['segmentos_por_segundo_cpu']:.2f} por segundo de CPU, ${custo['total']:.4f}"
+        )
+    return resultados
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Compara a vazão dos mecanismos de tradução em um arquivo markdown.")
+    parser.add_argument("arquivo", help="Arquivo markdown (por exemplo, a saída do OCR)")
+    parser.add_argument("--origem", default="en", help="Código do idioma de origem")
+    parser.add_argument("--destino", default="pt", help="Código do idioma de destino")
+    parser.add_argument("--backends", nargs="+", default=["openai", "local"], choices=["openai", "local"])
+    argumentos = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    with open(argumentos.arquivo, encoding="utf-8") as arquivo:
+        texto_benchmark = arquivo.read()
+    cliente = OpenAI() if "openai" in argumentos.backends else None
+    backends_benchmark = {nome: obter_backend(nome, cliente) for nome in argumentos.backends}
+    
+    for nome, metricas in compara_backends(texto_benchmark, backends_benchmark, argumentos.origem, argumentos.destino).items():
+        print(
+            f"{nome:>8}: {metricas['segundos']:8.1f}s | {metricas['segmentos_por_segundo']:8.2f} segmentos/s | "
+            f"{metricas['segmentos_por_segundo_cpu']:8.2f} segmentos/s de CPU ({metricas['nucleos_usados']:.1f} núcleos) | "
+            f"${metricas['custo']:.4f}"
+        )
@@ -2,8 +2,11 @@
 Módulo com componentes de UI reutilizáveis.
 """
 
+import os
 import streamlit as st
+from ..config import ALLOWED_EXTENSIONS
 from ..language_utils import IDIOMAS_SUPORTADOS
+from ..utils.file_utils import add_page_markers
 from ..utils.pdf_processor import display_pdf_preview
 
 def create_file_uploader():
@@ -14,9 +17,9 @@ def create_file_uploader():
         O arquivo carregado ou None
     """
     return st.file_uploader(
-        "Faça upload de um arquivo PDF para traduzi-lo para o idioma desejado.", 
-        type=["pdf"],
-        help="Arraste e solte seu arquivo PDF aqui ou clique para selecionar um arquivo. Limite de 10MB por arquivo."
+        "Faça upload de um arquivo PDF, DOCX, EPUB, HTML ou Markdown para traduzi-lo para o idioma desejado.", 
+        type=sorted(ALLOWED_EXTENSIONS),
+        help="Arraste e solte seu arquivo aqui ou clique para selecionar um arquivo. PDFs passam pelo OCR; DOCX, EPUB, HTML e Markdown são convertidos diretamente, sem OCR. Limite de 10MB por arquivo."
     )
 
 def create_language_selectors():
@@ -54,6 +57,121 @@ def create_language_selectors():
     
     return idioma_origem, idioma_destino
 
+def create_extra_languages_selector(idioma_origem, idioma_destino):
+    """
+    Cria o seletor de idiomas adicionais, traduzidos no mesmo processamento.
+    
+    Args:
+        idioma_origem: Idioma do documento original
+        idioma_destino: Idioma de destino principal
+        
+    Returns:
+        Lista com os idiomas adicionais selecionados
+    """
+    opcoes = [idioma for idioma in IDIOMAS_SUPORTADOS if idioma not in (idioma_origem, idioma_destino)]
+    return st.multiselect(
+        "Traduzir também para:",
+        options=opcoes,
+        key="select_destinos_extras",
+        help="O OCR e a preparação do texto são feitos uma única vez e as traduções rodam em paralelo."
+    )
+
+def create_page_range_input(total_paginas=None):
+    """
+    Cria o campo de seleção das páginas a traduzir.
+    
+    Args:
+        total_paginas: Número de páginas do documento, se conhecido
+        
+    Returns:
+        Seleção digitada pelo usuário (vazia para todas as páginas)
+    """
+    total = f" (o documento tem {total_paginas} páginas)" if total_paginas else ""
+    return st.text_input(
+        "Páginas a traduzir",
+        value="",
+        placeholder="Todas",
+        key="input_paginas",
+        help=f"Ex.: 1-5, 8, 10-12{total}. Apenas as páginas selecionadas são enviadas ao OCR e traduzidas. Deixe em branco para traduzir o documento inteiro."
+    )
+
+# Mecanismos de tradução (ver translator.obter_backend)
+MECANISMOS_TRADUCAO = {
+    "OpenAI (melhor qualidade)": "openai",
+    "Local na CPU (sem custo, offline)": "local"
+}
+
+def create_backend_selector():
+    """
+    Cria o seletor do mecanismo de tradução da tarefa.
+    
+    Returns:
+        Nome do mecanismo escolhido ('openai' ou 'local')
+    """
+    rotulo = st.selectbox(
+        "Mecanismo de tradução",
+        options=list(MECANISMOS_TRADUCAO),
+        key="select_mecanismo",
+        help="A tradução local usa um modelo de tradução automática na CPU do servidor: não tem custo por token nem depende da API, mas é mais literal. Indicada para documentos em volume ou pouco sensíveis."
+    )
+    return MECANISMOS_TRADUCAO[rotulo]
+
+# Mecanismos de OCR (ver ocr_backends.get_ocr_backend)
+MECANISMOS_OCR = {
+    "Mistral (nuvem)": "mistral",
+    "Local na CPU (sem custo, offline)": "local"
+}
+
+def create_ocr_selector():
+    """
+    Cria o seletor do mecanismo de OCR da tarefa.
+    
+    O mecanismo padrão vem da variável de ambiente OCR_BACKEND.
+    
+    Returns:
+        Nome do mecanismo escolhido ('mistral' ou 'local')
+    """
+    nomes = list(MECANISMOS_OCR.values())
+    padrao = os.getenv('OCR_BACKEND', 'mistral')
+    rotulo = st.selectbox(
+        "Mecanismo de OCR",
+        options=list(MECANISMOS_OCR),
+        index=nomes.index(padrao) if padrao in nomes else 0,
+        key="select_ocr",
+        help="O OCR local renderiza as páginas e as reconhece com o Tesseract na CPU do servidor, usando todos os núcleos: não tem custo nem envia o documento, mas reconhece pior tabelas, fórmulas e layouts complexos."
+    )
+    return MECANISMOS_OCR[rotulo]
+
+def create_draft_mode_toggle():
+    """
+    Cria a opção de tradução em duas etapas (rascunho rápido e refinamento).
+    
+    Returns:
+        Boolean indicando se o modo rascunho está ativado
+    """
+    return st.toggle(
+        "Rascunho rápido com refinamento",
+        key="modo_rascunho",
+        help="O documento é traduzido primeiro por um modelo rápido e exibido em segundos; em seguida os trechos são traduzidos de novo pelo modelo principal e o texto e os downloads são atualizados."
+    )
+
+def create_budget_input():
+    """
+    Cria o campo de orçamento máximo da tradução.
+    
+    Returns:
+        Orçamento máximo em dólares, ou None se não houver limite
+    """
+    orcamento = st.number_input(
+        "Orçamento máximo (US$)",
+        min_value=0.0,
+        value=0.0,
+        step=0.5,
+        format="%.2f",
+        help="A tradução não é iniciada se o custo estimado exceder este valor, e é interrompida antes de ultrapassá-lo. Use 0 para não limitar."
+    )
+    return orcamento or None
+
 def create_translate_button(idioma_destino):
     """
     Cria o botão de tradução centralizado.
@@ -81,6 +199,55 @@ def create_translate_button(idioma_destino):
     
     return clicked
 
+def create_reader_button():
+    """
+    Cria o botão que abre o documento no leitor com tradução sob demanda.
+    
+    Returns:
+        Boolean indicando se o botão foi clicado
+    """
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col2:
+        clicked = st.button(
+            "Ler com tradução sob demanda", key="abrir_leitor", use_container_width=True,
+            help="Cada página é traduzida quando é aberta e as seguintes são traduzidas em segundo plano. Você paga apenas pelas páginas lidas."
+        )
+    return clicked
+
+def create_reader_navigation(paginas):
+    """
+    Cria a navegação entre as páginas do leitor.
+    
+    A posição da página aberta fica em st.session_state.leitor_pagina.
+    
+    Args:
+        paginas: Números das páginas no documento original
+        
+    Returns:
+        Posição da página a exibir
+    """
+    def muda_pagina(deslocamento):
+        # Executado antes da próxima execução do script, quando o seletor ainda pode ser alterado
+        st.session_state.leitor_pagina = min(max(st.session_state.leitor_pagina + deslocamento, 0), len(paginas) - 1)
+    
+    indice_atual = st.session_state.leitor_pagina
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("◀ Anterior", key="leitor_anterior", disabled=indice_atual == 0, use_container_width=True,
+                  on_click=muda_pagina, args=(-1,))
+    with col2:
+        st.selectbox(
+            "Página",
+            options=list(range(len(paginas))),
+            format_func=lambda indice: f"Página {paginas[indice]} ({indice + 1} de {len(paginas)})",
+            key="leitor_pagina",
+            label_visibility="collapsed"
+        )
+    with col3:
+        st.button("Próxima ▶", key="leitor_proxima", disabled=indice_atual >= len(paginas) - 1, use_container_width=True,
+                  on_click=muda_pagina, args=(1,))
+    return st.session_state.leitor_pagina
+
 def create_progress_indicators():
     """
     Cria os indicadores de progresso (barra e texto).
@@ -94,14 +261,22 @@ def create_progress_indicators():
     
     return progress_container, progress_bar, status_text
 
-def create_download_buttons(idioma_origem, idioma_destino):
+def create_download_buttons(idioma_origem, idioma_destino, translated_text=None, pdf_bytes=None, key_suffix="", pdf_pendente=False):
     """
     Cria os botões de download para os resultados.
     
     Args:
         idioma_origem: Idioma de origem
         idioma_destino: Idioma de destino
+        translated_text: Texto traduzido (padrão: o da sessão)
+        pdf_bytes: PDF traduzido (padrão: o da sessão)
+        key_suffix: Sufixo das chaves dos botões, para exibir vários idiomas na mesma página
+        pdf_pendente: Indica que o PDF ainda está sendo gerado
     """
+    if translated_text is None:
+        translated_text = st.session_state.translated_text
+        pdf_bytes = st.session_state.pdf_bytes
+    
     st.markdown("<div class='download-buttons-container'>", unsafe_allow_html=True)
     
     # Criar três colunas iguais para os botões
@@ -114,7 +289,7 @@ def create_download_buttons(idioma_origem, idioma_destino):
             data=st.session_state.processed_text,
             file_name=f"{st.session_state.output_filename}.md",
             mime="text/markdown",
-            key="btn_md_original",
+            key=f"btn_md_original{key_suffix}",
             use_container_width=True
         )
     
@@ -122,24 +297,26 @@ def create_download_buttons(idioma_origem, idioma_destino):
     with col2:
         st.download_button(
             label=f"Baixar Markdown\n({idioma_destino})",
-            data=st.session_state.translated_text,
+            data=add_page_markers(translated_text, st.session_state.get('indice_paginas')),
             file_name=f"{st.session_state.output_filename}_{IDIOMAS_SUPORTADOS[idioma_destino]['code']}.md",
             mime="text/markdown",
-            key="btn_md_traduzido",
+            key=f"btn_md_traduzido{key_suffix}",
             use_container_width=True
         )
     
     # Botão para download do PDF formatado
     with col3:
-        if st.session_state.pdf_bytes:
+        if pdf_bytes:
             st.download_button(
                 label=f"Baixar PDF\n({idioma_destino})",
-                data=st.session_state.pdf_bytes,
+                data=pdf_bytes,
                 file_name=f"{st.session_state.output_filename}_{IDIOMAS_SUPORTADOS[idioma_destino]['code']}.pdf",
                 mime="application/pdf",
-                key="btn_pdf",
+                key=f"btn_pdf{key_suffix}",
                 use_container_width=True
             )
+        elif pdf_pendente:
+            st.info("Gerando PDF formatado...")
         else:
             st.error("Não foi possível gerar o PDF formatado")
     
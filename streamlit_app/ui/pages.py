@@ -3,19 +3,54 @@ Módulo com funções para renderização das páginas da aplicação.
 """
 
 import os
+import threading
+import time
 import streamlit as st
 from ..language_utils import IDIOMAS_SUPORTADOS
-from ..translator import traduzir_texto
-from ..utils.file_utils import validate_file, cleanup_old_files, save_uploaded_file, process_uploaded_pdf, get_output_filename
-from ..utils.session_manager import initialize_session_state, update_processed_text, update_translated_text, update_pdf_bytes
-from ..utils.pdf_processor import generate_formatted_pdf
+from ..translator import (
+    traduzir_texto, traduzir_para_varios_idiomas, count_tokens, estima_traducao, traduzir_rascunho, refinar_traducao,
+    LocalBackend, obter_backend
+)
+from ..translation_modules.estimator import BudgetExceededError
+from ..translation_modules.concurrency import ConcurrencyController
+from ..translation_modules.fuzzy_memory import FuzzyTranslationMemory
+from ..translation_modules.hedging import HedgedCaller
+from ..translation_modules.prompts import PROMPT_CACHE_MIN_TOKENS
+from ..ocr_backends import get_ocr_backend, is_local_ocr_available as local_ocr_available
+from ..translation_modules.local_mt import is_available as local_mt_available, model_path as local_mt_model_path
+from ..translation_modules.reflow import reflow_paragraphs, reflow_with_origins
+from ..translation_modules.normalization import normalize_text, token_savings
+from ..utils.file_utils import (
+    validate_file, cleanup_old_files, save_uploaded_file, process_uploaded_file, get_output_filename,
+    count_pdf_pages, parse_page_range, format_page_range, extract_file_pages, remap_page_index
+)
+from ..utils.input_adapters import is_document
+from ..utils.lazy_reader import LazyPageTranslator, USAGE_FIELDS
+from ..utils.refinement import BackgroundRefinement
+from ..utils.session_manager import (
+    initialize_session_state, update_processed_text, update_translated_text, update_pdf_bytes, update_translation_stats,
+    update_token_info as update_session_token_info, update_extra_translation, clear_extra_translations, update_reader,
+    update_refinement, update_pdf_job
+)
+from ..utils.pdf_processor import submit_pdf_render
 from .components import (
-    create_file_uploader, create_language_selectors, create_translate_button,
+    create_file_uploader, create_language_selectors, create_extra_languages_selector, create_page_range_input,
+    create_ocr_selector, create_backend_selector, create_draft_mode_toggle, create_budget_input, create_translate_button, create_reader_button, create_reader_navigation,
     create_progress_indicators, create_download_buttons, show_error_message,
     show_success_message, show_api_key_error, show_mistral_api_key_error
 )
 from ..config import get_openai_client
 
+LOCAL_OCR_INDISPONIVEL = (
+    "OCR local indisponível: instale os pacotes pypdfium2 e pytesseract e o executável do Tesseract "
+    "com os idiomas do documento."
+)
+
+# Intervalo entre as atualizações da tela enquanto o rascunho é refinado, em segundos
+REFINEMENT_REFRESH_SECONDS = 2
+# Intervalo entre as verificações do PDF formatado em geração, em segundos
+PDF_REFRESH_SECONDS = 1
+
 def render_main_page():
     """
     Renderiza a página principal da aplicação.
@@ -23,15 +58,6 @@ def render_main_page():
     # Inicializar variáveis de session_state
     initialize_session_state()
     
-    # Verificar se as variáveis de ambiente necessárias estão configuradas
-    if not os.getenv('OPENAI_API_KEY'):
-        show_api_key_error()
-        return
-    
-    if not os.getenv('MISTRAL_API_KEY'):
-        show_mistral_api_key_error()
-        return
-    
     # Upload de arquivo
     uploaded_file = create_file_uploader()
     
@@ -44,25 +70,80 @@ def render_main_page():
         
         # Seletores de idioma
         idioma_origem, idioma_destino = create_language_selectors()
+        idiomas_extras = create_extra_languages_selector(idioma_origem, idioma_destino)
+        
+        # Páginas a traduzir e mecanismo de OCR (apenas PDFs; os demais formatos são convertidos sem OCR)
+        paginas, ocr = None, None
+        if not is_document(uploaded_file.name):
+            total_paginas = count_pdf_pages(uploaded_file)
+            try:
+                paginas = parse_page_range(create_page_range_input(total_paginas), total_paginas)
+            except ValueError as e:
+                show_error_message(str(e))
+                return
+            ocr = create_ocr_selector()
+        
+        # Mecanismo de tradução e tradução em duas etapas (rascunho rápido e refinamento em segundo plano)
+        mecanismo = create_backend_selector()
+        rascunho = create_draft_mode_toggle() if mecanismo == "openai" else False
+        
+        # Verificar as chaves de API dos mecanismos escolhidos
+        if ocr == "mistral" and not (os.getenv('MISTRAL_API_KEY') or os.getenv('MISTRAL_API_KEYS')):
+            show_mistral_api_key_error()
+            return
+        
+        if mecanismo == "openai" and not (os.getenv('OPENAI_API_KEY') or os.getenv('OPENAI_API_KEYS')):
+            show_api_key_error()
+            return
+        
+        # Orçamento máximo da tradução
+        orcamento = create_budget_input()
         
         # Botão para traduzir
-        traduzir_clicked = create_translate_button(idioma_destino)
+        traduzir_clicked = create_translate_button(", ".join([idioma_destino] + idiomas_extras))
+        
+        # Botão para ler com tradução sob demanda
+        abrir_leitor = create_reader_button()
+        chave_leitor = (uploaded_file.name, uploaded_file.size, idioma_origem, idioma_destino, tuple(paginas or ()), ocr,
+                        mecanismo)
         
         if traduzir_clicked:
-            process_translation(uploaded_file, idioma_origem, idioma_destino)
+            process_translation(uploaded_file, idioma_origem, idioma_destino, orcamento, idiomas_extras, paginas, rascunho,
+                                mecanismo, ocr)
+        
+        if abrir_leitor:
+            process_reader(uploaded_file, idioma_origem, idioma_destino, paginas, orcamento, chave_leitor, ocr, mecanismo)
+        
+        # Leitor aberto para o mesmo documento, idiomas e páginas
+        if st.session_state.leitor is not None and st.session_state.leitor_chave == chave_leitor:
+            render_reader(idioma_destino)
+        
+        # Trazer para a sessão os segmentos já refinados
+        refinando = sync_refinement()
         
         # Exibir mensagem de sucesso se a tradução foi concluída
         if st.session_state.mensagem_sucesso:
             show_success_message(st.session_state.mensagem_sucesso)
         
         # Exibir botões de download se os dados estiverem disponíveis
+        gerando_pdf = False
         if st.session_state.processed_text and st.session_state.translated_text:
-            display_download_options(idioma_origem, idioma_destino)
+            gerando_pdf = display_download_options(idioma_origem, idioma_destino)
+        
+        # Resultados dos idiomas adicionais
+        if st.session_state.processed_text and st.session_state.extra_translations:
+            gerando_pdf = display_extra_download_options(idioma_origem) or gerando_pdf
     
     # Limpar arquivos antigos periodicamente
     cleanup_old_files()
+    
+    # Atualizar a tela até o refinamento e a geração dos PDFs terminarem
+    if uploaded_file is not None and (refinando or gerando_pdf):
+        time.sleep(REFINEMENT_REFRESH_SECONDS if refinando else PDF_REFRESH_SECONDS)
+        st.rerun()
 
-def process_translation(uploaded_file, idioma_origem, idioma_destino):
+def process_translation(uploaded_file, idioma_origem, idioma_destino, orcamento=None, idiomas_extras=None, paginas=None,
+                        rascunho=False, mecanismo="openai", ocr="mistral"):
     """
     Processa a tradução do arquivo carregado.
     
@@ -70,9 +151,26 @@ def process_translation(uploaded_file, idioma_origem, idioma_destino):
         uploaded_file: Arquivo carregado pelo usuário
         idioma_origem: Idioma de origem
         idioma_destino: Idioma de destino
+        orcamento: Custo máximo da tradução em dólares (opcional)
+        idiomas_extras: Idiomas de destino adicionais, traduzidos a partir do mesmo OCR (opcional)
+        paginas: Páginas a processar, começando em 1 (opcional; todas se omitido)
+        rascunho: Traduz primeiro com o modelo rápido e refina em segundo plano (apenas para um idioma)
+        mecanismo: Mecanismo de tradução ('openai' ou 'local')
+        ocr: Mecanismo de OCR dos PDFs ('mistral' ou 'local'; None para documentos convertidos sem OCR)
     """
     try:
-        client = get_openai_client()
+        codigo_origem = IDIOMAS_SUPORTADOS[idioma_origem]["code"]
+        if ocr == "local" and not local_ocr_available():
+            show_error_message(LOCAL_OCR_INDISPONIVEL)
+            return
+        
+        # Verificar os modelos locais antes do OCR, para não gastar com um documento que não será traduzido
+        if mecanismo == "local" and not local_models_available(codigo_origem, [idioma_destino] + (idiomas_extras or [])):
+            return
+        
+        client = get_openai_client() if mecanismo == "openai" else None
+        clear_extra_translations()
+        update_refinement(None)
         
         # Criar indicadores de progresso
         progress_container, progress_bar, status_text = create_progress_indicators()
@@ -80,54 +178,136 @@ def process_translation(uploaded_file, idioma_origem, idioma_destino):
         # Criar container para informações de tokens e custos
         token_info_container = st.empty()
         
-        # Fase 1: Processamento do PDF
-        status_text.markdown("<div class='status-text'>Lendo o PDF... Isso pode levar alguns instantes.</div>", unsafe_allow_html=True)
+        # Fase 1: Processamento do PDF (OCR) ou conversão do documento
+        selecao = f" (páginas {format_page_range(paginas)})" if paginas else ""
+        origem = "PDF" if ocr else "documento"
+        status_text.markdown(f"<div class='status-text'>Lendo o {origem}{selecao}... Isso pode levar alguns instantes.</div>", unsafe_allow_html=True)
         progress_bar.progress(0.1)  # Mostrar algum progresso inicial
         
         # Salvar o arquivo temporariamente
         temp_path = save_uploaded_file(uploaded_file)
         
         try:
-            # Processar o PDF
-            full_text, success = process_uploaded_pdf(str(temp_path))
+            # Processar o PDF ou converter o documento
+            full_text, success, indice_paginas = process_uploaded_file(str(temp_path), paginas, get_ocr_backend(ocr, codigo_origem) if ocr else None)
             
             if not success:
-                show_error_message("Erro ao processar o PDF.")
+                show_error_message(f"Erro ao processar o {origem}.")
                 return
             
-            # Armazenar o texto processado na sessão
-            update_processed_text(full_text, get_output_filename(uploaded_file.name))
+            # Normalizar o texto (linha a linha) e unir as linhas quebradas pelo OCR em parágrafos completos
+            texto_normalizado = normalize_text(full_text)
+            relatorio_normalizacao = token_savings(full_text, texto_normalizado, count_tokens)
+            texto_para_traducao, origens = reflow_with_origins(texto_normalizado)
+            
+            # Armazenar o texto processado na sessão; o nome do arquivo indica as páginas traduzidas.
+            # O índice das páginas passa a apontar para as linhas do texto traduzido
+            output_filename = get_output_filename(uploaded_file.name)
+            if paginas:
+                output_filename = f"{output_filename}_p{format_page_range(paginas).replace(',', '_')}"
+            if indice_paginas:
+                indice_paginas = remap_page_index(indice_paginas, origens)
+            update_processed_text(full_text, output_filename, paginas, indice_paginas)
             
             # Atualizar progresso após processamento do PDF
             progress_bar.progress(0.3)
-            status_text.markdown("<div class='status-text'>PDF processado com sucesso! Iniciando tradução...</div>", unsafe_allow_html=True)
+            status_text.markdown("<div class='status-text'>Texto extraído com sucesso! Iniciando tradução...</div>", unsafe_allow_html=True)
             
             # Fase 2: Tradução
+            controlador = ConcurrencyController()
+            
             def update_progress(current, total):
                 # Ajustar a barra de progresso para começar de 30% (processamento do PDF)
                 # e ir até 100% (tradução completa)
                 progress = 0.3 + (current / total * 0.7)
                 progress_bar.progress(progress)
-                status_text.markdown(f"<div class='status-text'>Traduzindo... {current}/{total} linhas ({int((current/total) * 100)}%)</div>", unsafe_allow_html=True)
+                ajustes = controlador.settings()
+                status_text.markdown(
+                    f"<div class='status-text'>Traduzindo... {current}/{total} linhas ({int((current/total) * 100)}%)"
+                    f" | {ajustes['concorrencia']} requisições simultâneas, até {ajustes['tokens_por_requisicao']} tokens por requisição</div>",
+                    unsafe_allow_html=True
+                )
             
             # Função para atualizar informações de tokens e custos
-            def update_token_info(input_tokens, output_tokens, input_cost, output_cost, total_cost):
+            def update_token_info(input_tokens, output_tokens, input_cost, output_cost, total_cost, context_tokens=0, payload_tokens=0):
                 # Atualizar na sessão
-                from ..utils.session_manager import update_token_info as update_session_token_info
-                update_session_token_info(input_tokens, output_tokens, input_cost, output_cost, total_cost)
+                update_session_token_info(input_tokens, output_tokens, input_cost, output_cost, total_cost, context_tokens, payload_tokens)
                 
                 # Exibir na interface (apenas durante o processo de tradução)
-                display_token_info(token_info_container, input_tokens, output_tokens, input_cost, output_cost, total_cost)
+                display_token_info(token_info_container, input_tokens, output_tokens, input_cost, output_cost, total_cost, context_tokens, payload_tokens)
+            
+            def update_stats(stats):
+                update_translation_stats({**stats, 'normalizacao': relatorio_normalizacao})
+            
+            if mecanismo == "local":
+                # Sem custo por token: sem estimativa nem orçamento
+                process_multi_translation(
+                    texto_para_traducao, None, idioma_origem, [idioma_destino] + (idiomas_extras or []), None,
+                    progress_bar, status_text, token_info_container, relatorio_normalizacao, backend=LocalBackend()
+                )
+                progress_container.empty()
+                status_text.empty()
+                token_info_container.empty()
+                return
+            
+            # Estimar custo e tempo antes de qualquer chamada ao modelo
+            codigo_destino = IDIOMAS_SUPORTADOS[idioma_destino]["code"]
+            if idiomas_extras:
+                estimativa = soma_estimativas([
+                    estima_traducao(texto_para_traducao, codigo_origem, IDIOMAS_SUPORTADOS[idioma]["code"])
+                    for idioma in [idioma_destino] + idiomas_extras
+                ])
+            else:
+                estimativa = estima_traducao(texto_para_traducao, codigo_origem, codigo_destino)
+            display_cost_estimate(token_info_container, estimativa)
+            
+            if orcamento and estimativa['custo_total'] > orcamento:
+                progress_container.empty()
+                status_text.empty()
+                show_error_message(
+                    f"O custo estimado (${estimativa['custo_total']:.4f}) excede o orçamento de ${orcamento:.2f}. "
+                    "A tradução não foi iniciada."
+                )
+                return
+            
+            if idiomas_extras:
+                process_multi_translation(
+                    texto_para_traducao, client, idioma_origem, [idioma_destino] + idiomas_extras, orcamento,
+                    progress_bar, status_text, token_info_container, relatorio_normalizacao
+                )
+                progress_container.empty()
+                status_text.empty()
+                token_info_container.empty()
+                return
+            
+            if rascunho:
+                process_draft_translation(
+                    texto_para_traducao, client, codigo_origem, codigo_destino, orcamento,
+                    update_progress, update_token_info, update_stats
+                )
+                progress_container.empty()
+                status_text.empty()
+                token_info_container.empty()
+                return
             
             # Iniciar a tradução com a barra de progresso e informações de tokens
-            texto_traduzido = traduzir_texto(
-                full_text, 
-                client,
-                idioma_origem=IDIOMAS_SUPORTADOS[idioma_origem]["code"],
-                idioma_destino=IDIOMAS_SUPORTADOS[idioma_destino]["code"],
-                progress_callback=update_progress,
-                token_callback=update_token_info
-            )
+            try:
+                texto_traduzido = traduzir_texto(
+                    texto_para_traducao, 
+                    client,
+                    idioma_origem=codigo_origem,
+                    idioma_destino=codigo_destino,
+                    progress_callback=update_progress,
+                    token_callback=update_token_info,
+                    stats_callback=update_stats,
+                    orcamento=orcamento,
+                    controlador=controlador
+                )
+            except BudgetExceededError as e:
+                progress_container.empty()
+                status_text.empty()
+                show_error_message(f"Tradução interrompida: {str(e)}")
+                return
             
             # Armazenar o texto traduzido na sessão
             update_translated_text(texto_traduzido)
@@ -145,7 +325,362 @@ def process_translation(uploaded_file, idioma_origem, idioma_destino):
     except Exception as e:
         show_error_message(f"Ocorreu um erro inesperado: {str(e)}")
 
-def display_token_info(container=None, input_tokens=None, output_tokens=None, input_cost=None, output_cost=None, total_cost=None):
+def process_draft_translation(texto, client, codigo_origem, codigo_destino, orcamento, progress_callback,
+                              token_callback, stats_callback):
+    """
+    Traduz o rascunho com o modelo rápido, exibe-o e inicia o refinamento em segundo plano.
+    
+    Args:
+        texto: Texto pré-processado para tradução
+        client: Cliente OpenAI configurado
+        codigo_origem: Código ISO do idioma de origem
+        codigo_destino: Código ISO do idioma de destino
+        orcamento: Custo máximo em dólares para o rascunho e o refinamento juntos (opcional)
+        progress_callback, token_callback, stats_callback: Callbacks da interface para o rascunho
+    """
+    refinamento = BackgroundRefinement(len(texto.split('\n')))
+    
+    def registra_uso(*valores):
+        refinamento.record_draft_usage(*valores)
+        token_callback(*valores)
+    
+    try:
+        traduzir_rascunho(
+            texto, client, codigo_origem, codigo_destino,
+            progress_callback=progress_callback, token_callback=registra_uso, stats_callback=stats_callback,
+            orcamento=orcamento, segment_callback=refinamento.update
+        )
+    except BudgetExceededError as e:
+        show_error_message(f"Tradução interrompida: {str(e)}")
+        return
+    
+    update_translated_text(refinamento.text())
+    st.session_state.mensagem_sucesso = "Rascunho concluído! O texto está sendo refinado pelo modelo principal."
+    
+    # O refinamento usa o que sobrou do orçamento; os callbacks rodam na thread do refinamento
+    orcamento_refinamento = orcamento - refinamento.draft_usage['total_cost'] if orcamento else None
+    refinamento.start(lambda r: refinar_traducao(
+        texto, client, codigo_origem, codigo_destino,
+        segment_callback=r.refined, progress_callback=r.record_progress,
+        token_callback=r.record_refine_usage, stats_callback=r.record_stats,
+        orcamento=orcamento_refinamento, cancelamento=r.cancel_event
+    ))
+    update_refinement(refinamento)
+
+def sync_refinement():
+    """
+    Atualiza a sessão com os segmentos já refinados em segundo plano.
+    
+    Returns:
+        Boolean indicando se o refinamento ainda está em andamento
+    """
+    refinamento = st.session_state.refinamento
+    if refinamento is None:
+        return False
+    
+    # Verificado antes da cópia do texto, para que os últimos segmentos não fiquem de fora
+    em_andamento = refinamento.running
+    if refinamento.version != st.session_state.refinamento_versao:
+        st.session_state.refinamento_versao = refinamento.version
+        st.session_state.translated_text = refinamento.text()
+        update_session_token_info(**refinamento.usage())
+    
+    if em_andamento:
+        atual, total = refinamento.progress
+        andamento = f" {atual}/{total} linhas" if total else ""
+        st.markdown(
+            f"<div class='status-text'>Refinando a tradução com o modelo principal...{andamento}"
+            f" ({refinamento.refined_segments} segmentos atualizados)</div>",
+            unsafe_allow_html=True
+        )
+        return True
+    
+    # Refinamento concluído: gerar o PDF de novo com o texto final
+    update_pdf_bytes(None)
+    if refinamento.error is not None:
+        st.session_state.mensagem_sucesso = None
+        show_error_message(f"O refinamento foi interrompido; o download contém o rascunho com os trechos já refinados: {str(refinamento.error)}")
+    else:
+        st.session_state.mensagem_sucesso = "Tradução refinada com sucesso!"
+    if st.session_state.translation_stats is not None:
+        modelos = (refinamento.stats or {}).get('modelos', {})
+        update_translation_stats({
+            **st.session_state.translation_stats,
+            'refinamento': {'segmentos': refinamento.refined_segments, 'modelos': modelos}
+        })
+    update_refinement(None)
+    return False
+
+def local_models_available(codigo_origem, idiomas):
+    """
+    Verifica se há modelos de tradução local para os idiomas de destino, exibindo o erro se faltar algum.
+    
+    Args:
+        codigo_origem: Código ISO do idioma de origem
+        idiomas: Idiomas de destino
+        
+    Returns:
+        Boolean indicando se todos os modelos estão instalados
+    """
+    sem_modelo = [idioma for idioma in idiomas
+                  if not local_mt_available(codigo_origem, IDIOMAS_SUPORTADOS[idioma]["code"])]
+    if sem_modelo:
+        caminhos = ", ".join(str(local_mt_model_path(codigo_origem, IDIOMAS_SUPORTADOS[idioma]["code"])) for idioma in sem_modelo)
+        show_error_message(
+            f"Tradução local indisponível para {', '.join(sem_modelo).lower()}: instale os pacotes ctranslate2 e "
+            f"sentencepiece e coloque os modelos convertidos em {caminhos}."
+        )
+        return False
+    return True
+
+def process_reader(uploaded_file, idioma_origem, idioma_destino, paginas=None, orcamento=None, chave=None, ocr="mistral",
+                   mecanismo="openai"):
+    """
+    Faz o OCR do arquivo e abre o leitor com tradução sob demanda.
+    
+    Args:
+        uploaded_file: Arquivo carregado pelo usuário
+        idioma_origem: Idioma de origem
+        idioma_destino: Idioma de destino
+        paginas: Páginas a processar, começando em 1 (opcional; todas se omitido)
+        orcamento: Custo máximo em dólares para todas as páginas lidas (opcional)
+        chave: Identificação do documento, dos idiomas e das páginas do leitor
+        ocr: Mecanismo de OCR dos PDFs ('mistral' ou 'local'; None para documentos convertidos sem OCR)
+        mecanismo: Mecanismo de tradução das páginas ('openai' ou 'local', sem custo e sem acesso à rede)
+    """
+    try:
+        if ocr == "local" and not local_ocr_available():
+            show_error_message(LOCAL_OCR_INDISPONIVEL)
+            return
+        
+        codigo_origem = IDIOMAS_SUPORTADOS[idioma_origem]["code"]
+        if mecanismo == "local" and not local_models_available(codigo_origem, [idioma_destino]):
+            return
+        
+        # O cliente da OpenAI só é criado quando as páginas são traduzidas pela API
+        backend = obter_backend(mecanismo, get_openai_client() if mecanismo == "openai" else None)
+        progress_container, progress_bar, status_text = create_progress_indicators()
+        origem = "PDF" if ocr else "documento"
+        status_text.markdown(f"<div class='status-text'>Lendo o {origem}... Isso pode levar alguns instantes.</div>", unsafe_allow_html=True)
+        progress_bar.progress(0.1)
+        
+        temp_path = save_uploaded_file(uploaded_file)
+        try:
+            paginas_extraidas = extract_file_pages(str(temp_path), paginas, get_ocr_backend(ocr, codigo_origem) if ocr else None)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        progress_container.empty()
+        status_text.empty()
+        
+        if not paginas_extraidas:
+            show_error_message(f"Nenhuma página foi extraída do {origem}.")
+            return
+        
+        codigo_destino = IDIOMAS_SUPORTADOS[idioma_destino]["code"]
+        
+        # Memória, HedgedCaller e controlador compartilhados entre as páginas do documento
+        memoria = FuzzyTranslationMemory()
+        hedger = HedgedCaller()
+        controlador = ConcurrencyController()
+        
+        # Custo estimado das páginas em andamento, reservado do orçamento até que terminem
+        reservas = {'custo': 0.0}
+        trava_reservas = threading.Lock()
+        
+        # Tradução local: sem custo por token, então sem reserva do orçamento
+        usa_orcamento = bool(orcamento) and mecanismo == "openai"
+        
+        def traduz_pagina(texto):
+            texto_para_traducao = reflow_paragraphs(normalize_text(texto))
+            orcamento_pagina = None
+            if usa_orcamento:
+                custo_estimado = estima_traducao(texto_para_traducao, codigo_origem, codigo_destino)['custo_total']
+                with trava_reservas:
+                    gasto = leitor.usage()['total_cost'] + reservas['custo']
+                    if gasto + custo_estimado > orcamento:
+                        raise BudgetExceededError(gasto, orcamento)
+                    orcamento_pagina = orcamento - gasto
+                    reservas['custo'] += custo_estimado
+            
+            uso = {}
+            try:
+                traducao = backend.traduzir(
+                    texto_para_traducao, codigo_origem, codigo_destino,
+                    token_callback=lambda *valores: uso.update(zip(USAGE_FIELDS, valores)),
+                    memoria=memoria, orcamento=orcamento_pagina, hedger=hedger, controlador=controlador
+                )
+            finally:
+                if usa_orcamento:
+                    with trava_reservas:
+                        reservas['custo'] -= custo_estimado
+            return traducao, uso
+        
+        leitor = LazyPageTranslator(paginas_extraidas, traduz_pagina)
+        update_reader(leitor, chave)
+        
+    except Exception as e:
+        show_error_message(f"Ocorreu um erro inesperado: {str(e)}")
+
+def render_reader(idioma_destino):
+    """
+    Exibe a página aberta no leitor, lado a lado com a tradução.
+    
+    A tradução da página é aguardada apenas se ainda não estiver pronta; as
+    páginas seguintes são traduzidas em segundo plano.
+    
+    Args:
+        idioma_destino: Idioma de destino
+    """
+    leitor = st.session_state.leitor
+    indice = create_reader_navigation([numero for numero, _ in leitor.pages])
+    traducao_futura = leitor.open(indice)
+    
+    col_original, col_traducao = st.columns(2)
+    with col_original:
+        st.markdown("**Original**")
+        st.markdown(leitor.source(indice))
+    
+    with col_traducao:
+        st.markdown(f"**{idioma_destino}**")
+        try:
+            if not traducao_futura.done():
+                with st.spinner("Traduzindo a página..."):
+                    traducao_futura.result()
+            st.markdown(traducao_futura.result()[0])
+        except BudgetExceededError as e:
+            show_error_message(f"Página não traduzida: {str(e)}")
+        except Exception as e:
+            show_error_message(f"Erro ao traduzir a página (ela será traduzida de novo ao ser aberta): {str(e)}")
+    
+    estatisticas = leitor.stats()
+    st.markdown(
+        f"<div class='status-text'>{estatisticas['traduzidas']} de {estatisticas['paginas']} páginas traduzidas"
+        f" ({estatisticas['em_andamento']} em segundo plano)</div>",
+        unsafe_allow_html=True
+    )
+    display_token_info(None, **leitor.usage())
+    
+    traduzidas = leitor.translated_pages()
+    if traduzidas:
+        st.download_button(
+            label=f"Baixar páginas traduzidas ({len(traduzidas)})",
+            data="\n\n".join(traduzidas.values()),
+            file_name=f"{get_output_filename(st.session_state.leitor_chave[0])}_paginas_{IDIOMAS_SUPORTADOS[idioma_destino]['code']}.md",
+            mime="text/markdown",
+            key="leitor_download"
+        )
+
+def process_multi_translation(texto, client, idioma_origem, idiomas, orcamento, progress_bar, status_text,
+                              token_info_container, relatorio_normalizacao, backend=None):
+    """
+    Traduz o texto já pré-processado para vários idiomas em paralelo.
+    
+    O primeiro idioma ocupa o estado principal da sessão; os demais ficam em
+    extra_translations.
+    
+    Args:
+        texto: Texto pré-processado (normalizado e com parágrafos unidos)
+        client: Cliente OpenAI configurado
+        idioma_origem: Idioma de origem
+        idiomas: Idiomas de destino (o primeiro é o principal)
+        orcamento: Custo máximo em dólares para todos os idiomas (opcional)
+        progress_bar: Barra de progresso
+        status_text: Texto de status
+        token_info_container: Container das informações de tokens
+        relatorio_normalizacao: Economia de tokens da normalização
+        backend: TranslationBackend alternativo; os idiomas são traduzidos um de cada vez (opcional)
+    """
+    nomes = {IDIOMAS_SUPORTADOS[idioma]["code"]: idioma for idioma in idiomas}
+    progresso = {codigo: (0, 1) for codigo in nomes}
+    tokens = {}
+    
+    def update_progress(codigo, current, total):
+        progresso[codigo] = (current, total)
+        concluido = sum(c for c, _ in progresso.values()) / sum(t for _, t in progresso.values())
+        progress_bar.progress(0.3 + concluido * 0.7)
+        partes = [f"{nomes[c]} {int(atual / total * 100)}%" for c, (atual, total) in progresso.items()]
+        status_text.markdown(f"<div class='status-text'>Traduzindo... {' | '.join(partes)}</div>", unsafe_allow_html=True)
+    
+    def update_token_info(codigo, *valores):
+        tokens[codigo] = valores
+        idioma = nomes[codigo]
+        if idioma == idiomas[0]:
+            update_session_token_info(*valores)
+        else:
+            update_extra_translation(idioma, token_info=dict(zip(
+                ('input_tokens', 'output_tokens', 'input_cost', 'output_cost', 'total_cost', 'context_tokens', 'payload_tokens'),
+                valores
+            )))
+        # Exibir a soma de todos os idiomas durante a tradução
+        display_token_info(token_info_container, *[sum(v[i] for v in tokens.values()) for i in range(7)])
+    
+    def update_stats(codigo, stats):
+        stats = {**stats, 'normalizacao': relatorio_normalizacao}
+        if nomes[codigo] == idiomas[0]:
+            update_translation_stats(stats)
+        else:
+            update_extra_translation(nomes[codigo], translation_stats=stats)
+    
+    if backend is None:
+        traducoes, erros = traduzir_para_varios_idiomas(
+            texto, client, IDIOMAS_SUPORTADOS[idioma_origem]["code"], list(nomes),
+            progress_callback=update_progress, token_callback=update_token_info,
+            stats_callback=update_stats, orcamento=orcamento
+        )
+    else:
+        # O modelo local já usa todos os núcleos; traduzir os idiomas em sequência
+        traducoes, erros = {}, {}
+        for codigo in nomes:
+            try:
+                traducoes[codigo] = backend.traduzir(
+                    texto, IDIOMAS_SUPORTADOS[idioma_origem]["code"], codigo,
+                    progress_callback=lambda *args, codigo=codigo: update_progress(codigo, *args),
+                    token_callback=lambda *args, codigo=codigo: update_token_info(codigo, *args),
+                    stats_callback=lambda stats, codigo=codigo: update_stats(codigo, stats)
+                )
+            except Exception as e:
+                erros[codigo] = e
+    
+    for codigo, texto_traduzido in traducoes.items():
+        if nomes[codigo] == idiomas[0]:
+            update_translated_text(texto_traduzido)
+        else:
+            update_extra_translation(nomes[codigo], translated_text=texto_traduzido, pdf_bytes=None, pdf_job=None)
+    for codigo, erro in erros.items():
+        show_error_message(f"Tradução para {nomes[codigo].lower()} interrompida: {str(erro)}")
+
+def soma_estimativas(estimativas):
+    """
+    Soma as estimativas de vários idiomas de destino.
+    
+    Args:
+        estimativas: Lista de dicionários retornados por estima_traducao
+        
+    Returns:
+        Dicionário com a estimativa total
+    """
+    total = dict(estimativas[0])
+    for estimativa in estimativas[1:]:
+        for chave in ('requisicoes', 'tokens_entrada', 'tokens_saida', 'custo_entrada', 'custo_saida', 'custo_total', 'tempo_estimado_s'):
+            total[chave] += estimativa[chave]
+    return total
+
+def display_cost_estimate(container, estimativa):
+    """
+    Exibe a estimativa de custo e tempo da tradução.
+    
+    Args:
+        container: Container para exibir as informações
+        estimativa: Dicionário retornado por estima_traducao
+    """
+    minutos, segundos = divmod(int(estimativa['tempo_estimado_s']), 60)
+    container.markdown(f"""<div class='token-info'>
+        <p><b>Estimativa:</b> {estimativa['segmentos_unicos']:,} segmentos | {estimativa['requisicoes']:,} requisições | ~{minutos}min {segundos:02d}s</p>
+        <p><b>Tokens previstos:</b> {estimativa['tokens_entrada']:,} entrada | {estimativa['tokens_saida']:,} saída | <b>Custo previsto:</b> ${estimativa['custo_total']:.4f}</p>
+    </div>""", unsafe_allow_html=True)
+
+def display_token_info(container=None, input_tokens=None, output_tokens=None, input_cost=None, output_cost=None, total_cost=None, context_tokens=None, payload_tokens=None):
     """
     Exibe as informações de tokens e custos.
     
@@ -156,6 +691,8 @@ def display_token_info(container=None, input_tokens=None, output_tokens=None, in
         input_cost: Custo dos tokens de entrada (opcional)
         output_cost: Custo dos tokens de saída (opcional)
         total_cost: Custo total (opcional)
+        context_tokens: Tokens de entrada gastos com contexto (opcional)
+        payload_tokens: Tokens de entrada do conteúdo traduzido (opcional)
     """
     # Se não foram fornecidos parâmetros, usar os valores da sessão
     if input_tokens is None and st.session_state.token_info:
@@ -164,15 +701,22 @@ def display_token_info(container=None, input_tokens=None, output_tokens=None, in
         input_cost = st.session_state.token_info['input_cost']
         output_cost = st.session_state.token_info['output_cost']
         total_cost = st.session_state.token_info['total_cost']
+        context_tokens = st.session_state.token_info.get('context_tokens')
+        payload_tokens = st.session_state.token_info.get('payload_tokens')
     
     # Se não há informações de tokens, não exibir nada
     if input_tokens is None:
         return
     
+    # Detalhar a entrada entre conteúdo traduzido e contexto, quando disponível
+    context_html = ""
+    if context_tokens:
+        context_html = f"\n        <p><b>Entrada:</b> {int(payload_tokens or 0):,} conteúdo | {int(context_tokens):,} contexto</p>"
+    
     # Criar o HTML para exibir as informações
     token_info_html = f"""<div class='token-info'>
         <p><b>Tokens:</b> {input_tokens:,} entrada | {output_tokens:,} saída | {input_tokens + output_tokens:,} total</p>
-        <p><b>Custo:</b> ${input_cost:.4f} entrada | ${output_cost:.4f} saída | ${total_cost:.4f} total</p>
+        <p><b>Custo:</b> ${input_cost:.4f} entrada | ${output_cost:.4f} saída | ${total_cost:.4f} total</p>{context_html}
     </div>"""
     
     # Exibir no container fornecido ou criar um novo
@@ -181,6 +725,75 @@ def display_token_info(container=None, input_tokens=None, output_tokens=None, in
     else:
         st.markdown(token_info_html, unsafe_allow_html=True)
 
+def display_translation_stats():
+    """
+    Exibe as estatísticas da tradução armazenadas na sessão.
+    """
+    stats = st.session_state.translation_stats
+    if not stats:
+        return
+    
+    linhas_html = []
+    
+    dedup = stats.get('deduplicacao')
+    if dedup and dedup['duplicados']:
+        linhas_html.append(f"<p><b>Segmentos repetidos:</b> {dedup['duplicados']:,} de {dedup['segmentos']:,} reaproveitados | ~{int(dedup['tokens_economizados']):,} tokens economizados</p>")
+    
+    cache = stats.get('cache_prompt')
+    if cache and cache['tokens_prompt'] and (cache.get('prefixo_cacheavel', True) or cache['tokens_em_cache']):
+        linhas_html.append(f"<p><b>Cache de prompt (v{cache['versao_prompt']}):</b> {cache['tokens_em_cache']:,} de {cache['tokens_prompt']:,} tokens de entrada ({cache['taxa_acerto']:.0%})</p>")
+    elif cache and cache['tokens_prompt']:
+        linhas_html.append(f"<p><b>Cache de prompt:</b> não se aplica (instruções fixas de {cache['tokens_prefixo']:,} tokens, abaixo do mínimo de {PROMPT_CACHE_MIN_TOKENS:,} do provedor)</p>")
+    
+    normalizacao = stats.get('normalizacao')
+    if normalizacao and normalizacao['tokens_economizados'] > 0:
+        linhas_html.append(f"<p><b>Normalização:</b> {normalizacao['tokens_economizados']:,} tokens removidos do texto de origem ({normalizacao['percentual']:.1%})</p>")
+    
+    memoria = stats.get('memoria_traducao')
+    if memoria and (memoria['reaproveitados'] or memoria['adaptados']):
+        linhas_html.append(f"<p><b>Memória de tradução:</b> {memoria['reaproveitados']:,} reaproveitados | {memoria['adaptados']:,} adaptados ({memoria['taxa_acerto']:.0%} de acerto, {memoria['latencia_media_ms']:.2f} ms por consulta)</p>")
+    
+    modelos = stats.get('modelos')
+    if modelos and len(modelos) > 1:
+        partes = [f"{nome}: {uso['segmentos']:,} segmentos (${uso['custo']:.4f})" for nome, uso in modelos.items()]
+        linhas_html.append(f"<p><b>Modelos:</b> {' | '.join(partes)}</p>")
+    
+    hedging = stats.get('hedging')
+    if hedging and hedging['copias']:
+        linhas_html.append(f"<p><b>Requisições duplicadas:</b> {hedging['copias']:,} de {hedging['chamadas']:,} chamadas ({hedging['copias_vencedoras']:,} mais rápidas que a original) | p99 {hedging['latencia_p99_s']:.1f}s</p>")
+    
+    refinamento = stats.get('refinamento')
+    if refinamento and refinamento['segmentos']:
+        custo = sum(uso['custo'] for uso in refinamento['modelos'].values())
+        linhas_html.append(f"<p><b>Refinamento:</b> {refinamento['segmentos']:,} segmentos do rascunho traduzidos de novo pelo modelo principal (${custo:.4f})</p>")
+    
+    local = stats.get('local')
+    if local:
+        linhas_html.append(f"<p><b>Tradução local:</b> {local['segmentos']:,} segmentos em {local['segundos']:.1f}s ({local['trechos_por_segundo']:.1f} trechos/s, {local['threads']} threads, sem custo)</p>")
+    
+    concorrencia = stats.get('concorrencia')
+    if concorrencia and concorrencia['requisicoes']:
+        linhas_html.append(f"<p><b>Concorrência final:</b> {concorrencia['concorrencia']} requisições simultâneas, até {concorrencia['tokens_por_requisicao']} tokens por requisição | {concorrencia['reducoes']} reduções por congestionamento</p>")
+    
+    if linhas_html:
+        st.markdown("<div class='token-info'>\n        " + "\n        ".join(linhas_html) + "\n    </div>", unsafe_allow_html=True)
+
+def poll_pdf_render(texto, job=None):
+    """
+    Acompanha a geração do PDF formatado no pool de processos, sem bloquear a página.
+    
+    Args:
+        texto: Texto traduzido em markdown
+        job: PDFRenderJob já enviado para o texto, ou None para enviar a renderização
+        
+    Returns:
+        Tuple contendo (job, bytes do PDF), com os bytes None enquanto a renderização
+        está em andamento ou se ela falhou
+    """
+    if job is None:
+        job = submit_pdf_render(texto)
+    return job, (job.result() if job.done() else None)
+
 def display_download_options(idioma_origem, idioma_destino):
     """
     Exibe as opções de download para os resultados.
@@ -188,18 +801,59 @@ def display_download_options(idioma_origem, idioma_destino):
     Args:
         idioma_origem: Idioma de origem
         idioma_destino: Idioma de destino
+        
+    Returns:
+        Boolean indicando se o PDF formatado ainda está sendo gerado
     """
-    # Gerar PDF formatado se ainda não foi gerado
+    # Gerar PDF formatado se ainda não foi gerado; os downloads em markdown ficam disponíveis enquanto isso
+    pdf_pendente = False
     if st.session_state.pdf_bytes is None:
-        with st.spinner("Gerando PDF formatado..."):
-            pdf_bytes = generate_formatted_pdf(st.session_state.translated_text)
+        job, pdf_bytes = poll_pdf_render(st.session_state.translated_text, st.session_state.pdf_job)
+        if pdf_bytes is not None:
             update_pdf_bytes(pdf_bytes)
+        else:
+            update_pdf_job(job)
+            pdf_pendente = not job.done()
     
     # Não exibir informações de tokens aqui, pois já estão sendo exibidas no container
     # durante o processo de tradução
     
     # Criar botões de download
-    create_download_buttons(idioma_origem, idioma_destino)
+    create_download_buttons(idioma_origem, idioma_destino, pdf_pendente=pdf_pendente)
     
     # Exibir informações de tokens após criar os botões de download
     display_token_info()
+    display_translation_stats()
+    return pdf_pendente
+
+def display_extra_download_options(idioma_origem):
+    """
+    Exibe as opções de download de cada idioma adicional.
+    
+    Args:
+        idioma_origem: Idioma de origem
+        
+    Returns:
+        Boolean indicando se algum PDF formatado ainda está sendo gerado
+    """
+    algum_pendente = False
+    for idioma, dados in st.session_state.extra_translations.items():
+        if not dados.get('translated_text'):
+            continue
+        
+        # Gerar PDF formatado se ainda não foi gerado
+        pdf_pendente = False
+        if dados.get('pdf_bytes') is None:
+            job, pdf_bytes = poll_pdf_render(dados['translated_text'], dados.get('pdf_job'))
+            update_extra_translation(idioma, pdf_bytes=pdf_bytes, pdf_job=job)
+            pdf_pendente = not job.done()
+            algum_pendente = algum_pendente or pdf_pendente
+        
+        st.markdown(f"**{idioma}**")
+        create_download_buttons(
+            idioma_origem, idioma, dados['translated_text'], dados['pdf_bytes'],
+            key_suffix=f"_{IDIOMAS_SUPORTADOS[idioma]['code']}", pdf_pendente=pdf_pendente
+        )
+        if dados.get('token_info'):
+            display_token_info(None, **dados['token_info'])
+    return algum_pendente
@@ -3,14 +3,21 @@ Módulo com utilitários para manipulação de arquivos.
 """
 
 import os
+import re
 import time
 import logging
-from typing import Tuple
+from bisect import bisect_right
+from io import BytesIO
+from typing import List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from PyPDF2 import PdfReader, PdfWriter
+
 from ..config import UPLOAD_DIR, MAX_FILE_SIZE, ALLOWED_EXTENSIONS, logger
-from ..ocr_mistral_md import process_pdf_ocr
+from ..ocr_backends import OCRBackend, get_ocr_backend
+from .page_processor import remove_running_lines
+from .input_adapters import convert_to_markdown, extension, is_document, split_markdown_pages
 
 def validate_file(file) -> Tuple[bool, str]:
     """
@@ -25,8 +32,8 @@ def validate_file(file) -> Tuple[bool, str]:
     if file.size > MAX_FILE_SIZE:
         return False, f"Arquivo muito grande. Tamanho máximo permitido: {MAX_FILE_SIZE / (1024*1024):.1f}MB"
     
-    if not file.type == 'application/pdf':
-        return False, "Apenas arquivos PDF são permitidos"
+    if extension(file.name) not in ALLOWED_EXTENSIONS:
+        return False, "Formato não suportado. Envie um arquivo PDF, DOCX, EPUB, HTML ou Markdown"
     
     return True, ""
 
@@ -62,27 +69,334 @@ def save_uploaded_file(uploaded_file) -> Path:
     
     return temp_path
 
-def process_uploaded_pdf(temp_path: str) -> Tuple[str, bool]:
+def count_pdf_pages(pdf_file) -> Optional[int]:
+    """
+    Conta as páginas de um PDF.
+    
+    Args:
+        pdf_file: Caminho do arquivo ou arquivo carregado pelo usuário
+        
+    Returns:
+        Número de páginas, ou None se o PDF não puder ser lido
+    """
+    try:
+        if hasattr(pdf_file, 'getvalue'):
+            pdf_file = BytesIO(pdf_file.getvalue())
+        return len(PdfReader(pdf_file).pages)
+    except Exception as e:
+        logger.warning(f"Não foi possível contar as páginas do PDF: {str(e)}")
+        return None
+
+def parse_page_range(spec: str, total_pages: Optional[int] = None) -> Optional[List[int]]:
+    """
+    Interpreta uma seleção de páginas como "1-5, 8, 10-12".
+    
+    Args:
+        spec: Seleção digitada pelo usuário (páginas começando em 1)
+        total_pages: Número de páginas do documento, para validar a seleção
+        
+    Returns:
+        Lista ordenada e sem repetições das páginas (começando em 1), ou None para todas
+        
+    Raises:
+        ValueError: Se a seleção for inválida ou estiver fora do documento
+    """
+    if not spec or not spec.strip():
+        return None
+    
+    pages = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.fullmatch(r'(\d+)\s*(?:[-–]\s*(\d+))?', part)
+        if not match:
+            raise ValueError(f"Seleção de páginas inválida: '{part}'. Use o formato 1-5, 8, 10-12")
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        if start < 1 or end < start:
+            raise ValueError(f"Intervalo de páginas inválido: '{part}'")
+        if total_pages is not None and end > total_pages:
+            raise ValueError(f"O documento tem apenas {total_pages} páginas (seleção: '{part}')")
+        pages.update(range(start, end + 1))
+    
+    if not pages:
+        return None
+    return sorted(pages)
+
+def format_page_range(pages: List[int]) -> str:
+    """
+    Formata uma lista de páginas como intervalos compactos ("1-5,8").
+    
+    Args:
+        pages: Páginas ordenadas (começando em 1)
+        
+    Returns:
+        Texto com os intervalos
+    """
+    ranges = []
+    for page in pages:
+        if ranges and page == ranges[-1][1] + 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return ",".join(f"{start}-{end}" if end > start else str(start) for start, end in ranges)
+
+def extract_pdf_pages(pdf_path: str, pages: List[int], output_path: str) -> None:
+    """
+    Grava um novo PDF apenas com as páginas selecionadas.
+    
+    Args:
+        pdf_path: Caminho do PDF original
+        pages: Páginas a copiar (começando em 1)
+        output_path: Caminho do PDF de saída
+    """
+    reader = PdfReader(pdf_path)
+    writer = PdfWriter()
+    for page in pages:
+        writer.add_page(reader.pages[page - 1])
+    with open(output_path, 'wb') as output_file:
+        writer.write(output_file)
+
+def process_uploaded_pdf_pages(temp_path: str, paginas: Optional[List[int]] = None,
+                               ocr_backend: Optional[OCRBackend] = None) -> List[Tuple[int, str]]:
+    """
+    Extrai o texto das páginas selecionadas do PDF, mantendo o número de cada página.
+    
+    Apenas as páginas selecionadas são enviadas ao OCR: o PDF é recortado antes do
+    upload e, se não puder ser recortado (por exemplo, se estiver criptografado), a
+    seleção é repassada à requisição de OCR. O OCR local recebe a seleção diretamente.
+    
+    Args:
+        temp_path: Caminho do arquivo PDF temporário
+        paginas: Páginas a processar (começando em 1), ou None para todas
+        ocr_backend: Mecanismo de OCR (padrão: o de OCR_BACKEND)
+        
+    Returns:
+        Lista de pares (número da página no documento original, markdown da página)
+    """
+    ocr_backend = ocr_backend or get_ocr_backend()
+    if not paginas:
+        extracted_pages = ocr_backend.process(temp_path)
+        return list(zip(range(1, len(extracted_pages) + 1), extracted_pages))
+    
+    if not ocr_backend.uploads_document:
+        extracted_pages = ocr_backend.process(temp_path, pages=[page - 1 for page in paginas])
+        logger.info(f"OCR de {len(extracted_pages)} páginas selecionadas ({format_page_range(paginas)})")
+        return list(zip(paginas, extracted_pages))
+    
+    subset_path = Path(temp_path).with_name(f"{Path(temp_path).stem}_p{format_page_range(paginas).replace(',', '_')}.pdf")
+    try:
+        try:
+            extract_pdf_pages(temp_path, paginas, str(subset_path))
+        except Exception as e:
+            logger.warning(f"Não foi possível recortar o PDF, selecionando as páginas no OCR: {str(e)}")
+            extracted_pages = ocr_backend.process(temp_path, pages=[page - 1 for page in paginas])
+        else:
+            extracted_pages = ocr_backend.process(str(subset_path))
+    finally:
+        if subset_path.exists():
+            subset_path.unlink()
+    
+    logger.info(f"OCR de {len(extracted_pages)} páginas selecionadas ({format_page_range(paginas)})")
+    return list(zip(paginas, extracted_pages))
+
+def extract_clean_pages(temp_path: str, paginas: Optional[List[int]] = None,
+                        ocr_backend: Optional[OCRBackend] = None) -> List[Tuple[int, str]]:
+    """
+    Extrai as páginas do PDF sem os cabeçalhos, rodapés e números de página repetidos.
+    
+    Args:
+        temp_path: Caminho do arquivo PDF temporário
+        paginas: Páginas a processar (começando em 1), ou None para todas
+        ocr_backend: Mecanismo de OCR (padrão: o de OCR_BACKEND)
+        
+    Returns:
+        Lista de pares (número da página no documento original, markdown da página)
+    """
+    numbered_pages = process_uploaded_pdf_pages(temp_path, paginas, ocr_backend)
+    extracted_pages = [text for _, text in numbered_pages]
+    
+    # Remover cabeçalhos, rodapés e números de página repetidos
+    extracted_pages, removed_lines = remove_running_lines(extracted_pages)
+    if removed_lines:
+        logger.info(f"{removed_lines} linhas de cabeçalho/rodapé removidas de {len(extracted_pages)} páginas")
+    
+    return [(number, text) for (number, _), text in zip(numbered_pages, extracted_pages)]
+
+def page_line_index(numbered_pages: List[Tuple[int, str]]) -> List[Tuple[int, int]]:
+    """
+    Monta o índice das páginas no texto concatenado (as páginas unidas sem delimitadores).
+    
+    Args:
+        numbered_pages: Pares (número da página no documento original, markdown da página)
+        
+    Returns:
+        Lista de pares (linha do texto concatenado em que a página começa, começando em 0,
+        número da página no documento original), em ordem crescente de linha
+    """
+    index = []
+    line = 0
+    for number, text in numbered_pages:
+        index.append((line, number))
+        line += text.count('\n')
+    return index
+
+def page_at_line(index: List[Tuple[int, int]], line: int) -> Optional[int]:
+    """
+    Retorna a página do documento original que contém a linha do texto concatenado.
+    
+    Args:
+        index: Índice de page_line_index
+        line: Linha do texto concatenado, começando em 0
+        
+    Returns:
+        Número da página no documento original, ou None se o índice estiver vazio
+    """
+    position = bisect_right([start for start, _ in index], line) - 1
+    return index[max(position, 0)][1] if index else None
+
+def remap_page_index(index: List[Tuple[int, int]], origins: List[int]) -> List[Tuple[int, int]]:
+    """
+    Transfere o índice das páginas para o texto pré-processado (ver reflow_with_origins).
+    
+    Uma linha unida a partir de linhas de duas páginas (um parágrafo que continua
+    na página seguinte) fica na página em que começa.
+    
+    Args:
+        index: Índice de page_line_index sobre o texto concatenado
+        origins: Primeira linha do texto concatenado contida em cada linha do texto pré-processado
+        
+    Returns:
+        Índice (linha inicial, página original) sobre o texto pré-processado
+    """
+    remapped = []
+    for line, origin in enumerate(origins):
+        page = page_at_line(index, origin)
+        if page is not None and (not remapped or remapped[-1][1] != page):
+            remapped.append((line, page))
+    return remapped
+
+def add_page_markers(text: str, index: Optional[List[Tuple[int, int]]]) -> str:
+    """
+    Insere um comentário <!-- página N --> antes da primeira linha de cada página original.
+    
+    Os comentários não aparecem no markdown renderizado nem no PDF, mas permitem
+    localizar no arquivo baixado o trecho de cada página do documento original.
+    
+    Args:
+        text: Texto com as mesmas linhas do texto indexado (por exemplo, a tradução dele)
+        index: Índice (linha inicial, página original), ou None para não inserir marcadores
+        
+    Returns:
+        Texto com os marcadores de página
+    """
+    if not index:
+        return text
+    lines = text.split('\n')
+    starts = {line: page for line, page in index if line < len(lines)}
+    output = []
+    for line, content in enumerate(lines):
+        if line in starts:
+            # Linhas vazias ao redor, para que o comentário não seja unido ao parágrafo vizinho
+            if output and output[-1].strip():
+                output.append("")
+            output.extend([f"<!-- página {starts[line]} -->", ""])
+        output.append(content)
+    return '\n'.join(output)
+
+def process_uploaded_pdf(temp_path: str, paginas: Optional[List[int]] = None,
+                         ocr_backend: Optional[OCRBackend] = None) -> Tuple[str, bool, Optional[List[Tuple[int, int]]]]:
     """
     Processa o arquivo PDF e extrai o texto.
     
     Args:
         temp_path: Caminho do arquivo PDF temporário
+        paginas: Páginas a processar (começando em 1), ou None para todas
+        ocr_backend: Mecanismo de OCR (padrão: o de OCR_BACKEND)
         
     Returns:
-        Tuple contendo o texto extraído e um booleano indicando sucesso
+        Tuple contendo o texto extraído, um booleano indicando sucesso e o índice
+        (linha inicial, página original) de page_line_index (None em caso de erro)
     """
     try:
-        extracted_pages = process_pdf_ocr(temp_path)
+        # Combinar todas as páginas em um único texto sem delimitadores, guardando onde cada uma começa
+        numbered_pages = extract_clean_pages(temp_path, paginas, ocr_backend)
+        full_text = "".join(text for _, text in numbered_pages)
+        return full_text, True, page_line_index(numbered_pages)
+        
+    except Exception as e:
+        logger.error(f"Erro ao processar PDF: {str(e)}", exc_info=True)
+        return str(e), False, None
+
+def extract_document_pages(temp_path: str) -> List[Tuple[int, str]]:
+    """
+    Converte um documento sem OCR e o divide em páginas aproximadas.
+    
+    Args:
+        temp_path: Caminho do arquivo temporário (DOCX, EPUB, HTML ou Markdown)
         
-        # Combinar todas as páginas em um único texto sem delimitadores
-        full_text = "".join(extracted_pages)
+    Returns:
+        Lista de pares (número da página, markdown da página)
+    """
+    pages = split_markdown_pages(convert_to_markdown(temp_path))
+    return list(enumerate(pages, start=1))
+
+def extract_file_pages(temp_path: str, paginas: Optional[List[int]] = None,
+                       ocr_backend: Optional[OCRBackend] = None) -> List[Tuple[int, str]]:
+    """
+    Extrai as páginas do arquivo: PDFs passam pelo OCR e os demais formatos são convertidos.
+    
+    Args:
+        temp_path: Caminho do arquivo temporário
+        paginas: Páginas do PDF a processar (começando em 1), ou None para todas
+        ocr_backend: Mecanismo de OCR dos PDFs (padrão: o de OCR_BACKEND)
+        
+    Returns:
+        Lista de pares (número da página, markdown da página)
+    """
+    if is_document(temp_path):
+        return extract_document_pages(temp_path)
+    return extract_clean_pages(temp_path, paginas, ocr_backend)
+
+def process_uploaded_document(temp_path: str) -> Tuple[str, bool]:
+    """
+    Converte um documento DOCX, EPUB, HTML ou Markdown em markdown, sem OCR.
+    
+    Args:
+        temp_path: Caminho do arquivo temporário
+        
+    Returns:
+        Tuple contendo o texto convertido e um booleano indicando sucesso
+    """
+    try:
+        started = time.perf_counter()
+        full_text = convert_to_markdown(temp_path)
+        logger.info(f"Documento convertido sem OCR em {time.perf_counter() - started:.2f}s ({len(full_text)} caracteres)")
         return full_text, True
         
     except Exception as e:
-        logger.error(f"Erro ao processar PDF: {str(e)}", exc_info=True)
+        logger.error(f"Erro ao converter o documento: {str(e)}", exc_info=True)
         return str(e), False
 
+def process_uploaded_file(temp_path: str, paginas: Optional[List[int]] = None,
+                          ocr_backend: Optional[OCRBackend] = None) -> Tuple[str, bool, Optional[List[Tuple[int, int]]]]:
+    """
+    Extrai o texto do arquivo: PDFs passam pelo OCR e os demais formatos são convertidos.
+    
+    Args:
+        temp_path: Caminho do arquivo temporário
+        paginas: Páginas do PDF a processar (começando em 1), ou None para todas
+        ocr_backend: Mecanismo de OCR dos PDFs (padrão: o de OCR_BACKEND)
+        
+    Returns:
+        Tuple contendo o texto extraído, um booleano indicando sucesso e o índice
+        (linha inicial, página original) das páginas do PDF (None para os demais formatos)
+    """
+    if is_document(temp_path):
+        return (*process_uploaded_document(temp_path), None)
+    return process_uploaded_pdf(temp_path, paginas, ocr_backend)
+
 def get_output_filename(original_filename: str) -> str:
     """
     Obtém o nome do arquivo de saída sem a extensão.
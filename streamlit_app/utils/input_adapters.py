@@ -0,0 +1,415 @@
+"""
+Módulo com a conversão direta de DOCX, EPUB, HTML e Markdown para markdown.
+
+Documentos que já têm o texto não precisam passar pelo OCR: são convertidos no
+mesmo markdown que o OCR produz (títulos, listas, citações, tabelas e ênfase),
+sem custo nem espera. HTML, EPUB e Markdown são lidos em partes e convertidos
+conforme são lidos, sem carregar o arquivo inteiro nem montar a árvore do
+documento; o DOCX é lido pelo python-docx e convertido parágrafo a parágrafo.
+"""
+
+import codecs
+import posixpath
+import re
+import zipfile
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterable, Iterator, List
+from xml.etree import ElementTree
+
+# Formatos convertidos diretamente, sem OCR
+DOCUMENT_EXTENSIONS = {'docx', 'epub', 'html', 'htm', 'xhtml', 'md', 'markdown'}
+
+# Tamanho aproximado de uma página, para dividir documentos sem páginas (leitor)
+PAGE_CHARS = 3000
+
+# Bytes lidos por vez dos arquivos HTML e dos capítulos do EPUB
+READ_CHUNK_SIZE = 64 * 1024
+
+_BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'header', 'footer', 'main', 'aside', 'nav', 'figure',
+    'figcaption', 'address', 'dd', 'dt', 'body', 'caption'
+}
+_SKIP_TAGS = {'script', 'style', 'head', 'title', 'noscript', 'svg', 'template', 'math'}
+_HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+_WHITESPACE = re.compile(r'\s+')
+
+def _emphasize(text: str, marker: str) -> str:
+    """Envolve o texto com o marcador de ênfase, mantendo os espaços das bordas fora dele."""
+    stripped = text.strip()
+    if not stripped or not marker:
+        return text
+    start = text.index(stripped)
+    return f"{text[:start]}{marker}{stripped}{marker[::-1]}{text[start + len(stripped):]}"
+
+def extension(filename: str) -> str:
+    """Extensão do arquivo, em minúsculas e sem o ponto."""
+    return Path(filename).suffix.lower().lstrip('.')
+
+def is_document(filename: str) -> bool:
+    """Indica se o arquivo é convertido diretamente, sem OCR."""
+    return extension(filename) in DOCUMENT_EXTENSIONS
+
+class HTMLToMarkdown(HTMLParser):
+    """
+    Converte HTML em linhas de markdown conforme o HTML é recebido.
+
+    O HTML pode ser passado em partes com feed; as linhas prontas são retiradas com
+    pop_lines, então a memória usada não depende do tamanho do documento.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._lines: List[str] = []
+        self._inline: List[str] = []
+        self._prefix = ''
+        self._skip = 0
+        self._lists: List[list] = []
+        self._quote = 0
+        self._pre = 0
+        self._row = None
+        self._cell = None
+        self._table_rows = 0
+        self._emphasis: List[tuple] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+            return
+        if self._skip:
+            return
+
+        if tag in _HEADING_TAGS:
+            self._flush()
+            self._prefix = '#' * int(tag[1]) + ' '
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+        elif tag in ('ul', 'ol'):
+            self._flush()
+            self._lists.append([tag, 0])
+        elif tag == 'li':
+            self._flush()
+            kind = self._lists[-1] if self._lists else ['ul', 0]
+            kind[1] += 1
+            marker = f"{kind[1]}. " if kind[0] == 'ol' else '- '
+            self._prefix = '  ' * max(len(self._lists) - 1, 0) + marker
+        elif tag == 'blockquote':
+            self._flush()
+            self._quote += 1
+        elif tag == 'pre':
+            self._flush()
+            self._pre += 1
+        elif tag == 'br':
+            self._target().append('\n')
+        elif tag == 'hr':
+            self._flush()
+            self._emit(['---'])
+        elif tag in ('strong', 'b', 'em', 'i'):
+            self._emphasis.append((tag, self._target(), len(self._target())))
+        elif tag == 'table':
+            self._flush()
+            self._table_rows = 0
+        elif tag == 'tr':
+            self._flush()
+            self._row = []
+        elif tag in ('td', 'th'):
+            self._cell = []
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in ('br', 'hr'):
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(self._skip - 1, 0)
+            return
+        if self._skip:
+            return
+
+        if tag in _HEADING_TAGS or tag in _BLOCK_TAGS or tag == 'li':
+            self._flush()
+        elif tag in ('ul', 'ol'):
+            self._flush()
+            if self._lists:
+                self._lists.pop()
+                if not self._lists:
+                    self._lines.append('')
+        elif tag == 'blockquote':
+            self._flush()
+            self._quote = max(self._quote - 1, 0)
+        elif tag == 'pre':
+            self._flush()
+            self._pre = max(self._pre - 1, 0)
+        elif tag in ('strong', 'b', 'em', 'i'):
+            if self._emphasis and self._emphasis[-1][0] == tag:
+                _, target, start = self._emphasis.pop()
+                target[start:] = [_emphasize(''.join(target[start:]), '**' if tag in ('strong', 'b') else '*')]
+        elif tag in ('td', 'th'):
+            if self._row is not None and self._cell is not None:
+                self._row.append(_WHITESPACE.sub(' ', ''.join(self._cell)).strip().replace('|', '\\|'))
+            self._cell = None
+        elif tag == 'tr':
+            if self._row:
+                self._lines.append('| ' + ' | '.join(self._row) + ' |')
+                if self._table_rows == 0:
+                    self._lines.append('|' + '---|' * len(self._row))
+                self._table_rows += 1
+            self._row = None
+        elif tag == 'table':
+            if self._table_rows:
+                self._lines.append('')
+            self._table_rows = 0
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._target().append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def pop_lines(self) -> List[str]:
+        """Retira as linhas de markdown já concluídas."""
+        lines, self._lines = self._lines, []
+        return lines
+
+    def _target(self) -> List[str]:
+        return self._cell if self._cell is not None else self._inline
+
+    def _flush(self):
+        """Conclui o bloco de texto em andamento."""
+        text = ''.join(self._inline)
+        self._inline = []
+        self._emphasis = []
+        prefix, self._prefix = self._prefix, ''
+        if self._pre:
+            if text.strip('\n'):
+                self._emit(['```'] + text.strip('\n').split('\n') + ['```'])
+            return
+
+        lines = [_WHITESPACE.sub(' ', line).strip() for line in text.split('\n')]
+        lines = [line for line in lines if line and line.strip('*')]
+        if lines:
+            self._emit([prefix + lines[0]] + lines[1:])
+
+    def _emit(self, lines: List[str]):
+        """Acrescenta um bloco, seguido de uma linha em branco (fora de listas)."""
+        quote = '> ' * self._quote
+        self._lines.extend(quote + line for line in lines)
+        if not self._lists:
+            self._lines.append('')
+
+def html_to_markdown_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Converte HTML recebido em partes em linhas de markdown.
+
+    Args:
+        chunks: Partes do HTML, na ordem
+
+    Returns:
+        Iterador das linhas de markdown, produzidas conforme o HTML é lido
+    """
+    parser = HTMLToMarkdown()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_lines()
+    parser.close()
+    yield from parser.pop_lines()
+
+def _read_chunks(binary_file, encoding: str = 'utf-8') -> Iterator[str]:
+    """Lê um arquivo binário em partes de texto, sem cortar caracteres multibyte."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while True:
+        data = binary_file.read(READ_CHUNK_SIZE)
+        if not data:
+            break
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+def html_file_lines(path: str) -> Iterator[str]:
+    """Converte um arquivo HTML em linhas de markdown."""
+    with open(path, 'rb') as html_file:
+        yield from html_to_markdown_lines(_read_chunks(html_file))
+
+def epub_file_lines(path: str) -> Iterator[str]:
+    """
+    Converte um EPUB em linhas de markdown, capítulo a capítulo, na ordem de leitura.
+
+    Args:
+        path: Caminho do arquivo EPUB
+
+    Returns:
+        Iterador das linhas de markdown
+    """
+    with zipfile.ZipFile(path) as epub:
+        container = ElementTree.fromstring(epub.read('META-INF/container.xml'))
+        rootfile = next(element for element in container.iter() if element.tag.endswith('rootfile'))
+        opf_path = rootfile.get('full-path')
+        opf = ElementTree.fromstring(epub.read(opf_path))
+
+        manifest = {}
+        for item in opf.iter():
+            if item.tag.endswith('}item') or item.tag == 'item':
+                manifest[item.get('id')] = (item.get('href'), item.get('media-type', ''))
+
+        base = posixpath.dirname(opf_path)
+        for itemref in opf.iter():
+            if not (itemref.tag.endswith('}itemref') or itemref.tag == 'itemref'):
+                continue
+            href, media_type = manifest.get(itemref.get('idref'), (None, ''))
+            if not href or 'html' not in media_type:
+                continue
+            chapter_path = posixpath.normpath(posixpath.join(base, href.split('#')[0]))
+            with epub.open(chapter_path) as chapter:
+                yield from html_to_markdown_lines(_read_chunks(chapter))
+
+def markdown_file_lines(path: str) -> Iterator[str]:
+    """Lê um arquivo markdown linha a linha."""
+    with open(path, encoding='utf-8', errors='replace') as markdown_file:
+        for line in markdown_file:
+            yield line.rstrip('\r\n')
+
+
+def _paragraph_markdown(paragraph) -> str:
+    """Converte um parágrafo do python-docx em uma linha de markdown."""
+    # iter_inner_content (python-docx 1.x) inclui o texto dos hiperlinks
+    content = paragraph.iter_inner_content() if hasattr(paragraph, 'iter_inner_content') else paragraph.runs
+    text = ''.join(
+        _emphasize(item.text, ('**' if getattr(item, 'bold', False) else '') + ('*' if getattr(item, 'italic', False) else ''))
+        for item in content
+    )
+    text = _WHITESPACE.sub(' ', text).strip()
+    if not text:
+        return ''
+
+    style = paragraph.style.name if paragraph.style is not None else ''
+    if style == 'Title':
+        return f"# {text}"
+    match = re.match(r'Heading (\d)', style)
+    if match:
+        return f"{'#' * min(int(match.group(1)), 6)} {text}"
+    if style.startswith('List Number'):
+        return f"1. {text}"
+    if style.startswith('List'):
+        return f"- {text}"
+    if style in ('Quote', 'Intense Quote'):
+        return f"> {text}"
+    return text
+
+def docx_file_lines(path: str) -> Iterator[str]:
+    """
+    Converte um DOCX em linhas de markdown, com os parágrafos e tabelas na ordem do documento.
+
+    Args:
+        path: Caminho do arquivo DOCX
+
+    Returns:
+        Iterador das linhas de markdown
+    """
+    from docx import Document
+    from docx.oxml.ns import qn
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = Document(path)
+    previous_list = False
+    for element in document.element.body.iterchildren():
+        if element.tag == qn('w:p'):
+            line = _paragraph_markdown(Paragraph(element, document))
+            if not line:
+                continue
+            # Itens de lista seguidos ficam na mesma lista, sem linha em branco entre eles
+            is_list = line.startswith(('- ', '1. '))
+            if previous_list and not is_list:
+                yield ''
+            yield line
+            if not is_list:
+                yield ''
+            previous_list = is_list
+        elif element.tag == qn('w:tbl'):
+            if previous_list:
+                yield ''
+            previous_list = False
+            for index, row in enumerate(Table(element, document).rows):
+                cells = [_WHITESPACE.sub(' ', cell.text).strip().replace('|', '\\|') for cell in row.cells]
+                yield '| ' + ' | '.join(cells) + ' |'
+                if index == 0:
+                    yield '|' + '---|' * len(cells)
+            yield ''
+
+_READERS = {
+    'docx': docx_file_lines,
+    'epub': epub_file_lines,
+    'html': html_file_lines,
+    'htm': html_file_lines,
+    'xhtml': html_file_lines,
+    'md': markdown_file_lines,
+    'markdown': markdown_file_lines
+}
+
+def document_lines(path: str) -> Iterator[str]:
+    """
+    Converte um documento em linhas de markdown, conforme o formato da extensão.
+
+    Args:
+        path: Caminho do arquivo (DOCX, EPUB, HTML ou Markdown)
+
+    Returns:
+        Iterador das linhas de markdown
+
+    Raises:
+        ValueError: Se o formato não for suportado
+    """
+    reader = _READERS.get(extension(path))
+    if reader is None:
+        raise ValueError(f"Formato não suportado para conversão direta: {Path(path).suffix or path}")
+    return reader(path)
+
+def convert_to_markdown(path: str) -> str:
+    """
+    Converte um documento em markdown, sem linhas em branco repetidas.
+
+    Args:
+        path: Caminho do arquivo (DOCX, EPUB, HTML ou Markdown)
+
+    Returns:
+        Texto em markdown
+    """
+    lines = []
+    for line in document_lines(path):
+        if line.strip() or (lines and lines[-1].strip()):
+            lines.append(line)
+    return '\n'.join(lines).strip('\n') + '\n'
+
+def split_markdown_pages(markdown: str, page_chars: int = PAGE_CHARS) -> List[str]:
+    """
+    Divide um markdown sem páginas em páginas aproximadas, para o leitor.
+
+    As páginas terminam em linhas em branco (nunca no meio de um parágrafo, tabela
+    ou bloco de código) e, depois da metade do tamanho, antes de um título.
+
+    Args:
+        markdown: Texto em markdown
+        page_chars: Tamanho aproximado de cada página, em caracteres
+
+    Returns:
+        Lista com o markdown de cada página
+    """
+    pages = []
+    current: List[str] = []
+    size = 0
+    in_code = False
+    for line in markdown.split('\n'):
+        if not in_code and current and not current[-1].strip():
+            starts_section = line.startswith('#') and size >= page_chars // 2
+            if size >= page_chars or starts_section:
+                pages.append('\n'.join(current))
+                current, size = [], 0
+        if line.lstrip().startswith('```'):
+            in_code = not in_code
+        current.append(line)
+        size += len(line) + 1
+    if ''.join(current).strip():
+        pages.append('\n'.join(current))
+    return pages
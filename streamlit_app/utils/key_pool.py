@@ -0,0 +1,274 @@
+"""
+Módulo com o pool de chaves de API.
+
+Várias chaves (ou organizações) são carregadas das variáveis de ambiente e as
+requisições são distribuídas entre elas, com peso proporcional à cota restante
+informada pelos cabeçalhos x-ratelimit-* de cada resposta. Chaves limitadas ou
+com falha são retiradas do pool por um tempo. Assim a aplicação soma os limites
+de tokens por minuto de várias contas em vez de compartilhar um único.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tempo fora do pool após uma falha, em segundos
+DEFAULT_COOLDOWN = 30
+AUTH_COOLDOWN = 15 * 60
+MAX_COOLDOWN = 5 * 60
+
+# Status HTTP que retiram a chave do pool (limite, autenticação e erros do servidor)
+EJECT_STATUS = {401, 403, 429, 500, 502, 503, 504}
+
+@dataclass
+class PooledKey:
+    """Uma chave de API com o estado observado das suas cotas."""
+    api_key: str
+    organization: Optional[str] = None
+    remaining_requests: Optional[int] = None
+    remaining_tokens: Optional[int] = None
+    ejected_until: float = 0.0
+    failures: int = 0
+    requests: int = 0
+    client: object = field(default=None, repr=False)
+
+    @property
+    def label(self) -> str:
+        """Identificação da chave para logs, sem expor o segredo."""
+        suffix = f"@{self.organization}" if self.organization else ""
+        return f"...{self.api_key[-4:]}{suffix}"
+
+def parse_keys(value: str) -> List[PooledKey]:
+    """
+    Lê uma lista de chaves no formato "chave[:organizacao],chave[:organizacao]".
+
+    Args:
+        value (str): Conteúdo da variável de ambiente
+
+    Returns:
+        List[PooledKey]: Chaves encontradas
+    """
+    keys = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        api_key, _, organization = item.partition(':')
+        keys.append(PooledKey(api_key.strip(), organization.strip() or None))
+    return keys
+
+def keys_from_env(list_variable: str, single_variable: str) -> List[PooledKey]:
+    """
+    Carrega as chaves de uma variável com a lista ou, na falta dela, da variável com chave única.
+
+    Args:
+        list_variable (str): Variável com várias chaves (ex.: OPENAI_API_KEYS)
+        single_variable (str): Variável com uma chave (ex.: OPENAI_API_KEY)
+
+    Returns:
+        List[PooledKey]: Chaves configuradas
+    """
+    keys = parse_keys(os.getenv(list_variable, ''))
+    if not keys and os.getenv(single_variable):
+        keys = [PooledKey(os.getenv(single_variable))]
+    return keys
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Extrai o status HTTP de exceções do SDK da OpenAI ou da Mistral."""
+    status = getattr(error, 'status_code', None)
+    if status is None and getattr(error, 'response', None) is not None:
+        status = getattr(error.response, 'status_code', None)
+    return status
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Lê o cabeçalho retry-after da resposta de erro, se houver."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+def should_eject(error: Exception) -> bool:
+    """Indica se o erro é da chave ou do serviço (e não da requisição em si)."""
+    status = _status_code(error)
+    if status is None:
+        # Falhas de conexão e timeouts não têm status HTTP
+        return 'connection' in type(error).__name__.lower() or 'timeout' in type(error).__name__.lower()
+    return status in EJECT_STATUS
+
+class KeyPool:
+    """
+    Distribui requisições entre chaves de API, ponderando pela cota restante.
+    """
+
+    def __init__(self, keys: List[PooledKey], cooldown: float = DEFAULT_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        if not keys:
+            raise ValueError("Nenhuma chave de API configurada")
+        self.keys = keys
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _weight(self, key: PooledKey, default: float) -> float:
+        if key.remaining_tokens is None:
+            return default
+        return max(key.remaining_tokens, 1)
+
+    def acquire(self, exclude=()) -> PooledKey:
+        """
+        Escolhe uma chave disponível, com probabilidade proporcional à cota restante.
+
+        Chaves sem cota conhecida recebem o peso da maior cota observada, para que
+        também sejam experimentadas. Se todas estiverem fora do pool, é usada a que
+        volta primeiro.
+
+        Args:
+            exclude: Chaves que não devem ser escolhidas (já tentadas nesta requisição)
+
+        Returns:
+            PooledKey: Chave escolhida
+        """
+        now = self._clock()
+        with self._lock:
+            candidates = [k for k in self.keys if k not in exclude] or list(self.keys)
+            available = [k for k in candidates if k.ejected_until <= now]
+            if not available:
+                chosen = min(candidates, key=lambda k: k.ejected_until)
+            else:
+                known = [k.remaining_tokens for k in available if k.remaining_tokens is not None]
+                default = max(known) if known else 1.0
+                chosen = random.choices(available, weights=[self._weight(k, default) for k in available])[0]
+            chosen.requests += 1
+            return chosen
+
+    def report_success(self, key: PooledKey, headers=None):
+        """
+        Registra uma resposta bem-sucedida e atualiza as cotas com os cabeçalhos.
+
+        Args:
+            key (PooledKey): Chave usada
+            headers: Cabeçalhos HTTP da resposta (x-ratelimit-remaining-*)
+        """
+        with self._lock:
+            key.failures = 0
+            if not headers:
+                return
+            for header, attribute in (('x-ratelimit-remaining-tokens', 'remaining_tokens'),
+                                      ('x-ratelimit-remaining-requests', 'remaining_requests')):
+                try:
+                    setattr(key, attribute, int(headers.get(header)))
+                except (TypeError, ValueError):
+                    pass
+            if key.remaining_requests == 0:
+                key.ejected_until = self._clock() + self.cooldown
+
+    def report_failure(self, key: PooledKey, error: Exception):
+        """
+        Retira a chave do pool por um tempo após uma falha.
+
+        O tempo respeita o retry-after informado pela API; falhas consecutivas
+        dobram o tempo (até MAX_COOLDOWN) e erros de autenticação usam AUTH_COOLDOWN.
+
+        Args:
+            key (PooledKey): Chave usada
+            error (Exception): Erro recebido
+        """
+        status = _status_code(error)
+        with self._lock:
+            key.failures += 1
+            if status in (401, 403):
+                cooldown = AUTH_COOLDOWN
+            else:
+                cooldown = _retry_after(error) or min(MAX_COOLDOWN, self.cooldown * 2 ** (key.failures - 1))
+            key.ejected_until = self._clock() + cooldown
+        logger.warning(f"Chave {key.label} retirada do pool por {cooldown:.0f}s: {type(error).__name__} ({status})")
+
+    def call(self, fn: Callable[[PooledKey], object]):
+        """
+        Executa fn com uma chave do pool, tentando outra chave se a escolhida falhar.
+
+        Args:
+            fn (Callable): Função que recebe a PooledKey e retorna (resultado, cabeçalhos)
+
+        Returns:
+            O resultado de fn
+        """
+        tried = []
+        while True:
+            key = self.acquire(exclude=tried)
+            try:
+                result, headers = fn(key)
+            except Exception as e:
+                if not should_eject(e):
+                    raise
+                self.report_failure(key, e)
+                tried.append(key)
+                if len(tried) >= len(self.keys):
+                    raise
+                continue
+            self.report_success(key, headers)
+            return result
+
+    def stats(self) -> List[dict]:
+        """Retorna o estado de cada chave, sem expor os segredos."""
+        now = self._clock()
+        with self._lock:
+            return [{
+                'chave': k.label,
+                'requisicoes': k.requests,
+                'tokens_restantes': k.remaining_tokens,
+                'requisicoes_restantes': k.remaining_requests,
+                'fora_do_pool_s': max(0.0, k.ejected_until - now)
+            } for k in self.keys]
+
+class PooledOpenAIClient:
+    """
+    Cliente compatível com client.chat.completions.create que usa um KeyPool.
+
+    Cada chamada é feita com with_raw_response para ler os cabeçalhos de cota, e
+    chat.completions.with_raw_response também é oferecido, para que quem envolve
+    este cliente (por exemplo, o ConcurrencyController) receba os mesmos cabeçalhos.
+    Os demais recursos (files, batches, ...) usam sempre a primeira chave, para
+    que arquivos e jobs em lote fiquem na mesma conta.
+    """
+
+    def __init__(self, pool: KeyPool, client_factory: Callable[..., object]):
+        self.pool = pool
+        self._client_factory = client_factory
+        self._create_lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            create=self._create_completion,
+            with_raw_response=SimpleNamespace(create=self._create_raw_completion)
+        ))
+
+    def _client(self, key: PooledKey):
+        with self._create_lock:
+            if key.client is None:
+                key.client = self._client_factory(api_key=key.api_key, organization=key.organization)
+            return key.client
+
+    def _create_raw_completion(self, **kwargs):
+        """Faz a chamada com uma chave do pool e retorna a resposta com os cabeçalhos da chave usada."""
+        def call(key):
+            raw = self._client(key).chat.completions.with_raw_response.create(**kwargs)
+            response, headers = raw.parse(), raw.headers
+            return SimpleNamespace(parse=lambda: response, headers=headers), headers
+        return self.pool.call(call)
+
+    def _create_completion(self, **kwargs):
+        return self._create_raw_completion(**kwargs).parse()
+
+    def __getattr__(self, name):
+        return getattr(self._client(self.pool.keys[0]), name)
@@ -0,0 +1,156 @@
+"""
+Módulo com o leitor que traduz as páginas sob demanda.
+
+Em vez de traduzir o documento inteiro antes de exibi-lo, cada página é traduzida
+quando o usuário a abre e as próximas são traduzidas em segundo plano enquanto ela
+é lida. As traduções ficam guardadas, então voltar a uma página não custa nada, e
+quem lê apenas parte do documento paga e espera só pelo que leu.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Páginas seguintes traduzidas antecipadamente
+PREFETCH_PAGES = 2
+
+# Campos de uso somados entre as páginas (mesma ordem do token_callback de traduzir_texto)
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'input_cost', 'output_cost', 'total_cost',
+                'context_tokens', 'payload_tokens')
+
+class LazyPageTranslator:
+    """
+    Traduz páginas sob demanda, com tradução antecipada das seguintes.
+    """
+
+    def __init__(self, pages: List[Tuple[int, str]], translate: Callable[[str], Tuple[str, dict]],
+                 prefetch: int = PREFETCH_PAGES, max_workers: Optional[int] = None):
+        """
+        Args:
+            pages: Pares (número da página no documento original, markdown da página)
+            translate: Função que recebe o texto de uma página e retorna (tradução, uso),
+                em que uso tem os campos de USAGE_FIELDS; é chamada em threads do leitor
+            prefetch: Quantas páginas seguintes traduzir antecipadamente
+            max_workers: Páginas traduzidas ao mesmo tempo (padrão: a página aberta e as antecipadas)
+        """
+        self.pages = pages
+        self.prefetch = prefetch
+        self._translate = translate
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or prefetch + 1,
+                                            thread_name_prefix='leitor')
+        self._lock = threading.Lock()
+        self._futures: Dict[int, Future] = {}
+        self.opened = set()
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def page_number(self, index: int) -> int:
+        """Número da página no documento original."""
+        return self.pages[index][0]
+
+    def source(self, index: int) -> str:
+        """Markdown original da página."""
+        return self.pages[index][1]
+
+    def request(self, index: int) -> Future:
+        """
+        Agenda a tradução da página, se ainda não foi traduzida nem está em andamento.
+
+        Traduções que falharam são agendadas de novo.
+
+        Args:
+            index: Posição da página (começando em 0)
+
+        Returns:
+            Future com o par (tradução, uso)
+        """
+        with self._lock:
+            future = self._futures.get(index)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(self._translate, self.source(index))
+                self._futures[index] = future
+            return future
+
+    def open(self, index: int) -> Future:
+        """
+        Abre uma página: agenda a tradução dela e, quando ela terminar, a das próximas.
+
+        As páginas seguintes só começam depois da página aberta, para não disputarem
+        com ela as requisições simultâneas nem o orçamento.
+
+        Args:
+            index: Posição da página (começando em 0)
+
+        Returns:
+            Future com o par (tradução, uso) da página aberta
+        """
+        future = self.request(index)
+        self.opened.add(index)
+        future.add_done_callback(lambda _: self._prefetch(index))
+        return future
+
+    def _prefetch(self, index: int):
+        """Agenda a tradução das PREFETCH_PAGES páginas seguintes."""
+        try:
+            for following in range(index + 1, min(index + 1 + self.prefetch, len(self.pages))):
+                self.request(following)
+        except RuntimeError:
+            # O leitor foi encerrado enquanto a página era traduzida
+            pass
+
+    def translation(self, index: int, timeout: Optional[float] = None) -> str:
+        """
+        Retorna a tradução da página, aguardando se ela ainda estiver em andamento.
+
+        Args:
+            index: Posição da página (começando em 0)
+            timeout: Tempo máximo de espera, em segundos
+
+        Returns:
+            Texto traduzido da página
+        """
+        return self.open(index).result(timeout)[0]
+
+    def is_ready(self, index: int) -> bool:
+        """Indica se a tradução da página já terminou com sucesso."""
+        with self._lock:
+            future = self._futures.get(index)
+        return future is not None and future.done() and future.exception() is None
+
+    def translated_pages(self) -> Dict[int, str]:
+        """Traduções concluídas, por posição da página."""
+        with self._lock:
+            futures = dict(self._futures)
+        return {index: future.result()[0] for index, future in sorted(futures.items())
+                if future.done() and future.exception() is None}
+
+    def usage(self) -> dict:
+        """Soma do uso de tokens e do custo das páginas já traduzidas."""
+        with self._lock:
+            futures = list(self._futures.values())
+        totals = dict.fromkeys(USAGE_FIELDS, 0)
+        for future in futures:
+            if future.done() and future.exception() is None:
+                usage = future.result()[1] or {}
+                for field in USAGE_FIELDS:
+                    totals[field] += usage.get(field, 0)
+        return totals
+
+    def stats(self) -> dict:
+        """Retorna quantas páginas foram abertas, traduzidas e estão em andamento."""
+        with self._lock:
+            futures = list(self._futures.values())
+        return {
+            'paginas': len(self.pages),
+            'abertas': len(self.opened),
+            'traduzidas': sum(1 for f in futures if f.done() and f.exception() is None),
+            'em_andamento': sum(1 for f in futures if not f.done())
+        }
+
+    def shutdown(self):
+        """Cancela as traduções antecipadas que ainda não começaram."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,120 @@
+"""
+Módulo para análise das páginas extraídas pelo OCR.
+
+Detecta cabeçalhos, rodapés e números de página que se repetem no topo ou na
+base da maioria das páginas, para que não sejam traduzidos a cada página.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import List, Set, Tuple
+
+# Quantidade de linhas não vazias analisadas no topo e na base de cada página
+EDGE_LINES = 3
+
+# Fração mínima de páginas em que a linha deve se repetir
+MIN_PAGE_RATIO = 0.5
+
+# Número mínimo de páginas para que a análise seja feita
+MIN_PAGES = 3
+
+# Cabeçalhos e rodapés são curtos; linhas mais longas nunca são removidas
+MAX_EDGE_WORDS = 12
+
+# Números de página romanos (i, iv, xii, ...) só são reconhecidos em linhas curtas,
+# para que palavras formadas pelas mesmas letras não virem números
+_ROMAN_NUMERAL = re.compile(r'^(?=[mdclxvi])m*(c[md]|d?c{0,3})(x[cl]|l?x{0,3})(i[xv]|v?i{0,3})$')
+MAX_ROMAN_LENGTH = 8
+
+def normalize_edge_line(line: str) -> str:
+    """
+    Normaliza uma linha para comparação entre páginas.
+
+    Remove marcações markdown e substitui números por '#', para que
+    "Página 3" e "Página 4" sejam considerados a mesma linha. Títulos markdown
+    mantêm seus números, para que seções numeradas não sejam confundidas com
+    cabeçalhos.
+
+    Args:
+        line: Linha da página
+
+    Returns:
+        Linha normalizada, ou string vazia se a linha for longa demais
+    """
+    normalized = line.strip().lower()
+    is_heading = normalized.startswith('#')
+    normalized = re.sub(r'^#{1,6}\s*', '', normalized)
+    normalized = re.sub(r'[*_`]', '', normalized)
+    if not is_heading:
+        normalized = re.sub(r'\d+', '#', normalized)
+    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    if len(normalized.split()) > MAX_EDGE_WORDS:
+        return ''
+    if not is_heading and len(normalized) <= MAX_ROMAN_LENGTH and _ROMAN_NUMERAL.match(normalized):
+        return '#'
+    return normalized
+
+def _edge_indexes(lines: List[str]) -> Tuple[List[int], List[int]]:
+    """
+    Retorna os índices das primeiras e últimas linhas não vazias da página.
+    """
+    non_empty = [i for i, line in enumerate(lines) if line.strip()]
+    # Em páginas curtas, topo e base não podem se sobrepor
+    edge = min(EDGE_LINES, len(non_empty) // 2)
+    if edge == 0:
+        return [], []
+    return non_empty[:edge], non_empty[-edge:]
+
+def detect_running_lines(pages: List[str]) -> Tuple[Set[str], Set[str]]:
+    """
+    Detecta as linhas que se repetem no topo ou na base da maioria das páginas.
+
+    Args:
+        pages: Lista com o markdown de cada página
+
+    Returns:
+        Tuple contendo os conjuntos de linhas normalizadas de cabeçalho e de rodapé
+    """
+    if len(pages) < MIN_PAGES:
+        return set(), set()
+
+    top_counts = Counter()
+    bottom_counts = Counter()
+    for page in pages:
+        lines = page.split('\n')
+        top, bottom = _edge_indexes(lines)
+        # Contar cada linha uma única vez por página
+        top_counts.update({normalize_edge_line(lines[i]) for i in top} - {''})
+        bottom_counts.update({normalize_edge_line(lines[i]) for i in bottom} - {''})
+
+    threshold = max(MIN_PAGES, math.ceil(len(pages) * MIN_PAGE_RATIO))
+    headers = {line for line, count in top_counts.items() if count >= threshold}
+    footers = {line for line, count in bottom_counts.items() if count >= threshold}
+    return headers, footers
+
+def remove_running_lines(pages: List[str]) -> Tuple[List[str], int]:
+    """
+    Remove cabeçalhos, rodapés e números de página recorrentes.
+
+    Args:
+        pages: Lista com o markdown de cada página
+
+    Returns:
+        Tuple contendo as páginas limpas e o número de linhas removidas
+    """
+    headers, footers = detect_running_lines(pages)
+    if not headers and not footers:
+        return list(pages), 0
+
+    cleaned_pages = []
+    removed = 0
+    for page in pages:
+        lines = page.split('\n')
+        top, bottom = _edge_indexes(lines)
+        to_remove = {i for i in top if normalize_edge_line(lines[i]) in headers}
+        to_remove |= {i for i in bottom if normalize_edge_line(lines[i]) in footers}
+        removed += len(to_remove)
+        cleaned_pages.append('\n'.join(line for i, line in enumerate(lines) if i not in to_remove))
+
+    return cleaned_pages, removed
@@ -1,30 +1,192 @@
 """
 Módulo para processamento de arquivos PDF.
+
+A geração do PDF formatado (layout do ReportLab, em Python puro) ocupa a CPU e o
+GIL enquanto dura. Por isso ela roda em um pool de processos limitado: o servidor
+do Streamlit só envia o markdown e recebe os bytes (ou o caminho) do PDF, e as
+sessões dos outros usuários continuam respondendo durante a renderização.
+
+Documentos grandes são divididos em seções (pdf_modules.pdf_converter.prepare_sections),
+renderizadas em paralelo no mesmo pool e concatenadas por um último processo; o
+número de processos continua limitado por PDF_RENDER_WORKERS.
 """
 
 import base64
 import logging
-from typing import Optional
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Union
 from io import BytesIO
 
 from ..config import logger
-from ..pdf_modules.pdf_converter import markdown_to_pdf
+from ..pdf_modules.pdf_converter import markdown_to_pdf, merge_sections, prepare_sections, render_section
+
+# Processos de renderização; por padrão, um núcleo fica livre para o servidor do Streamlit
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', max(1, (os.cpu_count() or 2) - 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _render_pdf(markdown_text: str, output_path: Optional[str] = None) -> Union[bytes, str]:
+    """
+    Renderiza o PDF (executado nos processos do pool).
+    
+    Returns:
+        Bytes do PDF ou, se output_path for informado, o caminho do arquivo gravado
+    """
+    pdf_bytes = markdown_to_pdf(markdown_text)
+    if output_path is None:
+        return pdf_bytes
+    with open(output_path, 'wb') as output_file:
+        output_file.write(pdf_bytes)
+    return output_path
+
+def _merge_pdf(sections: list, footnotes: list, output_path: Optional[str] = None) -> Union[bytes, str]:
+    """
+    Concatena as seções renderizadas (executado nos processos do pool).
+    
+    Returns:
+        Bytes do PDF ou, se output_path for informado, o caminho do arquivo gravado
+    """
+    pdf_bytes = merge_sections(sections, footnotes)
+    if output_path is None:
+        return pdf_bytes
+    with open(output_path, 'wb') as output_file:
+        output_file.write(pdf_bytes)
+    return output_path
+
+def _get_pool(reset: bool = False) -> ProcessPoolExecutor:
+    """
+    Retorna o pool de renderização, criado na primeira chamada e compartilhado pelas sessões.
+    
+    Args:
+        reset: Descarta o pool atual (por exemplo, depois que um processo foi encerrado pelo sistema)
+    """
+    global _pool
+    with _pool_lock:
+        if reset and _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            # spawn: os processos não herdam as threads do servidor; o app.py só monta a
+            # interface quando executado como __main__, não ao ser importado pelos processos
+            _pool = ProcessPoolExecutor(max_workers=PDF_RENDER_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+class PDFRenderJob:
+    """
+    Renderização de um PDF em andamento no pool de processos.
+    """
+    
+    def __init__(self, future: Future, output_path: Optional[str] = None, sections: Optional[List[Future]] = None):
+        """
+        Args:
+            future: Future da renderização no pool
+            output_path: Arquivo de saída, se o PDF for gravado em disco
+            sections: Futures das seções, quando o documento é renderizado em partes
+        """
+        self._future = future
+        self._sections = sections or []
+        self.output_path = output_path
+    
+    def done(self) -> bool:
+        """Indica se a renderização terminou (com sucesso ou com erro)."""
+        return self._future.done()
+    
+    def result(self, timeout: Optional[float] = None) -> Optional[Union[bytes, str]]:
+        """
+        Retorna o PDF, aguardando a renderização.
+        
+        Args:
+            timeout: Tempo máximo de espera, em segundos (padrão: sem limite)
+            
+        Returns:
+            Bytes do PDF (ou o caminho do arquivo, se output_path foi informado), ou None em caso de erro
+            
+        Raises:
+            TimeoutError: Se a renderização não terminar dentro do timeout
+        """
+        try:
+            return self._future.result(timeout)
+        except FuturesTimeoutError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao gerar PDF formatado: {str(e)}", exc_info=True)
+            return None
+    
+    def cancel(self) -> bool:
+        """Cancela a renderização (ou as seções que ainda não começaram)."""
+        for section in self._sections:
+            section.cancel()
+        return self._future.cancel()
+
+def submit_pdf_render(markdown_text: str, output_path: Optional[str] = None) -> PDFRenderJob:
+    """
+    Envia a geração de um PDF formatado ao pool de processos, sem aguardar.
+    
+    Args:
+        markdown_text: Texto em formato markdown
+        output_path: Grava o PDF nesse caminho em vez de devolver os bytes (opcional)
+        
+    Returns:
+        PDFRenderJob da renderização
+    """
+    parts, footnotes = prepare_sections(markdown_text)
+    
+    def submit(pool):
+        if len(parts) == 1:
+            return pool.submit(_render_pdf, markdown_text, output_path), None
+        return None, [pool.submit(render_section, part) for part in parts]
+    
+    try:
+        pool = _get_pool()
+        future, sections = submit(pool)
+    except (BrokenProcessPool, RuntimeError):
+        logger.warning("Pool de renderização de PDF interrompido, recriando os processos")
+        pool = _get_pool(reset=True)
+        future, sections = submit(pool)
+    if future is not None:
+        return PDFRenderJob(future, output_path)
+    
+    future = Future()
+    
+    def merge():
+        # Aguarda as seções e envia a concatenação ao mesmo pool, sem ocupar o GIL do servidor
+        try:
+            results = [section.result() for section in sections]
+            result = pool.submit(_merge_pdf, results, footnotes, output_path).result()
+        except BaseException as e:
+            try:
+                future.set_exception(e)
+            except InvalidStateError:
+                pass  # Cancelado
+        else:
+            try:
+                future.set_result(result)
+            except InvalidStateError:
+                pass
+    
+    threading.Thread(target=merge, name='pdf-merge', daemon=True).start()
+    return PDFRenderJob(future, output_path, sections)
 
 def generate_formatted_pdf(markdown_text: str) -> Optional[bytes]:
     """
     Gera um PDF formatado a partir do texto markdown.
     
+    A renderização roda no pool de processos; a thread que chama apenas aguarda,
+    sem ocupar o GIL do servidor.
+    
     Args:
         markdown_text: Texto em formato markdown
         
     Returns:
         Bytes do PDF gerado ou None em caso de erro
     """
-    try:
-        return markdown_to_pdf(markdown_text)
-    except Exception as e:
-        logger.error(f"Erro ao gerar PDF formatado: {str(e)}", exc_info=True)
-        return None
+    return submit_pdf_render(markdown_text).result()
 
 def display_pdf_preview(pdf_bytes: bytes) -> str:
     """
@@ -0,0 +1,225 @@
+"""
+Módulo com o limitador de taxa compartilhado entre processos.
+
+Quando vários processos do Streamlit rodam no mesmo host, cada um desconhece as
+chamadas dos outros e juntos ultrapassam os limites da conta (erros 429). Aqui
+um token bucket por dimensão (requisições e tokens por minuto) é mantido em um
+backend compartilhado: SQLite para coordenar processos no host ou memória para
+um único processo. O backend é plugável (ver RateLimitBackend).
+
+Os limites vêm das variáveis de ambiente OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT,
+MISTRAL_RPM_LIMIT e MISTRAL_TPM_LIMIT; sem limites configurados o limitador não faz nada.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fração do limite da conta usada, para ficar logo abaixo dele
+SAFETY_MARGIN = 0.95
+MAX_WAIT_STEP = 5.0
+DEFAULT_DB_PATH = Path(tempfile.gettempdir()) / 'traduja_rate_limits.sqlite'
+
+class RateLimitBackend(ABC):
+    """
+    Interface dos backends: guardam o saldo de cada bucket de forma atômica.
+    """
+
+    @abstractmethod
+    def try_acquire(self, name: str, limits: Dict[str, Tuple[float, float]], amounts: Dict[str, float],
+                    force: bool = False) -> float:
+        """
+        Tenta retirar os valores de todos os buckets de uma vez.
+
+        Args:
+            name (str): Nome do limitador
+            limits (dict): Capacidade e reposição por segundo de cada dimensão
+            amounts (dict): Quantidade a retirar de cada dimensão (pode ser negativa)
+            force (bool): Retira mesmo sem saldo (o bucket fica negativo)
+
+        Returns:
+            float: 0 se retirou; caso contrário, segundos até haver saldo suficiente
+        """
+
+    @staticmethod
+    def _apply(balances: Dict[str, Tuple[float, float]], limits, amounts, now: float, force: bool):
+        """
+        Calcula os novos saldos a partir dos saldos gravados (saldo, última atualização).
+
+        Returns:
+            Tuple contendo (novos saldos ou None, segundos de espera)
+        """
+        updated = {}
+        wait = 0.0
+        for dimension, (capacity, refill) in limits.items():
+            balance, last = balances.get(dimension, (capacity, now))
+            balance = min(capacity, balance + max(0.0, now - last) * refill)
+            amount = min(amounts.get(dimension, 0), capacity)
+            if not force and amount > balance:
+                wait = max(wait, (amount - balance) / refill)
+            updated[dimension] = balance - amount
+        return (None, wait) if wait > 0 else (updated, 0.0)
+
+class MemoryBackend(RateLimitBackend):
+    """Backend em memória, compartilhado apenas entre as threads do processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._balances = {}
+
+    def try_acquire(self, name, limits, amounts, force=False):
+        now = time.time()
+        with self._lock:
+            balances = self._balances.setdefault(name, {})
+            updated, wait = self._apply(balances, limits, amounts, now, force)
+            if updated is not None:
+                balances.update({dimension: (balance, now) for dimension, balance in updated.items()})
+            return wait
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    Backend em SQLite, compartilhado entre os processos do host.
+
+    Cada retirada roda em uma transação BEGIN IMMEDIATE, que serializa os
+    processos pelo lock de escrita do banco.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = str(path)
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'name TEXT, dimension TEXT, balance REAL, updated REAL, PRIMARY KEY (name, dimension))'
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def try_acquire(self, name, limits, amounts, force=False):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            rows = connection.execute(
+                'SELECT dimension, balance, updated FROM buckets WHERE name = ?', (name,)
+            ).fetchall()
+            balances = {dimension: (balance, updated) for dimension, balance, updated in rows}
+            updated, wait = self._apply(balances, limits, amounts, now, force)
+            if updated is not None:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO buckets (name, dimension, balance, updated) VALUES (?, ?, ?, ?)',
+                    [(name, dimension, balance, now) for dimension, balance in updated.items()]
+                )
+            connection.execute('COMMIT')
+            return wait
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+class RateLimiter:
+    """
+    Limita requisições e tokens por minuto de um serviço.
+    """
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 backend: Optional[RateLimitBackend] = None, margin: float = SAFETY_MARGIN):
+        self.name = name
+        self.limits = {}
+        if rpm:
+            self.limits['requisicoes'] = (rpm * margin, rpm * margin / 60)
+        if tpm:
+            self.limits['tokens'] = (tpm * margin, tpm * margin / 60)
+        self.backend = backend or MemoryBackend()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se há algum limite configurado."""
+        return bool(self.limits)
+
+    def acquire(self, tokens: float = 0, requests: int = 1):
+        """
+        Aguarda até haver saldo para a requisição e o retira dos buckets.
+
+        Args:
+            tokens (float): Tokens estimados da requisição
+            requests (int): Número de requisições
+        """
+        if not self.enabled:
+            return
+        amounts = {'requisicoes': requests, 'tokens': tokens}
+        while True:
+            wait = self.backend.try_acquire(self.name, self.limits, amounts)
+            if wait <= 0:
+                return
+            wait = min(wait, MAX_WAIT_STEP)
+            with self._lock:
+                self.waited_seconds += wait
+            time.sleep(wait)
+
+    def record(self, tokens: float):
+        """
+        Corrige o bucket de tokens com a diferença entre o uso real e o estimado.
+
+        Args:
+            tokens (float): Tokens a mais (positivo) ou a menos (negativo) que o estimado
+        """
+        if 'tokens' in self.limits and tokens:
+            self.backend.try_acquire(self.name, {'tokens': self.limits['tokens']}, {'tokens': tokens}, force=True)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def _limit_from_env(variable: str) -> Optional[float]:
+    value = os.getenv(variable, '').strip()
+    if not value:
+        return None
+    try:
+        return float(value) or None
+    except ValueError:
+        logger.warning(f"Valor inválido em {variable}; limite ignorado")
+        return None
+
+def get_backend() -> RateLimitBackend:
+    """
+    Cria o backend configurado em RATE_LIMIT_BACKEND ('sqlite', padrão, ou 'memory').
+    """
+    if os.getenv('RATE_LIMIT_BACKEND', 'sqlite').lower() == 'memory':
+        return MemoryBackend()
+    return SQLiteBackend(os.getenv('RATE_LIMIT_DB', DEFAULT_DB_PATH))
+
+def get_rate_limiter(service: str) -> RateLimiter:
+    """
+    Retorna o limitador do serviço ('openai' ou 'mistral'), criado na primeira chamada.
+
+    Args:
+        service (str): Nome do serviço, usado como prefixo das variáveis de ambiente
+
+    Returns:
+        RateLimiter: Limitador compartilhado pelo processo
+    """
+    with _limiters_lock:
+        if service not in _limiters:
+            prefix = service.upper()
+            rpm = _limit_from_env(f'{prefix}_RPM_LIMIT')
+            tpm = _limit_from_env(f'{prefix}_TPM_LIMIT')
+            backend = get_backend() if rpm or tpm else None
+            _limiters[service] = RateLimiter(service, rpm, tpm, backend)
+            if rpm or tpm:
+                logger.info(f"Limitador {service}: {rpm or '-'} req/min, {tpm or '-'} tokens/min ({type(backend).__name__})")
+        return _limiters[service]
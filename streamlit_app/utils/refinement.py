@@ -0,0 +1,120 @@
+"""
+Módulo com o refinamento em segundo plano de uma tradução de rascunho.
+
+O rascunho (modelo rápido) é exibido assim que fica pronto; em seguida uma thread
+traduz de novo os segmentos com o modelo principal e substitui as linhas do
+rascunho conforme ficam prontas. A interface consulta o texto atual a cada
+execução do script, então a tela e os downloads são atualizados aos poucos.
+"""
+
+import logging
+import threading
+from typing import Callable, List, Optional
+
+from .lazy_reader import USAGE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+class BackgroundRefinement:
+    """
+    Guarda as linhas de uma tradução e as atualiza a partir de uma thread de refinamento.
+    """
+
+    def __init__(self, total_lines: int):
+        """
+        Args:
+            total_lines: Número de linhas do texto traduzido
+        """
+        self._lines: List[str] = [''] * total_lines
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Definido por cancel; a função de refinamento deixa de enviar segmentos
+        self.cancel_event = threading.Event()
+        self.draft_usage = dict.fromkeys(USAGE_FIELDS, 0)
+        self.refine_usage = dict.fromkeys(USAGE_FIELDS, 0)
+        self.stats = None
+        self.progress = (0, 0)
+        self.refined_segments = 0
+        self.total_segments = None
+        self.error = None
+        self.version = 0
+
+    def update(self, indexes: List[int], translation: str):
+        """
+        Substitui as linhas de um segmento (segment_callback de traduzir_texto).
+
+        Args:
+            indexes: Índices das linhas do segmento
+            translation: Tradução do segmento
+        """
+        with self._lock:
+            for index in indexes:
+                self._lines[index] = translation
+            self.version += 1
+
+    def record_draft_usage(self, *values):
+        """Guarda o uso de tokens do rascunho (token_callback de traduzir_texto)."""
+        self.draft_usage = dict(zip(USAGE_FIELDS, values))
+
+    def record_refine_usage(self, *values):
+        """Guarda o uso de tokens do refinamento (token_callback de traduzir_texto)."""
+        self.refine_usage = dict(zip(USAGE_FIELDS, values))
+
+    def record_progress(self, current: int, total: int):
+        """Guarda o progresso do refinamento (progress_callback de traduzir_texto)."""
+        self.progress = (current, total)
+
+    def record_stats(self, stats: dict):
+        """Guarda as estatísticas do refinamento (stats_callback de traduzir_texto)."""
+        self.stats = stats
+
+    def refined(self, indexes: List[int], translation: str):
+        """Substitui as linhas de um segmento refinado e conta o segmento."""
+        self.update(indexes, translation)
+        with self._lock:
+            self.refined_segments += 1
+
+    def text(self) -> str:
+        """Texto traduzido atual, com os segmentos já refinados."""
+        with self._lock:
+            return '\n'.join(self._lines)
+
+    def usage(self) -> dict:
+        """Uso de tokens e custo somados do rascunho e do refinamento."""
+        return {field: self.draft_usage.get(field, 0) + self.refine_usage.get(field, 0) for field in USAGE_FIELDS}
+
+    def start(self, refine: Callable[['BackgroundRefinement'], int]):
+        """
+        Inicia o refinamento em uma thread.
+
+        Args:
+            refine: Função que recebe este objeto, refina a tradução chamando refined e os
+                demais métodos record_*, para de enviar segmentos quando cancel_event é
+                definido e retorna o número de segmentos refinados
+        """
+        def run():
+            try:
+                self.total_segments = refine(self)
+            except Exception as e:
+                logger.error(f"Falha no refinamento da tradução: {str(e)}", exc_info=True)
+                self.error = e
+
+        self._thread = threading.Thread(target=run, name='refinamento', daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """
+        Interrompe o refinamento: nenhum segmento novo é enviado e a thread termina
+        assim que as requisições em andamento forem concluídas.
+        """
+        self.cancel_event.set()
+
+    @property
+    def running(self) -> bool:
+        """Indica se o refinamento ainda está em andamento."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def finished(self) -> bool:
+        """Indica se o refinamento terminou (com sucesso ou com erro)."""
+        return self._thread is not None and not self._thread.is_alive()
@@ -17,14 +17,34 @@ def initialize_session_state():
     if 'translated_text' not in st.session_state:
         st.session_state.translated_text = None
     
-    # Bytes do PDF gerado
+    # Bytes do PDF gerado e a renderização em andamento (PDFRenderJob)
     if 'pdf_bytes' not in st.session_state:
         st.session_state.pdf_bytes = None
+        st.session_state.pdf_job = None
     
     # Nome do arquivo de saída
     if 'output_filename' not in st.session_state:
         st.session_state.output_filename = None
     
+    # Páginas do documento original processadas (None para todas)
+    if 'paginas_selecionadas' not in st.session_state:
+        st.session_state.paginas_selecionadas = None
+    
+    # Índice (linha inicial, página original) das páginas no texto pré-processado, com as mesmas linhas da tradução
+    if 'indice_paginas' not in st.session_state:
+        st.session_state.indice_paginas = None
+    
+    # Leitor com tradução sob demanda (LazyPageTranslator) e a página aberta
+    if 'leitor' not in st.session_state:
+        st.session_state.leitor = None
+        st.session_state.leitor_chave = None
+        st.session_state.leitor_pagina = 0
+    
+    # Refinamento em segundo plano de uma tradução de rascunho (BackgroundRefinement)
+    if 'refinamento' not in st.session_state:
+        st.session_state.refinamento = None
+        st.session_state.refinamento_versao = -1
+    
     # Idiomas selecionados
     if 'idioma_origem' not in st.session_state:
         st.session_state.idioma_origem = "Inglês"
@@ -43,17 +63,64 @@ def initialize_session_state():
     # Informações de tokens e custos
     if 'token_info' not in st.session_state:
         st.session_state.token_info = None
+    
+    # Estatísticas da tradução (deduplicação etc.)
+    if 'translation_stats' not in st.session_state:
+        st.session_state.translation_stats = None
+    
+    # Traduções para os idiomas adicionais (idioma -> texto, PDF, tokens e estatísticas)
+    if 'extra_translations' not in st.session_state:
+        st.session_state.extra_translations = {}
+
+def update_reader(leitor, chave):
+    """
+    Guarda na sessão o leitor com tradução sob demanda, encerrando o anterior.
+    
+    Args:
+        leitor: LazyPageTranslator com as páginas do documento
+        chave: Identificação do documento, dos idiomas e das páginas do leitor
+    """
+    clear_reader()
+    st.session_state.leitor = leitor
+    st.session_state.leitor_chave = chave
+    st.session_state.leitor_pagina = 0
+
+def clear_reader():
+    """
+    Encerra o leitor da sessão, cancelando as traduções antecipadas pendentes.
+    """
+    if st.session_state.get('leitor') is not None:
+        st.session_state.leitor.shutdown()
+    st.session_state.leitor = None
+    st.session_state.leitor_chave = None
+
+def update_refinement(refinamento):
+    """
+    Guarda na sessão o refinamento em segundo plano da tradução, cancelando o anterior.
+    
+    Args:
+        refinamento: BackgroundRefinement em andamento, ou None ao terminar
+    """
+    anterior = st.session_state.get('refinamento')
+    if anterior is not None and anterior is not refinamento:
+        anterior.cancel()
+    st.session_state.refinamento = refinamento
+    st.session_state.refinamento_versao = -1
 
-def update_processed_text(text, filename):
+def update_processed_text(text, filename, paginas=None, indice_paginas=None):
     """
     Atualiza o texto processado e o nome do arquivo na sessão.
     
     Args:
         text: Texto processado
         filename: Nome do arquivo
+        paginas: Páginas do documento original que foram processadas (None para todas)
+        indice_paginas: Pares (linha inicial no texto pré-processado, página original), de remap_page_index
     """
     st.session_state.processed_text = text
     st.session_state.output_filename = filename
+    st.session_state.paginas_selecionadas = paginas
+    st.session_state.indice_paginas = indice_paginas
 
 def update_translated_text(text):
     """
@@ -65,15 +132,29 @@ def update_translated_text(text):
     st.session_state.translated_text = text
     st.session_state.traducao_concluida = True
     st.session_state.mensagem_sucesso = "Tradução concluída com sucesso!"
+    # O PDF de uma tradução anterior não vale para o novo texto
+    update_pdf_bytes(None)
 
 def update_pdf_bytes(pdf_bytes):
     """
-    Atualiza os bytes do PDF na sessão.
+    Atualiza os bytes do PDF na sessão, descartando a renderização em andamento.
     
     Args:
-        pdf_bytes: Bytes do PDF gerado
+        pdf_bytes: Bytes do PDF gerado, ou None para gerá-lo de novo
     """
+    if st.session_state.get('pdf_job') is not None:
+        st.session_state.pdf_job.cancel()
     st.session_state.pdf_bytes = pdf_bytes
+    st.session_state.pdf_job = None
+
+def update_pdf_job(job):
+    """
+    Guarda na sessão a renderização do PDF em andamento.
+    
+    Args:
+        job: PDFRenderJob da renderização
+    """
+    st.session_state.pdf_job = job
 
 def get_idioma_origem_index():
     """
@@ -117,12 +198,18 @@ def reset_translation_state():
     """
     st.session_state.processed_text = None
     st.session_state.translated_text = None
-    st.session_state.pdf_bytes = None
+    update_pdf_bytes(None)
     st.session_state.output_filename = None
+    st.session_state.paginas_selecionadas = None
+    st.session_state.indice_paginas = None
     st.session_state.traducao_concluida = False
     st.session_state.mensagem_sucesso = None
+    st.session_state.translation_stats = None
+    st.session_state.extra_translations = {}
+    update_refinement(None)
+    clear_reader()
 
-def update_token_info(input_tokens, output_tokens, input_cost, output_cost, total_cost):
+def update_token_info(input_tokens, output_tokens, input_cost, output_cost, total_cost, context_tokens=0, payload_tokens=0):
     """
     Atualiza as informações de tokens e custos na sessão.
     
@@ -132,11 +219,41 @@ def update_token_info(input_tokens, output_tokens, input_cost, output_cost, tota
         input_cost: Custo dos tokens de entrada
         output_cost: Custo dos tokens de saída
         total_cost: Custo total
+        context_tokens: Tokens de entrada gastos com linhas de contexto
+        payload_tokens: Tokens de entrada do conteúdo efetivamente traduzido
     """
     st.session_state.token_info = {
         'input_tokens': input_tokens,
         'output_tokens': output_tokens,
         'input_cost': input_cost,
         'output_cost': output_cost,
-        'total_cost': total_cost
+        'total_cost': total_cost,
+        'context_tokens': context_tokens,
+        'payload_tokens': payload_tokens
     }
+
+
+def update_translation_stats(stats):
+    """
+    Atualiza as estatísticas da tradução na sessão.
+    
+    Args:
+        stats: Dicionário com as estatísticas da tradução
+    """
+    st.session_state.translation_stats = stats
+
+def update_extra_translation(idioma, **dados):
+    """
+    Atualiza os dados da tradução de um idioma adicional na sessão.
+    
+    Args:
+        idioma: Nome do idioma adicional
+        dados: Campos a atualizar (translated_text, pdf_bytes, pdf_job, token_info, translation_stats)
+    """
+    st.session_state.extra_translations.setdefault(idioma, {}).update(dados)
+
+def clear_extra_translations():
+    """
+    Remove as traduções dos idiomas adicionais de um processamento anterior.
+    """
+    st.session_state.extra_translations = {}